@@ -11,6 +11,7 @@ import httpx
 from app.core.database import get_db
 from app.core.security import create_access_token, get_current_user
 from app.core.config import settings
+from app.core.http_client import http_client_manager
 from app.models.user import User, UserRole
 
 router = APIRouter()
@@ -51,38 +52,37 @@ async def wx_login(
     3. 生成JWT token
     4. 返回token和用户信息
     """
-    # 1. 调用微信API换取openid
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                "https://api.weixin.qq.com/sns/jscode2session",
-                params={
-                    "appid": settings.WECHAT_APP_ID,
-                    "secret": settings.WECHAT_APP_SECRET,
-                    "js_code": request.code,
-                    "grant_type": "authorization_code"
-                },
-                timeout=10.0
-            )
-            wx_data = response.json()
-            
-            if "openid" not in wx_data:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"微信登录失败: {wx_data.get('errmsg', '未知错误')}"
-                )
-            
-            openid = wx_data["openid"]
-        except httpx.TimeoutException:
-            raise HTTPException(
-                status_code=status.HTTP_408_REQUEST_TIMEOUT,
-                detail="微信服务请求超时"
-            )
-        except Exception as e:
+    # 1. 调用微信API换取openid（复用共享连接池）
+    try:
+        response = await http_client_manager.client.get(
+            "https://api.weixin.qq.com/sns/jscode2session",
+            params={
+                "appid": settings.WECHAT_APP_ID,
+                "secret": settings.WECHAT_APP_SECRET,
+                "js_code": request.code,
+                "grant_type": "authorization_code"
+            },
+            timeout=httpx.Timeout(10.0, connect=settings.HTTP_CONNECT_TIMEOUT)
+        )
+        wx_data = response.json()
+        
+        if "openid" not in wx_data:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"微信登录异常: {str(e)}"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"微信登录失败: {wx_data.get('errmsg', '未知错误')}"
             )
+        
+        openid = wx_data["openid"]
+    except httpx.TimeoutException:
+        raise HTTPException(
+            status_code=status.HTTP_408_REQUEST_TIMEOUT,
+            detail="微信服务请求超时"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"微信登录异常: {str(e)}"
+        )
     
     # 2. 查询或创建用户
     result = await db.execute(
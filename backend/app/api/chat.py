@@ -2,23 +2,32 @@
 对话API
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from sqlalchemy import select
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
+import json
+import logging
 
-from app.core.database import get_db
-from app.core.security import get_current_user_optional
+from app.core.database import SessionLocal, get_db
+from app.core.security import get_current_user, get_current_user_optional
 from app.models.user import User
 from app.models.conversation import Conversation
 from app.models.message import Message, MessageRole, MessageSource
 from app.services.ai_service import ai_service
+from app.services.conversation_service import conversation_service
 from app.services.keyword_service import keyword_service
 from app.services.resource_service import resource_service
 from app.services.safety_service import safety_service
+from app.services.text_classifier import text_classifier
 from app.services.fitness_service import fitness_service
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -37,6 +46,110 @@ class ChatResponse(BaseModel):
     risk_warning: Optional[str] = None
 
 
+INTERNET_NOTICE = "\n\n（内容来自于互联网，请斟酌使用）"
+
+
+async def _internal_reply(
+    keyword_result: dict,
+    db: AsyncSession
+) -> Optional[str]:
+    """
+    根据内部关键词生成回复
+    
+    Returns:
+        回复内容；返回None表示内部资源未找到，需要AI生成
+    """
+    category = keyword_service.get_category_priority(
+        keyword_result['categories']
+    )
+    
+    # 特殊处理：体测分析
+    if 'fitness_test' in keyword_result['categories']:
+        # 这里应该获取学生ID，简化处理
+        response_message = "根据您的体测成绩分析，建议加强以下训练...\n\n"
+        response_message += "（完整的体测分析功能需要绑定学生信息）"
+        return response_message
+    
+    # 检索内部资源
+    resources = await resource_service.search_internal(
+        keywords=keyword_result['internal_keywords'],
+        category=category,
+        db=db,
+        limit=5
+    )
+    
+    if resources:
+        return resource_service.format_resource_response(
+            resources,
+            source="internal"
+        )
+    return None
+
+
+def _save_conversation(
+    db: Session,
+    user_id: int,
+    conversation_id: Optional[int],
+    user_text: str,
+    reply: str,
+    message_source: str
+) -> int:
+    """
+    保存一轮对话（用户消息和AI回复）
+    
+    数据库会话是同步的，在线程池中调用，避免阻塞事件循环
+    
+    Returns:
+        对话ID（新建对话时为新ID）
+    """
+    if not conversation_id:
+        # 创建新对话
+        conversation = Conversation(
+            user_id=user_id,
+            title=user_text[:50]  # 使用前50个字符作为标题
+        )
+        db.add(conversation)
+        db.flush()
+        conversation_id = conversation.id
+    
+    # 保存用户消息
+    user_message = Message(
+        conversation_id=conversation_id,
+        role=MessageRole.USER,
+        content=user_text
+    )
+    db.add(user_message)
+    
+    # 保存AI回复
+    ai_message = Message(
+        conversation_id=conversation_id,
+        role=MessageRole.ASSISTANT,
+        content=reply,
+        source=MessageSource.INTERNAL if message_source == "internal" else MessageSource.INTERNET
+    )
+    db.add(ai_message)
+    
+    # 同一事务内更新对话的最后一条消息和消息数
+    conversation_service.record_messages(db, conversation_id, reply, 2)
+    
+    db.commit()
+    return conversation_id
+
+
+def _save_conversation_in_new_session(**fields) -> int:
+    """使用独立会话保存一轮对话（流式响应发送时，依赖注入的会话已关闭）"""
+    with SessionLocal() as session:
+        return _save_conversation(session, **fields)
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    """格式化一条Server-Sent Events消息"""
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+
 @router.post("/send", response_model=ChatResponse)
 async def send_message(
     request: ChatRequest,
@@ -58,8 +171,11 @@ async def send_message(
     user_id = current_user.get("user_id") if current_user else None
     user_role = current_user.get("role", "student") if current_user else "student"
     
+    # 一次扫描完成安全检查与关键词识别所需的全部匹配
+    verdict = text_classifier.classify(request.message)
+    
     # 2. 安全检查 - 排除内容
-    excluded_check = safety_service.check_excluded(request.message)
+    excluded_check = safety_service.check_excluded(request.message, verdict)
     if excluded_check['is_excluded']:
         return ChatResponse(
             reply=excluded_check['message'],
@@ -69,57 +185,26 @@ async def send_message(
         )
     
     # 3. 安全检查 - 风险检测
-    risk_check = safety_service.check_risk(request.message)
+    risk_check = safety_service.check_risk(request.message, verdict)
     
     # 4. 关键词识别（注意：这是异步函数，需要 await）
-    keyword_result = await keyword_service.detect_keywords(request.message)
-    
-    response_message = ""
-    message_source = "ai"
+    keyword_result = await keyword_service.detect_keywords(
+        request.message, verdict
+    )
     
-    # 5. 处理逻辑
+    # 5. 处理逻辑：有内部关键词时优先检索内部资源，否则使用AI
+    response_message = None
+    message_source = "internal"
     if keyword_result['has_internal']:
-        # 有内部关键词，检索内部资源
-        category = keyword_service.get_category_priority(
-            keyword_result['categories']
-        )
-        
-        # 特殊处理：体测分析
-        if 'fitness_test' in keyword_result['categories']:
-            # 这里应该获取学生ID，简化处理
-            response_message = "根据您的体测成绩分析，建议加强以下训练...\n\n"
-            response_message += "（完整的体测分析功能需要绑定学生信息）"
-            message_source = "internal"
-        else:
-            # 检索内部资源
-            resources = await resource_service.search_internal(
-                keywords=keyword_result['internal_keywords'],
-                category=category,
-                db=db,
-                limit=5
-            )
-            
-            if resources:
-                response_message = resource_service.format_resource_response(
-                    resources,
-                    source="internal"
-                )
-                message_source = "internal"
-            else:
-                # 内部资源未找到，使用AI生成
-                response_message = await ai_service.chat(
-                    messages=[{'role': 'user', 'content': request.message}],
-                    user_role=user_role
-                )
-                response_message += "\n\n（内容来自于互联网，请斟酌使用）"
-                message_source = "internet"
-    else:
-        # 没有内部关键词，直接使用AI
+        response_message = await _internal_reply(keyword_result, db)
+    
+    if response_message is None:
         response_message = await ai_service.chat(
             messages=[{'role': 'user', 'content': request.message}],
-            user_role=user_role
+            user_role=user_role,
+            anonymous=user_id is None
         )
-        response_message += "\n\n（内容来自于互联网，请斟酌使用）"
+        response_message += INTERNET_NOTICE
         message_source = "internet"
     
     # 6. 添加风险提示
@@ -132,35 +217,15 @@ async def send_message(
     conversation_id = request.conversation_id
     
     if user_id:
-        # 已登录用户，保存对话记录
-        if not conversation_id:
-            # 创建新对话
-            conversation = Conversation(
-                user_id=user_id,
-                title=request.message[:50]  # 使用前50个字符作为标题
-            )
-            db.add(conversation)
-            await db.flush()
-            conversation_id = conversation.id
-        
-        # 保存用户消息
-        user_message = Message(
+        conversation_id = await run_in_threadpool(
+            _save_conversation,
+            db,
+            user_id=user_id,
             conversation_id=conversation_id,
-            role=MessageRole.USER,
-            content=request.message
+            user_text=request.message,
+            reply=response_message,
+            message_source=message_source
         )
-        db.add(user_message)
-        
-        # 保存AI回复
-        ai_message = Message(
-            conversation_id=conversation_id,
-            role=MessageRole.ASSISTANT,
-            content=response_message,
-            source=MessageSource.INTERNAL if message_source == "internal" else MessageSource.INTERNET
-        )
-        db.add(ai_message)
-        
-        await db.commit()
     
     # 8. 返回响应
     return ChatResponse(
@@ -172,6 +237,125 @@ async def send_message(
     )
 
 
+@router.post("/send/stream")
+async def send_message_stream(
+    request: ChatRequest,
+    current_user: Optional[dict] = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    发送消息（流式，Server-Sent Events）
+    
+    处理流程与 /send 相同，AI回复按生成进度逐段推送。
+    事件格式：
+    - meta: 来源和风险提示，最先发送
+    - 默认事件: {"delta": 文本片段}
+    - done: {"conversation_id": 对话ID}，回复完整保存后发送
+    - error: {"message": 提示}，回复中途失败时代替done发送，本轮不保存
+    """
+    user_id = current_user.get("user_id") if current_user else None
+    user_role = current_user.get("role", "student") if current_user else "student"
+    
+    verdict = text_classifier.classify(request.message)
+    excluded_check = safety_service.check_excluded(request.message, verdict)
+    risk_check = safety_service.check_risk(request.message, verdict)
+    
+    internal_reply = None
+    if not excluded_check['is_excluded']:
+        keyword_result = await keyword_service.detect_keywords(
+            request.message, verdict
+        )
+        if keyword_result['has_internal']:
+            internal_reply = await _internal_reply(keyword_result, db)
+    
+    async def event_stream():
+        # 排除内容：直接返回提示
+        if excluded_check['is_excluded']:
+            yield _sse(
+                {'source': 'system', 'has_risk': False, 'risk_warning': None},
+                event='meta'
+            )
+            yield _sse({'delta': excluded_check['message']})
+            yield _sse({'conversation_id': request.conversation_id}, event='done')
+            return
+        
+        message_source = "internal" if internal_reply is not None else "internet"
+        risk_warning = risk_check['warning'] if risk_check['has_risk'] else None
+        yield _sse(
+            {
+                'source': message_source,
+                'has_risk': risk_check['has_risk'],
+                'risk_warning': risk_warning
+            },
+            event='meta'
+        )
+        
+        parts = []
+        try:
+            if internal_reply is not None:
+                parts.append(internal_reply)
+                yield _sse({'delta': internal_reply})
+            else:
+                async for delta in ai_service.stream_chat(
+                    messages=[{'role': 'user', 'content': request.message}],
+                    user_role=user_role,
+                    anonymous=user_id is None
+                ):
+                    parts.append(delta)
+                    yield _sse({'delta': delta})
+                parts.append(INTERNET_NOTICE)
+                yield _sse({'delta': INTERNET_NOTICE})
+            
+            # 回复完整后再保存（客户端中途断开则不保存）
+            response_message = "".join(parts)
+            if risk_warning:
+                response_message = risk_warning + "\n\n" + response_message
+            
+            conversation_id = request.conversation_id
+            if user_id:
+                conversation_id = await run_in_threadpool(
+                    _save_conversation_in_new_session,
+                    user_id=user_id,
+                    conversation_id=conversation_id,
+                    user_text=request.message,
+                    reply=response_message,
+                    message_source=message_source
+                )
+        except Exception as e:
+            logger.exception(f"流式回复失败: {e}")
+            yield _sse({'message': '回复生成中断，请稍后重试'}, event='error')
+            return
+        
+        yield _sse({'conversation_id': conversation_id}, event='done')
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # 关闭nginx缓冲，片段即时送达
+        }
+    )
+
+
+@router.get("/cache/stats")
+async def get_reply_cache_stats(
+    limit: int = 20,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    AI回复缓存命中统计（教师、管理员可用）
+    用于查看哪些问题被反复提问
+    """
+    if current_user.get("role") not in ("teacher", "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="无权限查看缓存统计"
+        )
+    
+    return {"items": await ai_service.get_cache_stats(limit)}
+
+
 @router.get("/history/{conversation_id}")
 async def get_conversation_history(
     conversation_id: int,
@@ -1,16 +1,17 @@
 """
 对话历史API
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.conversation import Conversation
 from app.models.message import Message
+from app.services.conversation_service import conversation_service, MAX_PAGE_SIZE
 
 router = APIRouter()
 
@@ -25,42 +26,26 @@ class ConversationItem(BaseModel):
 
 @router.get("/list")
 async def get_conversations(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor"),
     current_user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    获取对话列表
+    获取对话列表（按更新时间倒序，支持游标分页）
     """
     user_id = current_user.get("user_id")
     
-    # 查询对话列表
-    result = await db.execute(
-        select(Conversation)
-        .where(Conversation.user_id == user_id)
-        .order_by(Conversation.updated_at.desc())
-    )
-    conversations = result.scalars().all()
-    
-    # 获取每个对话的最后一条消息
-    conversation_list = []
-    for conv in conversations:
-        # 获取最后一条消息
-        msg_result = await db.execute(
-            select(Message)
-            .where(Message.conversation_id == conv.id)
-            .order_by(Message.created_at.desc())
-            .limit(1)
+    try:
+        return await conversation_service.list_conversations(
+            db, user_id, limit=limit, cursor=cursor, skip=skip
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-        last_message = msg_result.scalar_one_or_none()
-        
-        conversation_list.append({
-            "id": conv.id,
-            "title": conv.title or "未命名对话",
-            "lastMessage": last_message.content[:50] if last_message else "",
-            "updated_at": conv.updated_at.isoformat()
-        })
-    
-    return {"conversations": conversation_list}
 
 
 @router.get("/{conversation_id}")
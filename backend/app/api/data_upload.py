@@ -1,293 +1,94 @@
 """
 数据上传API
 """
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
-import pandas as pd
-import io
-from datetime import datetime
+from pydantic import BaseModel
+from typing import List, Optional
 
 from app.core.database import get_db
 from app.core.security import get_current_user_optional
-from app.models.student_data import StudentFitnessData, SportsExercise
+from app.models.student_data import StudentFitnessData
+from app.services.class_stats_service import (
+    DEFAULT_STUDENT_FIELDS,
+    STUDENT_FIELDS,
+    class_stats_service,
+)
+from app.services.exercise_index import (
+    exercise_index,
+    load_student_scores,
+    student_item_scores,
+)
+from app.services.fitness_analytics_service import GROUP_FIELDS, fitness_analytics_service
+from app.services.import_job_service import JOB_EXERCISE, JOB_FITNESS, import_job_service
 
 router = APIRouter()
 
+# 批量推荐一次最多的学生数
+MAX_BATCH_STUDENTS = 500
 
-@router.post("/upload/fitness-data")
-async def upload_fitness_data(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
+
+class BatchRecommendRequest(BaseModel):
+    """批量推荐请求（班级名称与学号列表至少提供一项）"""
+    class_name: Optional[str] = None
+    student_ids: Optional[List[str]] = None
+    per_item: int = 3
+
+
+@router.post("/upload/fitness-data", status_code=202)
+async def upload_fitness_data(file: UploadFile = File(...)):
     """
     上传学生体测数据（Excel格式）
+    文件落盘后立即返回任务ID，解析和入库在后台进程中执行
     Web版本：无需认证（生产环境建议添加认证）
     """
-    # 检查文件格式
-    if not file.filename.endswith(('.xlsx', '.xls', '.csv')):
-        raise HTTPException(status_code=400, detail="仅支持Excel或CSV格式文件")
-    
-    try:
-        # 读取文件内容
-        contents = await file.read()
-        
-        # 根据文件类型读取数据
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        else:
-            df = pd.read_excel(io.BytesIO(contents))
-        
-        # 数据清洗和验证
-        success_count = 0
-        error_count = 0
-        errors = []
-        
-        for index, row in df.iterrows():
-            try:
-                # 检查学生编号是否存在（保留前导0）
-                student_id_raw = row.get('学生编号', '')
-                if pd.isna(student_id_raw):
-                    continue
-                    
-                # 转换为字符串并保留前导0
-                if isinstance(student_id_raw, (int, float)):
-                    # 如果是数字，转为字符串并补齐到9位
-                    student_id = str(int(student_id_raw)).zfill(9)
-                else:
-                    student_id = str(student_id_raw).strip()
-                
-                if not student_id or student_id == 'nan':
-                    continue
-                
-                # 检查是否已存在
-                existing = db.query(StudentFitnessData).filter(
-                    StudentFitnessData.student_id == student_id
-                ).first()
-                
-                if existing:
-                    # 更新现有记录
-                    for col in df.columns:
-                        field_map = {
-                            '年级编号': 'grade_code',
-                            '年级': 'grade_name',
-                            '班级名称': 'class_name',
-                            '性别': 'gender',
-                            '身高': 'height',
-                            '体重': 'weight',
-                            '体重评分': 'weight_score',
-                            '体重等级': 'weight_level',
-                            '肺活量': 'lung_capacity',
-                            '肺活量评分': 'lung_capacity_score',
-                            '肺活量等级': 'lung_capacity_level',
-                            '50米跑': 'run_50m',
-                            '50米跑评分': 'run_50m_score',
-                            '50米跑等级': 'run_50m_level',
-                            '坐位体前屈': 'sit_reach',
-                            '坐位体前屈评分': 'sit_reach_score',
-                            '坐位体前屈等级': 'sit_reach_level',
-                            '一分钟仰卧起坐': 'sit_up',
-                            '一分钟仰卧起坐评分': 'sit_up_score',
-                            '一分钟仰卧起坐等级': 'sit_up_level',
-                            '一分钟仰卧起坐附加分': 'sit_up_bonus',
-                            '一分钟跳绳': 'rope_skip',
-                            '一分钟跳绳评分': 'rope_skip_score',
-                            '一分钟跳绳等级': 'rope_skip_level',
-                            '一分钟跳绳附加分': 'rope_skip_bonus',
-                            '立定跳远': 'standing_jump',
-                            '立定跳远评分': 'standing_jump_score',
-                            '立定跳远等级': 'standing_jump_level',
-                            '800米跑': 'run_800m',
-                            '800米跑评分': 'run_800m_score',
-                            '800米跑等级': 'run_800m_level',
-                            '800米跑附加分': 'run_800m_bonus',
-                            '1000米跑': 'run_1000m',
-                            '1000米跑评分': 'run_1000m_score',
-                            '1000米跑等级': 'run_1000m_level',
-                            '1000米跑附加分': 'run_1000m_bonus',
-                            '引体向上': 'pull_up',
-                            '引体向上评分': 'pull_up_score',
-                            '引体向上等级': 'pull_up_level',
-                            '引体向上附加分': 'pull_up_bonus',
-                            '50米×8往返跑': 'run_50m_8',
-                            '50米×8往返跑评分': 'run_50m_8_score',
-                            '50米×8往返跑等级': 'run_50m_8_level',
-                            '标准分': 'standard_score',
-                            '附加分': 'bonus_score',
-                            '总分': 'total_score',
-                            '总分等级': 'total_level',
-                        }
-                        if col in field_map:
-                            value = row[col]
-                            if pd.notna(value):
-                                setattr(existing, field_map[col], value)
-                    existing.update_time = datetime.now()
-                else:
-                    # 创建新记录
-                    student_data = StudentFitnessData(
-                        grade_code=str(row.get('年级编号', '')),
-                        grade_name=str(row.get('年级', '')),
-                        class_name=str(row.get('班级名称', '')),
-                        student_id=student_id,
-                        gender=str(row.get('性别', '')),
-                        height=float(row['身高']) if pd.notna(row.get('身高')) else None,
-                        weight=float(row['体重']) if pd.notna(row.get('体重')) else None,
-                        weight_score=float(row['体重评分']) if pd.notna(row.get('体重评分')) else None,
-                        weight_level=str(row.get('体重等级', '')),
-                        lung_capacity=float(row['肺活量']) if pd.notna(row.get('肺活量')) else None,
-                        lung_capacity_score=float(row['肺活量评分']) if pd.notna(row.get('肺活量评分')) else None,
-                        lung_capacity_level=str(row.get('肺活量等级', '')),
-                        run_50m=float(row['50米跑']) if pd.notna(row.get('50米跑')) else None,
-                        run_50m_score=float(row['50米跑评分']) if pd.notna(row.get('50米跑评分')) else None,
-                        run_50m_level=str(row.get('50米跑等级', '')),
-                        sit_reach=float(row['坐位体前屈']) if pd.notna(row.get('坐位体前屈')) else None,
-                        sit_reach_score=float(row['坐位体前屈评分']) if pd.notna(row.get('坐位体前屈评分')) else None,
-                        sit_reach_level=str(row.get('坐位体前屈等级', '')),
-                        sit_up=int(row['一分钟仰卧起坐']) if pd.notna(row.get('一分钟仰卧起坐')) else None,
-                        sit_up_score=float(row['一分钟仰卧起坐评分']) if pd.notna(row.get('一分钟仰卧起坐评分')) else None,
-                        sit_up_level=str(row.get('一分钟仰卧起坐等级', '')),
-                        sit_up_bonus=float(row['一分钟仰卧起坐附加分']) if pd.notna(row.get('一分钟仰卧起坐附加分')) else None,
-                        rope_skip=int(row['一分钟跳绳']) if pd.notna(row.get('一分钟跳绳')) else None,
-                        rope_skip_score=float(row['一分钟跳绳评分']) if pd.notna(row.get('一分钟跳绳评分')) else None,
-                        rope_skip_level=str(row.get('一分钟跳绳等级', '')),
-                        rope_skip_bonus=float(row['一分钟跳绳附加分']) if pd.notna(row.get('一分钟跳绳附加分')) else None,
-                        standing_jump=float(row['立定跳远']) if pd.notna(row.get('立定跳远')) else None,
-                        standing_jump_score=float(row['立定跳远评分']) if pd.notna(row.get('立定跳远评分')) else None,
-                        standing_jump_level=str(row.get('立定跳远等级', '')),
-                        run_800m=str(row.get('800米跑', '')),
-                        run_800m_score=float(row['800米跑评分']) if pd.notna(row.get('800米跑评分')) else None,
-                        run_800m_level=str(row.get('800米跑等级', '')),
-                        run_800m_bonus=float(row['800米跑附加分']) if pd.notna(row.get('800米跑附加分')) else None,
-                        run_1000m=str(row.get('1000米跑', '')),
-                        run_1000m_score=float(row['1000米跑评分']) if pd.notna(row.get('1000米跑评分')) else None,
-                        run_1000m_level=str(row.get('1000米跑等级', '')),
-                        run_1000m_bonus=float(row['1000米跑附加分']) if pd.notna(row.get('1000米跑附加分')) else None,
-                        pull_up=int(row['引体向上']) if pd.notna(row.get('引体向上')) else None,
-                        pull_up_score=float(row['引体向上评分']) if pd.notna(row.get('引体向上评分')) else None,
-                        pull_up_level=str(row.get('引体向上等级', '')),
-                        pull_up_bonus=float(row['引体向上附加分']) if pd.notna(row.get('引体向上附加分')) else None,
-                        run_50m_8=str(row.get('50米×8往返跑', '')),
-                        run_50m_8_score=float(row['50米×8往返跑评分']) if pd.notna(row.get('50米×8往返跑评分')) else None,
-                        run_50m_8_level=str(row.get('50米×8往返跑等级', '')),
-                        standard_score=float(row['标准分']) if pd.notna(row.get('标准分')) else None,
-                        bonus_score=float(row['附加分']) if pd.notna(row.get('附加分')) else None,
-                        total_score=float(row['总分']) if pd.notna(row.get('总分')) else None,
-                        total_level=str(row.get('总分等级', '')),
-                    )
-                    db.add(student_data)
-                
-                success_count += 1
-            except Exception as e:
-                error_count += 1
-                errors.append(f"第{index+2}行: {str(e)}")
-        
-        # 提交事务
-        db.commit()
-        
-        return {
-            "success": True,
-            "message": f"上传成功！成功导入{success_count}条数据，失败{error_count}条",
-            "success_count": success_count,
-            "error_count": error_count,
-            "errors": errors[:10]  # 只返回前10条错误
-        }
-    
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"文件处理失败: {str(e)}")
+    return await _submit_import(JOB_FITNESS, file)
 
 
-@router.post("/upload/sports-exercises")
-async def upload_sports_exercises(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
+@router.post("/upload/sports-exercises", status_code=202)
+async def upload_sports_exercises(file: UploadFile = File(...)):
     """
     上传体育动作库（Excel格式）
+    文件落盘后立即返回任务ID，解析和入库在后台进程中执行
     Web版本：无需认证（生产环境建议添加认证）
     """
+    return await _submit_import(JOB_EXERCISE, file)
+
+
+@router.get("/jobs/{job_id}")
+async def get_import_job(job_id: str):
+    """
+    查询导入任务进度
+    返回状态、已处理行数、成功/失败条数、错误信息和处理速度
+    """
+    job = import_job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="导入任务不存在或已过期")
+    
+    job['errors'] = job.get('errors', [])[:10]  # 只返回前10条错误
+    return {
+        "success": True,
+        "data": job
+    }
+
+
+async def _submit_import(kind: str, file: UploadFile):
+    """校验文件格式并提交后台导入任务"""
     # 检查文件格式
     if not file.filename.endswith(('.xlsx', '.xls', '.csv')):
         raise HTTPException(status_code=400, detail="仅支持Excel或CSV格式文件")
     
     try:
-        # 读取文件内容
-        contents = await file.read()
-        
-        # 根据文件类型读取数据
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        else:
-            df = pd.read_excel(io.BytesIO(contents))
-        
-        # 数据清洗和验证
-        success_count = 0
-        error_count = 0
-        errors = []
-        
-        for index, row in df.iterrows():
-            try:
-                # 检查编号是否存在
-                code = str(row.get('编号', '')).strip()
-                if not code or code == 'nan':
-                    continue
-                
-                # 检查是否已存在
-                existing = db.query(SportsExercise).filter(
-                    SportsExercise.code == code
-                ).first()
-                
-                if existing:
-                    # 更新现有记录
-                    existing.name = str(row.get('名称', ''))
-                    existing.source = str(row.get('来源', ''))
-                    existing.description = str(row.get('说明', ''))
-                    existing.equipment = str(row.get('使用器械', ''))
-                    existing.form = str(row.get('开展形式', ''))
-                    existing.movement_type = str(row.get('运动方式', ''))
-                    existing.difficulty = str(row.get('难度等级', ''))
-                    existing.suitable_level = str(row.get('适用水平', ''))
-                    existing.fitness_quality = str(row.get('锻炼身体素质', ''))
-                    existing.improve_test = str(row.get('提升体测项目', ''))
-                    existing.image_url = str(row.get('图片', ''))
-                    existing.update_time = datetime.now()
-                else:
-                    # 创建新记录
-                    exercise = SportsExercise(
-                        name=str(row.get('名称', '')),
-                        source=str(row.get('来源', '')),
-                        code=code,
-                        description=str(row.get('说明', '')),
-                        equipment=str(row.get('使用器械', '')),
-                        form=str(row.get('开展形式', '')),
-                        movement_type=str(row.get('运动方式', '')),
-                        difficulty=str(row.get('难度等级', '')),
-                        suitable_level=str(row.get('适用水平', '')),
-                        fitness_quality=str(row.get('锻炼身体素质', '')),
-                        improve_test=str(row.get('提升体测项目', '')),
-                        image_url=str(row.get('图片', ''))
-                    )
-                    db.add(exercise)
-                
-                success_count += 1
-            except Exception as e:
-                error_count += 1
-                errors.append(f"第{index+2}行: {str(e)}")
-        
-        # 提交事务
-        db.commit()
-        
-        return {
-            "success": True,
-            "message": f"上传成功！成功导入{success_count}条数据，失败{error_count}条",
-            "success_count": success_count,
-            "error_count": error_count,
-            "errors": errors[:10]
-        }
-    
+        job = await import_job_service.submit(kind, file.file, file.filename)
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=f"文件处理失败: {str(e)}")
+    
+    return {
+        "success": True,
+        "message": "文件已接收，正在后台导入",
+        "job_id": job['job_id'],
+        "status": job['status']
+    }
 
 
 @router.get("/student/{student_id}")
@@ -320,6 +121,11 @@ async def get_student_data(
             detail=f"未找到该学生的数据。数据库中的学号示例: {student_ids[:3]}"
         )
     
+    # 年级百分位（来自分析缓存，未命中时只查询该年级）
+    grade_percentile = await fitness_analytics_service.get_percentile(
+        db, student.student_id, student.grade_code
+    )
+    
     return {
         "success": True,
         "data": {
@@ -327,6 +133,7 @@ async def get_student_data(
             "grade": student.grade_name,
             "class": student.class_name,
             "gender": student.gender,
+            "grade_percentile": grade_percentile,  # 总分超过了年级百分之多少的学生
             "basic_info": {
                 "height": student.height,
                 "weight": student.weight,
@@ -377,44 +184,64 @@ async def get_student_data(
 @router.get("/class/{class_name}")
 async def get_class_data(
     class_name: str,
+    fields: str = Query(
+        ",".join(DEFAULT_STUDENT_FIELDS),
+        description="学生列表字段（逗号分隔），为空时不返回学生列表"
+    ),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="学生列表条数，默认全部"),
     db: Session = Depends(get_db)
 ):
     """
     查询班级体测数据
+    统计在数据库端聚合并缓存，学生列表按需分页查询
     Web版本：无需认证（生产环境建议添加认证）
     """
-    students = db.query(StudentFitnessData).filter(
-        StudentFitnessData.class_name == class_name
-    ).all()
+    student_fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in student_fields if field not in STUDENT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的字段: {', '.join(unknown)}")
     
-    if not students:
+    stats = await class_stats_service.get_stats(db, class_name)
+    if not stats:
         raise HTTPException(status_code=404, detail="未找到该班级的数据")
     
-    # 统计分析
-    total_count = len(students)
-    avg_score = sum([s.total_score for s in students if s.total_score]) / total_count if total_count > 0 else 0
+    data = dict(stats)
+    if student_fields:
+        data["students"] = class_stats_service.list_students(
+            db, class_name, student_fields, skip, limit
+        )
+        data["skip"] = skip
+        data["limit"] = limit
     
-    level_stats = {}
-    for student in students:
-        level = student.total_level or "未知"
-        level_stats[level] = level_stats.get(level, 0) + 1
+    return {
+        "success": True,
+        "data": data
+    }
+
+
+@router.get("/analytics")
+async def get_fitness_analytics(
+    grade_code: Optional[str] = Query(None, description="年级编号，为空时统计全校"),
+    group_by: str = Query("grade_code", description="分组维度（逗号分隔）：grade_code、class_name、gender"),
+    db: Session = Depends(get_db)
+):
+    """
+    年级/全校体测数据分析
+    各项目的均值、标准差、分位数、等级人数和及格率，结果缓存，上传数据后失效
+    """
+    fields = [field.strip() for field in group_by.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in GROUP_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的分组维度: {', '.join(unknown)}")
+    
+    analytics = await fitness_analytics_service.get_analytics(db, grade_code, fields)
+    if not analytics['student_count']:
+        raise HTTPException(status_code=404, detail="未找到体测数据")
     
     return {
         "success": True,
-        "data": {
-            "class_name": class_name,
-            "total_count": total_count,
-            "avg_score": round(avg_score, 2),
-            "level_stats": level_stats,
-            "students": [
-                {
-                    "student_id": s.student_id,
-                    "gender": s.gender,
-                    "total_score": s.total_score,
-                    "level": s.total_level
-                } for s in students
-            ]
-        }
+        "data": analytics
     }
 
 
@@ -434,32 +261,9 @@ async def recommend_exercises(
     if not student:
         raise HTTPException(status_code=404, detail="未找到该学生的数据")
     
-    # 分析薄弱项目
-    weak_items = []
-    if student.run_50m_score and student.run_50m_score < 70:
-        weak_items.append("50米跑")
-    if student.sit_reach_score and student.sit_reach_score < 70:
-        weak_items.append("坐位体前屈")
-    if student.rope_skip_score and student.rope_skip_score < 70:
-        weak_items.append("1分钟跳绳")
-    if student.standing_jump_score and student.standing_jump_score < 70:
-        weak_items.append("立定跳远")
-    
-    # 推荐相关训练动作
-    recommended = []
-    for item in weak_items:
-        exercises = db.query(SportsExercise).filter(
-            SportsExercise.improve_test.contains(item)
-        ).limit(3).all()
-        
-        for ex in exercises:
-            recommended.append({
-                "name": ex.name,
-                "description": ex.description,
-                "difficulty": ex.difficulty,
-                "improve_test": ex.improve_test,
-                "image_url": ex.image_url
-            })
+    # 分析薄弱项目，从内存索引中查找推荐动作
+    await exercise_index.ensure_current()
+    weak_items, recommended = exercise_index.recommend(student_item_scores(student))
     
     return {
         "success": True,
@@ -469,3 +273,36 @@ async def recommend_exercises(
             "recommended_exercises": recommended
         }
     }
+
+
+@router.post("/exercises/recommend/batch")
+async def recommend_exercises_batch(
+    request: BatchRecommendRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    批量推荐训练动作（整个班级或指定学生）
+    一次查询读取所有学生的评分，薄弱项目相同的学生合并为一组推荐
+    """
+    if not request.class_name and not request.student_ids:
+        raise HTTPException(status_code=400, detail="请提供班级名称或学号列表")
+    if request.student_ids and len(request.student_ids) > MAX_BATCH_STUDENTS:
+        raise HTTPException(status_code=400, detail=f"一次最多查询{MAX_BATCH_STUDENTS}名学生")
+    if not 1 <= request.per_item <= 10:
+        raise HTTPException(status_code=400, detail="per_item需在1~10之间")
+    
+    frame = load_student_scores(db, request.class_name, request.student_ids)
+    if frame.empty:
+        raise HTTPException(status_code=404, detail="未找到学生数据")
+    
+    await exercise_index.ensure_current()
+    result = exercise_index.recommend_batch(frame, request.per_item)
+    result['class_name'] = request.class_name
+    if request.student_ids:
+        found = set(frame['student_id'])
+        result['missing_student_ids'] = [sid for sid in request.student_ids if sid not in found]
+    
+    return {
+        "success": True,
+        "data": result
+    }
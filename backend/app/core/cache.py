@@ -2,21 +2,122 @@
 Redis缓存管理模块
 提供统一的缓存接口和策略
 """
-from typing import Optional, Any
+from typing import Optional, Any, Callable, Dict, Hashable, Iterable, List, Set, Tuple
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from functools import wraps
+import asyncio
+import hashlib
+import inspect
 import json
+import time
+import uuid
 import redis.asyncio as redis
+from app.core.codec import CacheCodec
 from app.core.config import settings
+from app.core.performance import performance_metrics
+from app.core.singleflight import SingleFlight
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 按标签失效时每批删除的键数
+TAG_BATCH_SIZE = 500
+
+# 有序集合计数：条目数超过上限的该倍数时才裁剪（留出新条目累积计数的空间）
+SCORE_TRIM_HEADROOM = 1.1
+
+
+class LRUCache:
+    """
+    进程内LRU缓存
+    容量有限，超出时淘汰最久未使用的条目；可选过期时间
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存，未命中或已过期返回None"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """设置缓存"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def delete(self, key: Hashable) -> bool:
+        """删除缓存"""
+        return self._data.pop(key, None) is not None
+    
+    def clear(self):
+        """清空缓存"""
+        self._data.clear()
+    
+    def keys(self) -> List[Hashable]:
+        """当前缓存的键（含尚未清理的过期条目）"""
+        return list(self._data)
+
 
 class CacheManager:
-    """缓存管理器"""
+    """
+    缓存管理器
+    
+    可选的进程内一级缓存（L1）位于Redis（L2）之前，只缓存CACHE_L1_TTLS中配置的键前缀；
+    写入、删除时通过Redis发布订阅通知其他进程丢弃本地副本，
+    订阅中断时清空L1，最长不一致时间不超过对应前缀的L1缓存时间。
+    L1命中时直接返回缓存对象本身，调用方不应修改返回值。
+    
+    缓存值经CacheCodec编码为二进制（带格式头部，可压缩），因此读写值使用
+    单独的不解码响应的连接（_value_client），其余命令仍使用redis_client。
+    """
     
-    def __init__(self):
+    def __init__(
+        self,
+        l1_ttls: Optional[Dict[str, int]] = None,
+        l1_maxsize: Optional[int] = None,
+        auto_batch: Optional[bool] = None
+    ):
         self.redis_client: Optional[redis.Redis] = None
+        self._value_client: Optional[redis.Redis] = None
         self._connected = False
+        self._codec = CacheCodec(
+            serializer=settings.CACHE_SERIALIZER,
+            compression=settings.CACHE_COMPRESSION,
+            min_size=settings.CACHE_COMPRESS_MIN_SIZE
+        )
+        
+        if l1_ttls is None:
+            l1_ttls = settings.CACHE_L1_TTLS if settings.CACHE_L1_ENABLED else {}
+        self._l1_ttls = dict(l1_ttls)
+        # 长前缀优先匹配
+        self._l1_prefixes = sorted(self._l1_ttls, key=len, reverse=True)
+        self._l1 = LRUCache(maxsize=l1_maxsize or settings.CACHE_L1_MAX_SIZE)
+        self._instance_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+        
+        # 自动合并读取：本轮待读取的键 -> 等待结果的调用方
+        self._auto_batch = settings.CACHE_AUTO_BATCH if auto_batch is None else auto_batch
+        self._batch: Dict[str, List[asyncio.Future]] = {}
     
     async def connect(self):
         """连接Redis"""
@@ -26,29 +127,163 @@ class CacheManager:
                 encoding="utf-8",
                 decode_responses=True
             )
+            self._value_client = redis.from_url(settings.REDIS_URL)
             await self.redis_client.ping()
             self._connected = True
             logger.info("Redis连接成功")
         except Exception as e:
             logger.error(f"Redis连接失败: {e}")
             self._connected = False
+            return
+        
+        if self._l1_prefixes:
+            self._listener = asyncio.create_task(self._listen_invalidations())
     
     async def disconnect(self):
         """断开Redis连接"""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._l1.clear()
+        
         if self.redis_client:
             await self.redis_client.close()
+            await self._value_client.close()
             self._connected = False
             logger.info("Redis连接已关闭")
     
+    def _l1_ttl(self, key: str) -> Optional[int]:
+        """键所属命名空间的L1缓存时间，不使用L1时返回None"""
+        for prefix in self._l1_prefixes:
+            if key.startswith(prefix):
+                return self._l1_ttls[prefix]
+        return None
+    
+    def _l1_delete_pattern(self, pattern: str) -> int:
+        """删除L1中匹配模式的键（与Redis的glob规则一致）"""
+        matched = [key for key in self._l1.keys() if fnmatchcase(key, pattern)]
+        for key in matched:
+            self._l1.delete(key)
+        return len(matched)
+    
+    async def _publish_invalidation(
+        self,
+        keys: Iterable[str] = (),
+        patterns: Iterable[str] = ()
+    ):
+        """通知其他进程丢弃L1中的副本"""
+        if not self._l1_prefixes:
+            return
+        
+        message = {
+            "origin": self._instance_id,
+            "keys": list(keys),
+            "patterns": list(patterns),
+        }
+        try:
+            await self.redis_client.publish(
+                settings.CACHE_INVALIDATION_CHANNEL,
+                json.dumps(message, ensure_ascii=False)
+            )
+        except Exception as e:
+            logger.error(f"发布缓存失效通知失败: {e}")
+    
+    def _apply_invalidation(self, data: str):
+        """处理其他进程发来的失效通知"""
+        try:
+            message = json.loads(data)
+        except ValueError:
+            logger.warning(f"无效的缓存失效通知: {data}")
+            return
+        
+        if message.get("origin") == self._instance_id:
+            return
+        for key in message.get("keys", []):
+            self._l1.delete(key)
+        for pattern in message.get("patterns", []):
+            self._l1_delete_pattern(pattern)
+    
+    async def _listen_invalidations(self):
+        """订阅缓存失效通知；订阅中断期间可能漏收消息，因此先清空L1再重新订阅"""
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"缓存失效订阅中断，清空进程内缓存: {e}")
+                self._l1.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.reset()
+    
+    async def _batched_get(self, key: str) -> Optional[str]:
+        """
+        读取Redis原始值：同一事件循环轮次内的并发读取合并为一次MGET
+        
+        第一个调用方安排在本轮结束时发出MGET，其余调用方只登记等待
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._batch:
+            loop.call_soon(self._flush_batch)
+        self._batch.setdefault(key, []).append(future)
+        return await future
+    
+    def _flush_batch(self):
+        """发出本轮合并的读取"""
+        batch, self._batch = self._batch, {}
+        if batch:
+            asyncio.ensure_future(self._run_batch(batch))
+    
+    async def _run_batch(self, batch: Dict[str, List[asyncio.Future]]):
+        keys = list(batch)
+        try:
+            values = await self._value_client.mget(keys)
+            performance_metrics.record_cache_batch(len(keys))
+        except Exception as e:
+            for waiters in batch.values():
+                for future in waiters:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        
+        for key, value in zip(keys, values):
+            for future in batch[key]:
+                if not future.done():
+                    future.set_result(value)
+    
     async def get(self, key: str) -> Optional[Any]:
-        """获取缓存"""
+        """获取缓存（先查L1，再查Redis）"""
         if not self._connected:
             return None
         
+        l1_ttl = self._l1_ttl(key)
+        if l1_ttl:
+            value = self._l1.get(key)
+            performance_metrics.record_cache_tier("l1", value is not None)
+            if value is not None:
+                return value
+        
         try:
-            value = await self.redis_client.get(key)
+            if self._auto_batch:
+                value = await self._batched_get(key)
+            else:
+                value = await self._value_client.get(key)
+            performance_metrics.record_cache_tier("l2", bool(value))
             if value:
-                return json.loads(value)
+                result = self._codec.decode(value)
+                if l1_ttl:
+                    self._l1.set(key, result, l1_ttl)
+                return result
             return None
         except Exception as e:
             logger.error(f"获取缓存失败 {key}: {e}")
@@ -58,31 +293,196 @@ class CacheManager:
         self, 
         key: str, 
         value: Any, 
-        expire: int = 3600
+        expire: int = 3600,
+        tags: Iterable[str] = ()
     ) -> bool:
-        """设置缓存"""
+        """
+        设置缓存
+        
+        Args:
+            key: 缓存键
+            value: 可JSON序列化的值
+            expire: 过期时间（秒）
+            tags: 登记的标签，之后可用invalidate_tags一并删除（见CacheTags）
+        """
         if not self._connected:
             return False
+        if tags:
+            return await self.set_many({key: value}, expire, tags)
         
         try:
-            serialized = json.dumps(value, ensure_ascii=False)
-            await self.redis_client.setex(key, expire, serialized)
-            return True
+            serialized = self._codec.encode(value)
+            await self._value_client.setex(key, expire, serialized)
         except Exception as e:
             logger.error(f"设置缓存失败 {key}: {e}")
             return False
+        
+        l1_ttl = self._l1_ttl(key)
+        if l1_ttl:
+            # 存反序列化后的副本，与从Redis读到的值一致，且不受调用方后续修改影响
+            self._l1.set(key, self._codec.decode(serialized), min(l1_ttl, expire))
+            await self._publish_invalidation(keys=[key])
+        return True
     
     async def delete(self, key: str) -> bool:
         """删除缓存"""
         if not self._connected:
             return False
         
+        self._l1.delete(key)
         try:
             await self.redis_client.delete(key)
-            return True
         except Exception as e:
             logger.error(f"删除缓存失败 {key}: {e}")
             return False
+        
+        if self._l1_ttl(key):
+            await self._publish_invalidation(keys=[key])
+        return True
+    
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        批量获取缓存（L1未命中的键一次MGET读取）
+        
+        Args:
+            keys: 缓存键列表
+            
+        Returns:
+            与keys一一对应的值，未命中为None
+        """
+        results: List[Optional[Any]] = [None] * len(keys)
+        if not self._connected or not keys:
+            return results
+        
+        missing: List[int] = []
+        for index, key in enumerate(keys):
+            if self._l1_ttl(key):
+                value = self._l1.get(key)
+                performance_metrics.record_cache_tier("l1", value is not None)
+                if value is not None:
+                    results[index] = value
+                    continue
+            missing.append(index)
+        
+        if not missing:
+            return results
+        
+        try:
+            values = await self._value_client.mget([keys[index] for index in missing])
+            performance_metrics.record_cache_batch(len(missing))
+        except Exception as e:
+            logger.error(f"批量获取缓存失败 {keys}: {e}")
+            return results
+        
+        for index, value in zip(missing, values):
+            performance_metrics.record_cache_tier("l2", bool(value))
+            if value:
+                try:
+                    results[index] = self._codec.decode(value)
+                except Exception as e:
+                    logger.error(f"解码缓存失败 {keys[index]}: {e}")
+                    continue
+                l1_ttl = self._l1_ttl(keys[index])
+                if l1_ttl:
+                    self._l1.set(keys[index], results[index], l1_ttl)
+        return results
+    
+    async def set_many(
+        self,
+        mapping: Dict[str, Any],
+        expire: int = 3600,
+        tags: Iterable[str] = ()
+    ) -> bool:
+        """批量设置缓存（一次管道提交所有SETEX及标签登记）"""
+        if not self._connected or not mapping:
+            return False
+        
+        serialized = {
+            key: self._codec.encode(value)
+            for key, value in mapping.items()
+        }
+        try:
+            async with self._value_client.pipeline(transaction=False) as pipe:
+                for key, data in serialized.items():
+                    pipe.setex(key, expire, data)
+                for tag in tags:
+                    tag_key = CacheKeys.tag(tag)
+                    pipe.sadd(tag_key, *serialized)
+                    # 标签集合的过期时间不短于其中任何成员
+                    pipe.expire(tag_key, expire, nx=True)
+                    pipe.expire(tag_key, expire, gt=True)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"批量设置缓存失败 {list(mapping)}: {e}")
+            return False
+        
+        l1_keys = []
+        for key, data in serialized.items():
+            l1_ttl = self._l1_ttl(key)
+            if l1_ttl:
+                self._l1.set(key, self._codec.decode(data), min(l1_ttl, expire))
+                l1_keys.append(key)
+        if l1_keys:
+            await self._publish_invalidation(keys=l1_keys)
+        return True
+    
+    async def delete_many(self, keys: List[str]) -> int:
+        """批量删除缓存（一次DEL），返回删除的键数"""
+        if not self._connected or not keys:
+            return 0
+        
+        for key in keys:
+            self._l1.delete(key)
+        try:
+            deleted = await self.redis_client.delete(*keys)
+        except Exception as e:
+            logger.error(f"批量删除缓存失败 {keys}: {e}")
+            return 0
+        
+        l1_keys = [key for key in keys if self._l1_ttl(key)]
+        if l1_keys:
+            await self._publish_invalidation(keys=l1_keys)
+        return deleted
+    
+    async def invalidate_tags(self, *tags: str) -> int:
+        """
+        删除标签下登记的全部缓存
+        
+        先把标签集合原子改名，之后新写入的键登记到新集合，不会被本次误删或漏登；
+        再分批SSCAN改名后的集合并DEL，只触及该标签的成员，不扫描整个键空间
+        
+        Returns:
+            删除的键数
+        """
+        if not self._connected:
+            return 0
+        
+        deleted = 0
+        for tag in tags:
+            tag_key = CacheKeys.tag(tag)
+            pending_key = f"{tag_key}:invalidating:{uuid.uuid4().hex}"
+            try:
+                await self.redis_client.rename(tag_key, pending_key)
+            except redis.ResponseError:
+                # 标签下没有缓存
+                continue
+            except Exception as e:
+                logger.error(f"按标签清除缓存失败 {tag}: {e}")
+                continue
+            
+            try:
+                batch: List[str] = []
+                async for key in self.redis_client.sscan_iter(pending_key, count=TAG_BATCH_SIZE):
+                    batch.append(key)
+                    if len(batch) >= TAG_BATCH_SIZE:
+                        deleted += await self.delete_many(batch)
+                        batch = []
+                if batch:
+                    deleted += await self.delete_many(batch)
+                await self.redis_client.delete(pending_key)
+            except Exception as e:
+                logger.error(f"按标签清除缓存失败 {tag}: {e}")
+        return deleted
     
     async def exists(self, key: str) -> bool:
         """检查缓存是否存在"""
@@ -95,22 +495,106 @@ class CacheManager:
             logger.error(f"检查缓存失败 {key}: {e}")
             return False
     
+    async def incr(self, key: str) -> Optional[int]:
+        """计数器加一（不经过L1），Redis不可用时返回None"""
+        if not self._connected:
+            return None
+        
+        try:
+            return await self.redis_client.incr(key)
+        except Exception as e:
+            logger.error(f"更新计数器失败 {key}: {e}")
+            return None
+    
+    async def get_counter(self, key: str) -> Optional[int]:
+        """读取计数器（不经过L1），不存在或Redis不可用时返回None"""
+        if not self._connected:
+            return None
+        
+        try:
+            value = await self.redis_client.get(key)
+            return int(value) if value is not None else None
+        except Exception as e:
+            logger.error(f"读取计数器失败 {key}: {e}")
+            return None
+    
+    async def incr_score(
+        self,
+        key: str,
+        member: str,
+        amount: float = 1.0,
+        expire: Optional[int] = None,
+        max_members: Optional[int] = None
+    ) -> float:
+        """
+        有序集合计数（如按条目统计命中次数）
+        
+        裁剪策略：条目数超过 max_members 的 SCORE_TRIM_HEADROOM 倍时，才删除分数最低的条目、
+        裁回 max_members 条。每次裁剪之间至少能进入约10%的新条目，新条目在被裁剪前有机会累积计数，
+        不会因与其他低分条目并列而一进入就被删除
+        
+        Args:
+            max_members: 最多保留的条目数（裁剪后），避免集合无限增长
+        """
+        if not self._connected:
+            return 0.0
+        
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.zincrby(key, amount, member)
+                if expire:
+                    pipe.expire(key, expire)
+                if max_members:
+                    pipe.zcard(key)
+                results = await pipe.execute()
+            
+            if max_members and results[-1] > max_members * SCORE_TRIM_HEADROOM:
+                await self.redis_client.zremrangebyrank(key, 0, -(max_members + 1))
+            return results[0]
+        except Exception as e:
+            logger.error(f"更新计数失败 {key}: {e}")
+            return 0.0
+    
+    async def top_scores(
+        self,
+        key: str,
+        limit: int = 10
+    ) -> List[Tuple[str, float]]:
+        """获取有序集合中分数最高的条目"""
+        if not self._connected:
+            return []
+        
+        try:
+            return await self.redis_client.zrevrange(
+                key, 0, limit - 1, withscores=True
+            )
+        except Exception as e:
+            logger.error(f"获取计数失败 {key}: {e}")
+            return []
+    
     async def clear_pattern(self, pattern: str) -> int:
-        """清除匹配模式的所有缓存"""
+        """
+        清除匹配模式的所有缓存
+        
+        需要SCAN整个键空间，仅用于运维；业务失效请用标签（invalidate_tags）
+        """
         if not self._connected:
             return 0
         
+        self._l1_delete_pattern(pattern)
         try:
             keys = []
             async for key in self.redis_client.scan_iter(match=pattern):
                 keys.append(key)
             
-            if keys:
-                return await self.redis_client.delete(*keys)
-            return 0
+            deleted = await self.redis_client.delete(*keys) if keys else 0
         except Exception as e:
             logger.error(f"清除缓存失败 {pattern}: {e}")
             return 0
+        
+        # Redis中删除后再通知，避免其他进程在删除前重新读回旧值
+        await self._publish_invalidation(patterns=[pattern])
+        return deleted
 
 
 # 全局缓存管理器实例
@@ -134,8 +618,9 @@ class CacheKeys:
         return "resource:keywords:all"
     
     @staticmethod
-    def resource_by_keyword(keyword: str) -> str:
-        return f"resource:keyword:{keyword}"
+    def resource_search(keywords: List[str], category: Optional[str], limit: int) -> str:
+        digest = hashlib.sha1("\x00".join(sorted(set(keywords))).encode("utf-8")).hexdigest()
+        return f"resource:search:{category or 'all'}:{limit}:{digest}"
     
     @staticmethod
     def conversation_list(user_id: int) -> str:
@@ -149,9 +634,57 @@ class CacheKeys:
     def fitness_standards() -> str:
         return "fitness:standards:all"
     
+    @staticmethod
+    def keyword_detect(version: str, digest: str) -> str:
+        return f"keyword:detect:{version}:{digest}"
+    
+    @staticmethod
+    def ai_reply(digest: str) -> str:
+        return f"ai:reply:{digest}"
+    
+    @staticmethod
+    def ai_reply_hits() -> str:
+        return "ai:reply:hits"
+    
+    @staticmethod
+    def class_stats(class_name: str) -> str:
+        return f"data:class_stats:{class_name}"
+    
+    @staticmethod
+    def fitness_analytics(grade_code: str, group_by: str) -> str:
+        return f"data:analytics:summary:{grade_code}:{group_by}"
+    
+    @staticmethod
+    def grade_percentiles(grade_code: str) -> str:
+        return f"data:analytics:percentiles:{grade_code}"
+    
     @staticmethod
     def safety_keywords() -> str:
         return "safety:keywords:all"
+    
+    @staticmethod
+    def exercise_index_version() -> str:
+        """动作库版本号（导入后递增，各进程据此重建推荐索引）"""
+        return "exercise:index:version"
+    
+    @staticmethod
+    def tag(tag: str) -> str:
+        """标签集合（登记该标签下的缓存键）"""
+        return f"tag:{tag}"
+
+
+class CacheTags:
+    """缓存标签：写入时登记，数据变化时按标签精确失效"""
+    
+    # 内部资源（资源导入后失效）
+    RESOURCE = "resource"
+    # 年级/全校体测分析（体测数据上传后失效）
+    ANALYTICS = "analytics"
+    
+    @staticmethod
+    def class_name(class_name: str) -> str:
+        """某班级相关的缓存"""
+        return f"class:{class_name}"
 
 
 # 缓存过期时间（秒）
@@ -164,3 +697,97 @@ class CacheExpire:
     HOUR_6 = 21600
     DAY_1 = 86400
     WEEK_1 = 604800
+
+
+def _is_empty(value: Any) -> bool:
+    """空结果（None或空容器）"""
+    if value is None:
+        return True
+    try:
+        return len(value) == 0
+    except TypeError:
+        return False
+
+
+def cached(
+    key: Callable[..., Optional[str]],
+    ttl: int = CacheExpire.HOUR_1,
+    stale_ttl: int = 0,
+    negative_ttl: Optional[int] = CacheExpire.MINUTE_1,
+    tags: Iterable[str] = (),
+    namespace: Optional[str] = None,
+    dump: Optional[Callable[[Any], Any]] = None,
+    load: Optional[Callable[[Any], Any]] = None
+):
+    """
+    异步方法的读穿缓存装饰器
+    
+    - 未命中时同一进程内相同键只计算一次，并发调用共享结果（single-flight）
+    - 超过ttl但未超过ttl+stale_ttl时直接返回旧值，由一个后台任务刷新
+    - 空结果（None或空容器）按negative_ttl缓存，避免反复回源；为None时不缓存空结果
+    
+    后台刷新在原请求结束后执行，依赖请求级资源（如数据库会话）的方法不要设置stale_ttl。
+    
+    Args:
+        key: 由被装饰方法的参数（按参数名传入，含self）生成缓存键，返回None时不走缓存
+        ttl: 新鲜时间（秒）
+        stale_ttl: 过期后仍可返回旧值的时间（秒）
+        negative_ttl: 空结果的缓存时间（秒）
+        tags: 登记的缓存标签（见CacheTags）
+        namespace: 命中率统计的命名空间
+        dump: 结果转为可缓存值
+        load: 缓存值转回结果
+    """
+    tags = list(tags)
+    
+    def decorator(func):
+        signature = inspect.signature(func)
+        flight = SingleFlight()
+        refreshing: Set[asyncio.Task] = set()
+        
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            cache_key = key(**bound.arguments)
+            if cache_key is None:
+                return await func(*args, **kwargs)
+            
+            async def compute():
+                value = await func(*args, **kwargs)
+                stored = dump(value) if dump else value
+                if _is_empty(stored):
+                    if negative_ttl:
+                        entry = {"value": stored, "fresh_until": time.time() + negative_ttl}
+                        await cache_manager.set(cache_key, entry, negative_ttl, tags=tags)
+                else:
+                    entry = {"value": stored, "fresh_until": time.time() + ttl}
+                    await cache_manager.set(cache_key, entry, ttl + stale_ttl, tags=tags)
+                return stored
+            
+            async def revalidate():
+                try:
+                    await flight.do(cache_key, compute)
+                except Exception as e:
+                    logger.warning(f"后台刷新缓存失败 {cache_key}: {e}")
+            
+            entry = await cache_manager.get(cache_key)
+            if isinstance(entry, dict) and "fresh_until" in entry:
+                if time.time() >= entry["fresh_until"]:
+                    performance_metrics.record_cache_stale(namespace)
+                    if cache_key not in flight:
+                        task = asyncio.ensure_future(revalidate())
+                        refreshing.add(task)
+                        task.add_done_callback(refreshing.discard)
+                else:
+                    performance_metrics.record_cache_hit(namespace)
+                stored = entry["value"]
+            else:
+                performance_metrics.record_cache_miss(namespace)
+                stored = await flight.do(cache_key, compute)
+            
+            return load(stored) if load else stored
+        
+        return wrapper
+    
+    return decorator
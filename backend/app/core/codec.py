@@ -0,0 +1,162 @@
+"""
+缓存值编解码
+可选orjson/msgpack序列化，超过阈值时压缩（zstd/lz4/zlib），格式记录在值开头的头部中；
+没有头部的旧值按JSON文本解码，升级前写入的缓存仍可读取
+"""
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+import json
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+# 头部：标记字节 + 格式版本 + 序列化方式 + 压缩方式
+# 0xFF不会出现在UTF-8文本中，据此区分旧的JSON文本值
+MAGIC = b"\xff"
+VERSION = 1
+HEADER_SIZE = 4
+
+# 序列化方式 -> 头部标识
+SERIALIZER_IDS = {"json": 1, "orjson": 2, "msgpack": 3}
+# 压缩方式 -> 头部标识
+COMPRESSION_IDS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def available_serializers() -> Dict[str, Tuple[Callable, Callable]]:
+    """已安装的序列化方式 -> (序列化, 反序列化)"""
+    serializers = {"json": (_json_dumps, json.loads)}
+    if orjson is not None:
+        serializers["orjson"] = (_orjson_dumps, orjson.loads)
+    if msgpack is not None:
+        serializers["msgpack"] = (_msgpack_dumps, _msgpack_loads)
+    return serializers
+
+
+def available_compressions() -> Dict[str, Tuple[Callable, Callable]]:
+    """已安装的压缩方式 -> (压缩, 解压)"""
+    compressions = {
+        "none": (bytes, bytes),
+        "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    }
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=3)
+        decompressor = zstandard.ZstdDecompressor()
+        compressions["zstd"] = (compressor.compress, decompressor.decompress)
+    if lz4_frame is not None:
+        compressions["lz4"] = (lz4_frame.compress, lz4_frame.decompress)
+    return compressions
+
+
+class CacheCodec:
+    """
+    缓存值编解码器
+
+    编码时按配置的方式序列化，序列化结果不小于min_size且压缩后更小时压缩；
+    解码时按头部选择方式，与编码配置无关，因此可随时切换配置
+    """
+
+    def __init__(
+        self,
+        serializer: str = "orjson",
+        compression: str = "zstd",
+        min_size: int = 1024
+    ):
+        self._serializers = available_serializers()
+        self._compressions = available_compressions()
+
+        if serializer not in self._serializers:
+            logger.warning(f"缓存序列化方式 {serializer} 不可用，退回json")
+            serializer = "json"
+        if compression not in self._compressions:
+            fallback = "zlib" if compression in COMPRESSION_IDS else "none"
+            logger.warning(f"缓存压缩方式 {compression} 不可用，退回{fallback}")
+            compression = fallback
+
+        self.serializer = serializer
+        self.compression = compression
+        self.min_size = min_size
+        self._dumps = self._serializers[serializer][0]
+        self._compress = self._compressions[compression][0]
+
+    def encode(self, value: Any) -> bytes:
+        """编码为带头部的字节串"""
+        payload = self._dumps(value)
+        compression = "none"
+        if self.compression != "none" and len(payload) >= self.min_size:
+            compressed = self._compress(payload)
+            if len(compressed) < len(payload):
+                payload, compression = compressed, self.compression
+
+        header = MAGIC + bytes((
+            VERSION, SERIALIZER_IDS[self.serializer], COMPRESSION_IDS[compression]
+        ))
+        return header + payload
+
+    def decode(self, data: Union[bytes, str]) -> Any:
+        """
+        解码缓存值（兼容没有头部的旧JSON文本）
+
+        Raises:
+            ValueError: 头部无效或所需的库未安装
+        """
+        if isinstance(data, str):
+            return json.loads(data)
+        if not data.startswith(MAGIC):
+            return json.loads(data)
+
+        version, serializer_id, compression_id = data[1:HEADER_SIZE]
+        if version != VERSION:
+            raise ValueError(f"不支持的缓存格式版本: {version}")
+        serializer = _name_of(SERIALIZER_IDS, serializer_id)
+        compression = _name_of(COMPRESSION_IDS, compression_id)
+        if serializer not in self._serializers or compression not in self._compressions:
+            raise ValueError(f"缓存值需要未安装的库: {serializer}/{compression}")
+
+        payload = data[HEADER_SIZE:]
+        if compression != "none":
+            payload = self._compressions[compression][1](payload)
+        return self._serializers[serializer][1](payload)
+
+
+def _name_of(ids: Dict[str, int], value: int) -> Optional[str]:
+    for name, identifier in ids.items():
+        if identifier == value:
+            return name
+    return None
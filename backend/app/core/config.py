@@ -2,7 +2,7 @@
 应用配置管理
 """
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -20,6 +20,24 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_EXPIRE_SECONDS: int = 3600  # 默认缓存1小时
     
+    # 进程内一级缓存（位于Redis之前，仅缓存下列命名空间，通过Redis发布订阅跨进程失效）
+    CACHE_L1_ENABLED: bool = True
+    CACHE_L1_MAX_SIZE: int = 1024  # 最多缓存条数，超出淘汰最久未使用的
+    CACHE_L1_TTLS: Dict[str, int] = {  # 键前缀 -> 进程内缓存时间（秒）
+        "safety:keywords": 300,
+        "fitness:standards": 300,
+        "resource:keywords": 300,
+        "data:class_stats": 60,
+        "data:analytics": 60,
+    }
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+    # 同一事件循环轮次内并发的单键读取合并为一次MGET
+    CACHE_AUTO_BATCH: bool = False
+    # 缓存值编码：序列化方式 json/orjson/msgpack，压缩方式 none/zlib/zstd/lz4（未安装时自动退回）
+    CACHE_SERIALIZER: str = "orjson"
+    CACHE_COMPRESSION: str = "zstd"
+    CACHE_COMPRESS_MIN_SIZE: int = 1024  # 序列化后超过该字节数才压缩
+    
     # JWT配置
     SECRET_KEY: str = "your-secret-key-change-in-production-please"
     ALGORITHM: str = "HS256"
@@ -32,6 +50,42 @@ class Settings(BaseSettings):
     # AI服务配置
     OPENAI_API_KEY: Optional[str] = None
     DASHSCOPE_API_KEY: Optional[str] = None
+    # 文本生成接口地址（离线压测时指向 scripts/fake_llm_server.py）
+    AI_BASE_URL: str = "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
+    
+    # 外部HTTP调用配置（共享连接池）
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # 空闲连接保持时间（秒）
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 30.0
+    
+    # AI回复缓存（仅缓存无上下文的问题，按角色提示词分区）
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_TTL: int = 3600
+    AI_CACHE_EARLY_REFRESH_BETA: float = 1.0  # 提前刷新系数，越大越早刷新
+    AI_CACHE_HITS_MAX_MEMBERS: int = 1000  # 命中统计最多保留的问题数（保留命中最多的）
+    
+    # AI上游并发控制
+    AI_MAX_IN_FLIGHT: int = 20  # 同时进行的上游请求数
+    AI_MAX_QUEUE: int = 200  # 等待队列长度
+    AI_QUEUE_TIMEOUT: float = 10.0  # 最长排队时间（秒）
+    
+    # AI上游熔断与对冲请求
+    AI_CIRCUIT_FAILURE_THRESHOLD: int = 5  # 连续失败多少次后熔断
+    AI_CIRCUIT_SLOW_CALL_SECONDS: float = 15.0  # 超过该耗时视为失败
+    AI_CIRCUIT_RECOVERY_TIMEOUT: float = 30.0  # 熔断后多久放行探测请求
+    AI_HEDGE_ENABLED: bool = False
+    AI_HEDGE_PERCENTILE: float = 0.95  # 超过该分位耗时后发起对冲请求
+    AI_HEDGE_MIN_DELAY: float = 1.0  # 对冲等待时间下限（秒）
+    
+    # 数据上传配置
+    UPLOAD_CHUNK_SIZE: int = 1000  # 流式导入每块行数（每块提交一次）
+    IMPORT_WORKERS: int = 2  # 后台导入进程数
+    IMPORT_SPOOL_DIR: str = ""  # 上传文件与任务状态目录，默认系统临时目录
+    IMPORT_JOB_TTL: int = 86400  # 任务状态保留时间（秒）
+    EXERCISE_INDEX_CHECK_INTERVAL: int = 5  # 检查动作库版本号的最短间隔（秒），其他进程导入后据此重建索引
     
     # 文件存储配置
     MINIO_ENDPOINT: str = "localhost:9000"
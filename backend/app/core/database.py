@@ -1,7 +1,8 @@
 """
 数据库配置
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 import os
@@ -33,5 +34,62 @@ def get_db():
 
 def init_db():
     """初始化数据库"""
-    from app.models.student_data import Base
-    Base.metadata.create_all(bind=engine)
+    from app.models import conversation  # noqa: F401  注册对话表
+    from app.models.student_data import Base as StudentDataBase
+    StudentDataBase.metadata.create_all(bind=engine)
+    add_missing_columns(StudentDataBase.metadata)
+    # 业务表由初始化脚本创建，这里只为已有表补列和索引
+    add_missing_columns(Base.metadata)
+    add_missing_indexes(Base.metadata)
+
+
+def add_missing_columns(metadata, bind=None):
+    """
+    为已有表补充模型中新增的列（create_all不会修改已存在的表）
+    只补充可空列和带服务端默认值的非空列，其余非空列无法为已有行取值，跳过
+    
+    Args:
+        metadata: 模型元数据
+        bind: 数据库引擎，默认为全局引擎
+    """
+    bind = bind if bind is not None else engine
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in metadata.tables.values():
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if column.nullable:
+                    column_spec = f"{column.name} {column.type.compile(dialect=bind.dialect)}"
+                elif column.server_default is not None:
+                    # 非空列带上默认值，已有行取默认值
+                    column_spec = CreateColumn(column).compile(dialect=bind.dialect)
+                else:
+                    continue
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_spec}"))
+
+
+def add_missing_indexes(metadata, bind=None):
+    """
+    为已有表创建模型中声明、数据库中还没有的索引（需在补列之后执行）
+    已有索引或主键以相同列开头时视为已覆盖（如初始化SQL中名称不同的同列索引），不重复创建
+    
+    Args:
+        metadata: 模型元数据
+        bind: 数据库引擎，默认为全局引擎
+    """
+    bind = bind if bind is not None else engine
+    inspector = inspect(bind)
+    for table in metadata.tables.values():
+        if not inspector.has_table(table.name):
+            continue
+        covered = [tuple(index['column_names']) for index in inspector.get_indexes(table.name)]
+        covered.append(tuple(inspector.get_pk_constraint(table.name)['constrained_columns']))
+        for index in table.indexes:
+            columns = tuple(column.name for column in index.columns)
+            if any(existing[:len(columns)] == columns for existing in covered):
+                continue
+            index.create(bind=bind)
@@ -0,0 +1,64 @@
+"""
+共享HTTP客户端
+整个应用复用一个连接池，避免每次请求重新建立TCP/TLS连接
+"""
+from typing import Optional
+import httpx
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPClientManager:
+    """HTTP客户端管理器（随应用启动创建、关闭时释放）"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """按配置创建连接池客户端"""
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            settings.HTTP_READ_TIMEOUT,
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+        )
+
+        try:
+            return httpx.AsyncClient(
+                http2=settings.HTTP2_ENABLED,
+                limits=limits,
+                timeout=timeout,
+            )
+        except ImportError:
+            # 未安装h2时退回HTTP/1.1
+            logger.warning("未安装h2，HTTP客户端退回HTTP/1.1")
+            return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    async def start(self):
+        """创建共享客户端"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+            logger.info("HTTP客户端连接池已创建")
+
+    async def close(self):
+        """关闭共享客户端"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("HTTP客户端连接池已关闭")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """获取共享客户端（未启动时按需创建，便于脚本和测试使用）"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+
+# 全局HTTP客户端管理器实例
+http_client_manager = HTTPClientManager()
@@ -0,0 +1,143 @@
+"""
+并发准入控制
+限制同时进行的上游调用数，超出部分按优先级排队，排队超时或队列已满时拒绝
+"""
+from typing import List, Optional, Tuple
+from contextlib import asynccontextmanager
+import asyncio
+import heapq
+import itertools
+import time
+from app.core.performance import performance_metrics
+
+
+class AdmissionRejected(Exception):
+    """请求未获准进入（队列已满或排队超时）"""
+
+
+class AdmissionController:
+    """
+    带优先级等待队列的并发限制器
+
+    priority数值越小越优先；同优先级先到先得。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int,
+        max_queue: int,
+        queue_timeout: Optional[float] = None
+    ):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._queued = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    async def acquire(
+        self,
+        priority: int = 0,
+        timeout: Optional[float] = None
+    ):
+        """
+        获取执行名额
+
+        Args:
+            priority: 优先级（越小越优先）
+            timeout: 最长排队时间（秒），默认使用queue_timeout
+
+        Raises:
+            AdmissionRejected: 队列已满或排队超时
+        """
+        if self._in_flight < self.max_in_flight and not self._queued:
+            self._in_flight += 1
+            self._record(wait_time=0.0)
+            return
+
+        if self._queued >= self.max_queue:
+            self._record(rejected=True)
+            raise AdmissionRejected(f"{self.name}: 等待队列已满")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        self._queued += 1
+        start = time.monotonic()
+        timeout = self.queue_timeout if timeout is None else timeout
+
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._queued -= 1
+            self._record(rejected=True, timed_out=True)
+            raise AdmissionRejected(f"{self.name}: 排队超时")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 名额已分配但调用方被取消，转交给下一个等待者
+                self.release()
+            else:
+                self._queued -= 1
+            raise
+
+        self._record(wait_time=time.monotonic() - start)
+
+    def try_acquire(self) -> bool:
+        """
+        不排队地获取名额（用于可放弃的附加调用，如对冲请求）
+
+        Returns:
+            是否获得名额；有空闲名额且无人排队时才获得
+        """
+        if self._in_flight < self.max_in_flight and not self._queued:
+            self._in_flight += 1
+            self._record(wait_time=0.0)
+            return True
+        return False
+
+    def release(self):
+        """归还名额，优先转交给等待队列中优先级最高的请求"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # 已超时或取消的等待者
+                continue
+            self._queued -= 1
+            future.set_result(None)
+            return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = 0, timeout: Optional[float] = None):
+        """在名额内执行代码块"""
+        await self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _record(
+        self,
+        wait_time: Optional[float] = None,
+        rejected: bool = False,
+        timed_out: bool = False
+    ):
+        """导出指标"""
+        performance_metrics.record_admission(
+            self.name,
+            wait_time=wait_time,
+            rejected=rejected,
+            timed_out=timed_out,
+            queue_depth=self._queued,
+            in_flight=self._in_flight,
+        )
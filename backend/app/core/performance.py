@@ -4,7 +4,7 @@
 import time
 import logging
 from functools import wraps
-from typing import Callable, Any
+from typing import Callable, Any, Optional
 from contextlib import asynccontextmanager
 
 logger = logging.getLogger(__name__)
@@ -67,7 +67,15 @@ class PerformanceMetrics:
             "db_queries": {},
             "cache_hits": 0,
             "cache_misses": 0,
+            "cache_namespaces": {},
+            "cache_tiers": {},
+            "cache_batches": {"count": 0, "keys": 0, "avg_size": 0},
             "ai_requests": 0,
+            "ai_coalesced": 0,
+            "admission": {},
+            "circuits": {},
+            "hedged_requests": 0,
+            "hedged_skipped": 0,
         }
     
     def record_api_call(self, endpoint: str, duration: float):
@@ -100,18 +108,117 @@ class PerformanceMetrics:
         stats["total_time"] += duration
         stats["avg_time"] = stats["total_time"] / stats["count"]
     
-    def record_cache_hit(self):
+    def _namespace_stats(self, namespace: str) -> dict:
+        """获取分命名空间的缓存统计"""
+        namespaces = self.metrics["cache_namespaces"]
+        if namespace not in namespaces:
+            namespaces[namespace] = {"hits": 0, "misses": 0}
+        return namespaces[namespace]
+    
+    def record_cache_hit(self, namespace: Optional[str] = None):
         """记录缓存命中"""
         self.metrics["cache_hits"] += 1
+        if namespace:
+            self._namespace_stats(namespace)["hits"] += 1
+    
+    def record_cache_stale(self, namespace: Optional[str] = None):
+        """记录返回了过期旧值（后台刷新）的缓存读取，计入命中"""
+        self.record_cache_hit(namespace)
+        if namespace:
+            stats = self._namespace_stats(namespace)
+            stats["stale"] = stats.get("stale", 0) + 1
     
-    def record_cache_miss(self):
+    def record_cache_miss(self, namespace: Optional[str] = None):
         """记录缓存未命中"""
         self.metrics["cache_misses"] += 1
+        if namespace:
+            self._namespace_stats(namespace)["misses"] += 1
+    
+    def record_cache_tier(self, tier: str, hit: bool):
+        """记录分层缓存（l1进程内 / l2 Redis）的命中情况"""
+        tiers = self.metrics["cache_tiers"]
+        if tier not in tiers:
+            tiers[tier] = {"hits": 0, "misses": 0, "hit_rate": 0.0}
+        
+        stats = tiers[tier]
+        stats["hits" if hit else "misses"] += 1
+        stats["hit_rate"] = stats["hits"] / (stats["hits"] + stats["misses"])
+    
+    def record_cache_batch(self, size: int):
+        """记录一次批量读取Redis（MGET）及其键数"""
+        stats = self.metrics["cache_batches"]
+        stats["count"] += 1
+        stats["keys"] += size
+        stats["avg_size"] = stats["keys"] / stats["count"]
     
     def record_ai_request(self):
         """记录AI请求"""
         self.metrics["ai_requests"] += 1
     
+    def record_ai_coalesced(self):
+        """记录被合并的AI请求（共享进行中的上游调用）"""
+        self.metrics["ai_coalesced"] += 1
+    
+    def record_admission(
+        self,
+        name: str,
+        wait_time: Optional[float] = None,
+        rejected: bool = False,
+        timed_out: bool = False,
+        queue_depth: int = 0,
+        in_flight: int = 0
+    ):
+        """记录并发准入情况（排队等待、拒绝、队列深度）"""
+        if name not in self.metrics["admission"]:
+            self.metrics["admission"][name] = {
+                "admitted": 0,
+                "rejected": 0,
+                "timed_out": 0,
+                "total_wait": 0,
+                "avg_wait": 0,
+                "max_wait": 0,
+                "queue_depth": 0,
+                "max_queue_depth": 0,
+                "in_flight": 0,
+            }
+        
+        stats = self.metrics["admission"][name]
+        if rejected:
+            stats["rejected"] += 1
+            if timed_out:
+                stats["timed_out"] += 1
+        if wait_time is not None:
+            stats["admitted"] += 1
+            stats["total_wait"] += wait_time
+            stats["avg_wait"] = stats["total_wait"] / stats["admitted"]
+            stats["max_wait"] = max(stats["max_wait"], wait_time)
+        stats["queue_depth"] = queue_depth
+        stats["max_queue_depth"] = max(stats["max_queue_depth"], queue_depth)
+        stats["in_flight"] = in_flight
+    
+    def record_circuit(self, name: str, state: str, rejected: bool = False):
+        """记录熔断器状态变化和被拒绝的调用"""
+        if name not in self.metrics["circuits"]:
+            self.metrics["circuits"][name] = {
+                "state": "closed",
+                "opened": 0,
+                "rejected": 0,
+            }
+        
+        stats = self.metrics["circuits"][name]
+        if state == "open" and stats["state"] != "open":
+            stats["opened"] += 1
+        stats["state"] = state
+        if rejected:
+            stats["rejected"] += 1
+    
+    def record_hedged(self, skipped: bool = False):
+        """记录发起的对冲请求；skipped表示并发名额已满而放弃对冲"""
+        if skipped:
+            self.metrics["hedged_skipped"] += 1
+        else:
+            self.metrics["hedged_requests"] += 1
+    
     def get_cache_hit_rate(self) -> float:
         """获取缓存命中率"""
         total = self.metrics["cache_hits"] + self.metrics["cache_misses"]
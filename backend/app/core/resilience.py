@@ -0,0 +1,227 @@
+"""
+上游调用容错：熔断器、延迟统计与对冲请求
+"""
+from typing import Any, Awaitable, Callable, Optional, Tuple, Type
+from collections import deque
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import time
+from app.core.performance import performance_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用被直接拒绝"""
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败（含慢调用）达到阈值后打开，期间直接拒绝调用；
+    经过恢复时间后进入半开状态，放行少量探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        slow_call_threshold: Optional[float] = None,
+        half_open_max_calls: int = 1,
+        ignore: Tuple[Type[BaseException], ...] = ()
+    ):
+        """
+        Args:
+            name: 名称（用于指标）
+            failure_threshold: 打开熔断所需的连续失败次数
+            recovery_timeout: 打开后多久进入半开状态（秒）
+            slow_call_threshold: 超过该耗时（秒）的调用视为失败
+            half_open_max_calls: 半开状态同时放行的探测请求数
+            ignore: 不计入成功或失败的异常类型
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.slow_call_threshold = slow_call_threshold
+        self.half_open_max_calls = half_open_max_calls
+        self.ignore = ignore
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        """当前状态（打开超过恢复时间后视为半开）"""
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_timeout
+        ):
+            self._set_state(self.HALF_OPEN)
+        return self._state
+
+    def check(self):
+        """
+        检查是否允许调用（不占用探测名额）
+
+        Raises:
+            CircuitOpenError: 熔断器打开或半开探测名额已满
+        """
+        state = self.state
+        if state == self.OPEN or (
+            state == self.HALF_OPEN and self._probes >= self.half_open_max_calls
+        ):
+            performance_metrics.record_circuit(self.name, state, rejected=True)
+            raise CircuitOpenError(f"{self.name}: 熔断中")
+
+    @asynccontextmanager
+    async def guard(self, track_slow: bool = True):
+        """
+        在熔断保护下执行代码块，并根据结果更新状态
+
+        Args:
+            track_slow: 是否将慢调用计为失败（流式调用应关闭）
+        """
+        self.check()
+        probing = self._state == self.HALF_OPEN
+        if probing:
+            self._probes += 1
+
+        start = time.monotonic()
+        try:
+            yield
+        except self.ignore:
+            raise
+        except BaseException as e:
+            if not isinstance(e, (asyncio.CancelledError, GeneratorExit)):
+                self.record_failure()
+            raise
+        else:
+            elapsed = time.monotonic() - start
+            if (
+                track_slow
+                and self.slow_call_threshold is not None
+                and elapsed > self.slow_call_threshold
+            ):
+                logger.warning(f"{self.name} 慢调用 {elapsed:.2f}秒")
+                self.record_failure()
+            else:
+                self.record_success()
+        finally:
+            if probing:
+                self._probes -= 1
+
+    def record_success(self):
+        """记录成功调用"""
+        self._failures = 0
+        if self._state != self.CLOSED:
+            logger.info(f"{self.name} 熔断恢复")
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        """记录失败调用"""
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning(f"{self.name} 熔断打开（连续失败{self._failures}次）")
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def _set_state(self, state: str):
+        self._state = state
+        performance_metrics.record_circuit(self.name, state)
+
+
+class LatencyTracker:
+    """滑动窗口延迟统计"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, duration: float):
+        """记录一次耗时（秒）"""
+        self._samples.append(duration)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        计算分位数
+
+        Args:
+            p: 分位（0~1）
+
+        Returns:
+            分位耗时；样本不足时返回None
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(p * len(ordered)))
+        return ordered[index]
+
+
+async def hedged(
+    func: Callable[[], Awaitable[Any]],
+    delay: Optional[float],
+    try_acquire: Optional[Callable[[], bool]] = None,
+    release: Optional[Callable[[], None]] = None
+) -> Any:
+    """
+    对冲请求：首次调用超过delay仍未完成时发起第二次调用，
+    取先成功的结果并取消另一个
+
+    Args:
+        func: 无参异步函数（每次调用发起一次独立请求）
+        delay: 发起对冲前的等待时间（秒），None表示不对冲
+        try_acquire: 发起对冲前不等待地获取并发名额，获取失败时不对冲、继续等待首次调用
+        release: 对冲调用结束后归还名额
+
+    Returns:
+        先成功的调用结果；全部失败时抛出最后一个异常
+    """
+    first = asyncio.ensure_future(func())
+    if delay is None:
+        return await first
+
+    pending = {first}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return first.result()
+
+        if try_acquire is not None and not try_acquire():
+            performance_metrics.record_hedged(skipped=True)
+            return await first
+
+        async def hedge():
+            try:
+                return await func()
+            finally:
+                if release is not None:
+                    release()
+
+        performance_metrics.record_hedged()
+        pending.add(asyncio.ensure_future(hedge()))
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,59 @@
+"""
+进行中请求合并（single-flight）
+相同键的并发调用只执行一次，所有等待者共享结果
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """进行中请求合并器"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        执行调用；已有相同键的调用在进行时直接等待其结果
+
+        Args:
+            key: 合并键
+            func: 无参异步函数
+
+        Returns:
+            调用结果（异常同样会传递给所有等待者）
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.stats["calls"] += 1
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.stats["shared"] += 1
+            logger.debug(f"合并进行中的请求: {key}")
+
+        # shield：单个等待者被取消不影响其他等待者
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        """调用完成后移除，后续请求重新发起"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 取出异常，避免无人等待时产生“未获取异常”警告
+        if not task.cancelled():
+            task.exception()
@@ -6,7 +6,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api import auth, chat, conversation, fitness, data_upload
 from app.core.config import settings
 from app.core.cache import cache_manager
+from app.core.http_client import http_client_manager
 from app.core.database import init_db
+from app.services.exercise_index import exercise_index
+from app.services.import_job_service import import_job_service
 from app.middleware.security import (
     RateLimitMiddleware,
     SecurityHeadersMiddleware,
@@ -86,11 +89,16 @@ async def startup_event():
     # 初始化数据库
     init_db()
     await cache_manager.connect()
+    # 构建动作推荐索引并记录动作库版本号
+    await exercise_index.ensure_current(force=True)
+    await http_client_manager.start()
     logging.info("应用启动完成")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭事件"""
+    await http_client_manager.close()
     await cache_manager.disconnect()
+    import_job_service.shutdown()
     logging.info("应用已关闭")
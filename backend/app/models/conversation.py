@@ -1,7 +1,7 @@
 """
 对话会话数据模型
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -20,6 +20,15 @@ class Conversation(Base):
         server_default=func.now(),
         onupdate=func.now()
     )
+    # 冗余的最后一条消息信息，写消息时同事务维护，列表只读本表
+    last_message_preview = Column(String(200))
+    last_message_at = Column(DateTime(timezone=True))
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # 对话列表：按用户筛选、按更新时间倒序
+        Index("ix_conversations_user_updated", "user_id", "updated_at"),
+    )
 
     # 关系
     user = relationship("User", back_populates="conversations")
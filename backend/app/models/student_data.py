@@ -87,6 +87,7 @@ class StudentFitnessData(Base):
     total_level = Column(String(20), comment="总分等级")
     
     # 元数据
+    row_hash = Column(String(16), comment="导入内容指纹（内容未变化时跳过写入）")
     upload_time = Column(DateTime, default=datetime.now, comment="上传时间")
     update_time = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
 
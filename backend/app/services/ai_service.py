@@ -1,9 +1,54 @@
 """
 AI服务 - 集成通义千问
 """
-from typing import List, Dict, Optional
-import httpx
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import time
+import unicodedata
+from app.core.cache import cache_manager, CacheKeys, CacheExpire
 from app.core.config import settings
+from app.core.http_client import http_client_manager
+from app.core.limiter import AdmissionController, AdmissionRejected
+from app.core.performance import performance_metrics
+from app.core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    hedged,
+)
+from app.core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class AIServiceError(Exception):
+    """上游AI服务调用失败"""
+
+
+# 排队优先级（数值越小越优先）：教师、管理员优先于学生
+ROLE_PRIORITY = {
+    'admin': 0,
+    'teacher': 0,
+    'parent': 1,
+    'student': 2,
+}
+ANONYMOUS_PRIORITY = 3
+
+
+def normalize_message(text: str) -> str:
+    """
+    归一化用户消息，用于判断“同一个问题”
+    全角转半角、去除首尾空白和句末标点、合并连续空白、统一小写
+    """
+    text = unicodedata.normalize('NFKC', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = text.rstrip('?!.~。？！～ ')
+    return text.lower()
 
 
 class AIService:
@@ -11,12 +56,31 @@ class AIService:
     
     def __init__(self):
         self.api_key = settings.DASHSCOPE_API_KEY
-        self.base_url = "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
+        self.base_url = settings.AI_BASE_URL
+        # 相同角色、相同问题的并发请求共享一次上游调用
+        self._inflight = SingleFlight()
+        # 上游并发上限与优先级排队
+        self._admission = AdmissionController(
+            "ai_upstream",
+            max_in_flight=settings.AI_MAX_IN_FLIGHT,
+            max_queue=settings.AI_MAX_QUEUE,
+            queue_timeout=settings.AI_QUEUE_TIMEOUT
+        )
+        # 上游持续失败或变慢时熔断，快速返回兜底文案
+        self._breaker = CircuitBreaker(
+            "ai_upstream",
+            failure_threshold=settings.AI_CIRCUIT_FAILURE_THRESHOLD,
+            recovery_timeout=settings.AI_CIRCUIT_RECOVERY_TIMEOUT,
+            slow_call_threshold=settings.AI_CIRCUIT_SLOW_CALL_SECONDS
+        )
+        # 上游耗时分布，用于计算对冲请求的等待时间
+        self._latency = LatencyTracker()
     
     async def chat(
         self,
         messages: List[Dict[str, str]],
-        user_role: str = "student"
+        user_role: str = "student",
+        anonymous: bool = False
     ) -> str:
         """
         AI对话
@@ -24,48 +88,303 @@ class AIService:
         Args:
             messages: 对话历史
             user_role: 用户角色
+            anonymous: 是否未登录用户（排队优先级最低）
             
         Returns:
             AI回复内容
         """
-        # 根据角色设置系统提示词
-        system_prompt = self._get_system_prompt(user_role)
+        full_messages = self._build_messages(messages, user_role)
+        priority = self._priority(user_role, anonymous)
         
-        # 构建完整消息
-        full_messages = [
-            {'role': 'system', 'content': system_prompt}
-        ] + messages
+        key = self._coalesce_key(messages, user_role)
+        if key is None:
+            return await self._complete(full_messages, priority)
         
-        # 调用通义千问API
+        if key in self._inflight:
+            performance_metrics.record_ai_coalesced()
+        return await self._inflight.do(
+            key, lambda: self._cached_complete(key, full_messages, priority)
+        )
+    
+    def _priority(self, user_role: str, anonymous: bool) -> int:
+        """排队优先级"""
+        if anonymous:
+            return ANONYMOUS_PRIORITY
+        return ROLE_PRIORITY.get(user_role, ROLE_PRIORITY['student'])
+    
+    def _coalesce_key(
+        self,
+        messages: List[Dict[str, str]],
+        user_role: str
+    ) -> Optional[Tuple[str, str]]:
+        """
+        请求合并键：仅无上下文的单条用户消息可以合并
+        
+        Returns:
+            (角色, 归一化消息)，不可合并时返回None
+        """
+        if len(messages) != 1 or messages[0].get('role') != 'user':
+            return None
+        return (user_role, normalize_message(messages[0].get('content', '')))
+    
+    async def _complete(
+        self,
+        full_messages: List[Dict[str, str]],
+        priority: int = 0
+    ) -> str:
+        """调用通义千问API，失败时返回兜底文案"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.base_url,
-                    headers={
-                        'Authorization': f'Bearer {self.api_key}',
-                        'Content-Type': 'application/json'
-                    },
-                    json={
-                        'model': 'qwen-turbo',
-                        'input': {
-                            'messages': full_messages
-                        },
-                        'parameters': {
-                            'result_format': 'message'
-                        }
-                    },
-                    timeout=30.0
+            return await self._request(full_messages, priority)
+        except Exception as e:
+            logger.warning(f"AI服务调用失败: {e}")
+            return self._fallback_reply(e)
+    
+    def _fallback_reply(self, error: Exception) -> str:
+        """调用失败时的兜底文案"""
+        if isinstance(error, AdmissionRejected):
+            return "当前咨询人数较多，请稍后再试。"
+        if isinstance(error, (AIServiceError, CircuitOpenError)):
+            return "抱歉，AI服务暂时不可用，请稍后再试。"
+        return "抱歉，AI服务出现异常，请稍后再试。"
+    
+    async def _request(
+        self,
+        full_messages: List[Dict[str, str]],
+        priority: int = 0
+    ) -> str:
+        """
+        调用通义千问API（受熔断、并发准入控制，可选对冲请求）
+        
+        Raises:
+            CircuitOpenError: 熔断中
+            AdmissionRejected: 排队超时或队列已满
+            AIServiceError: 上游返回非200状态码
+        """
+        # 熔断时不进入排队，直接失败
+        self._breaker.check()
+        
+        async with self._admission.slot(priority):
+            async with self._breaker.guard():
+                # 对冲请求另占名额，名额已满时不对冲
+                return await hedged(
+                    lambda: self._post(full_messages),
+                    self._hedge_delay(),
+                    try_acquire=self._admission.try_acquire,
+                    release=self._admission.release
                 )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result['output']['choices'][0]['message']['content']
-                else:
-                    return "抱歉，AI服务暂时不可用，请稍后再试。"
+    
+    async def _post(self, full_messages: List[Dict[str, str]]) -> str:
+        """发送一次请求并解析回复"""
+        performance_metrics.record_ai_request()
+        start = time.monotonic()
+        response = await http_client_manager.client.post(
+            self.base_url,
+            headers=self._headers(),
+            json=self._build_payload(full_messages)
+        )
+        
+        if response.status_code != 200:
+            raise AIServiceError(f"状态码 {response.status_code}")
+        
+        result = response.json()
+        self._latency.record(time.monotonic() - start)
+        return result['output']['choices'][0]['message']['content']
+    
+    def _hedge_delay(self) -> Optional[float]:
+        """对冲请求等待时间：近期耗时的高分位；未启用或样本不足时不对冲"""
+        if not settings.AI_HEDGE_ENABLED:
+            return None
+        delay = self._latency.percentile(settings.AI_HEDGE_PERCENTILE)
+        if delay is None:
+            return None
+        return max(delay, settings.AI_HEDGE_MIN_DELAY)
+    
+    async def _cached_complete(
+        self,
+        key: Tuple[str, str],
+        full_messages: List[Dict[str, str]],
+        priority: int = 0
+    ) -> str:
+        """
+        带回复缓存的调用
+        
+        缓存键由角色系统提示词和归一化消息组成；条目临近过期时按概率提前刷新
+        （XFetch），避免热点问题同时过期、所有进程一起回源。失败的回复不缓存。
+        """
+        if not settings.AI_CACHE_ENABLED:
+            return await self._complete(full_messages, priority)
         
+        system_prompt = full_messages[0]['content']
+        question = key[1]
+        digest = hashlib.sha1(
+            f"{system_prompt}\x00{question}".encode('utf-8')
+        ).hexdigest()
+        cache_key = CacheKeys.ai_reply(digest)
+        
+        entry = await cache_manager.get(cache_key)
+        if entry and not self._should_refresh(entry):
+            performance_metrics.record_cache_hit("ai:reply")
+            await cache_manager.incr_score(
+                CacheKeys.ai_reply_hits(),
+                f"{key[0]}:{question}",
+                expire=CacheExpire.WEEK_1,
+                max_members=settings.AI_CACHE_HITS_MAX_MEMBERS
+            )
+            return entry['reply']
+        performance_metrics.record_cache_miss("ai:reply")
+        
+        start = time.monotonic()
+        try:
+            reply = await self._request(full_messages, priority)
         except Exception as e:
-            print(f"AI服务调用失败: {e}")
-            return "抱歉，AI服务出现异常，请稍后再试。"
+            logger.warning(f"AI服务调用失败: {e}")
+            if entry:
+                # 刷新失败时继续使用旧回复
+                return entry['reply']
+            return self._fallback_reply(e)
+        
+        ttl = settings.AI_CACHE_TTL
+        await cache_manager.set(
+            cache_key,
+            {
+                'reply': reply,
+                'delta': time.monotonic() - start,  # 生成耗时，决定提前刷新的幅度
+                'expires_at': time.time() + ttl,
+            },
+            ttl
+        )
+        return reply
+    
+    def _should_refresh(self, entry: Dict) -> bool:
+        """
+        XFetch提前刷新判定
+        
+        剩余时间越短、生成越慢，越可能由某个请求提前刷新
+        """
+        delta = entry.get('delta') or 0.0
+        expires_at = entry.get('expires_at')
+        if expires_at is None:
+            return False
+        beta = settings.AI_CACHE_EARLY_REFRESH_BETA
+        # random()可能为0，取下限避免log(0)
+        jitter = -delta * beta * math.log(max(random.random(), 1e-12))
+        return time.time() + jitter >= expires_at
+    
+    async def get_cache_stats(self, limit: int = 20) -> List[Dict]:
+        """
+        回复缓存命中统计
+        
+        Returns:
+            按命中次数降序的问题列表
+        """
+        top = await cache_manager.top_scores(CacheKeys.ai_reply_hits(), limit)
+        stats = []
+        for member, hits in top:
+            role, _, question = member.partition(':')
+            stats.append({'role': role, 'question': question, 'hits': int(hits)})
+        return stats
+    
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        user_role: str = "student",
+        anonymous: bool = False
+    ) -> AsyncIterator[str]:
+        """
+        流式AI对话（DashScope增量输出）
+        
+        Args:
+            messages: 对话历史
+            user_role: 用户角色
+            anonymous: 是否未登录用户（排队优先级最低）
+            
+        Yields:
+            新生成的文本片段；开始输出前失败时输出兜底文案
+            
+        Raises:
+            AIServiceError: 已输出部分内容后上游中断
+        """
+        full_messages = self._build_messages(messages, user_role)
+        started = False
+        
+        try:
+            self._breaker.check()
+            async with self._admission.slot(self._priority(user_role, anonymous)):
+                performance_metrics.record_ai_request()
+                # 流式调用总耗时取决于回复长度，只统计连接失败和错误状态
+                async with self._breaker.guard(track_slow=False):
+                    async with http_client_manager.client.stream(
+                        "POST",
+                        self.base_url,
+                        headers=self._headers(stream=True),
+                        json=self._build_payload(full_messages, stream=True)
+                    ) as response:
+                        if response.status_code != 200:
+                            raise AIServiceError(f"状态码 {response.status_code}")
+                        
+                        async for line in response.aiter_lines():
+                            # SSE数据行格式：data:{...}
+                            if not line.startswith('data:'):
+                                continue
+                            result = json.loads(line[5:])
+                            choices = result.get('output', {}).get('choices') or []
+                            if not choices:
+                                continue
+                            delta = choices[0].get('message', {}).get('content')
+                            if delta:
+                                started = True
+                                yield delta
+        
+        except (AdmissionRejected, CircuitOpenError, AIServiceError) as e:
+            logger.warning(f"AI流式请求失败: {e}")
+            if started:
+                raise AIServiceError(f"流式回复中断: {e}") from e
+            yield self._fallback_reply(e)
+        except Exception as e:
+            logger.exception(f"AI流式服务调用失败: {e}")
+            if started:
+                raise AIServiceError(f"流式回复中断: {e}") from e
+            yield "抱歉，AI服务出现异常，请稍后再试。"
+    
+    def _build_messages(
+        self,
+        messages: List[Dict[str, str]],
+        user_role: str
+    ) -> List[Dict[str, str]]:
+        """根据角色添加系统提示词，构建完整消息"""
+        system_prompt = self._get_system_prompt(user_role)
+        return [
+            {'role': 'system', 'content': system_prompt}
+        ] + messages
+    
+    def _headers(self, stream: bool = False) -> Dict[str, str]:
+        """请求头"""
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+        if stream:
+            headers['Accept'] = 'text/event-stream'
+            headers['X-DashScope-SSE'] = 'enable'
+        return headers
+    
+    def _build_payload(
+        self,
+        full_messages: List[Dict[str, str]],
+        stream: bool = False
+    ) -> Dict:
+        """请求体"""
+        parameters = {'result_format': 'message'}
+        if stream:
+            # 增量输出：每个事件只包含新生成的内容
+            parameters['incremental_output'] = True
+        return {
+            'model': 'qwen-turbo',
+            'input': {
+                'messages': full_messages
+            },
+            'parameters': parameters
+        }
     
     def _get_system_prompt(self, role: str) -> str:
         """
@@ -0,0 +1,123 @@
+"""
+班级体测统计服务
+在数据库端聚合，结果按班级缓存，上传涉及该班级时失效
+"""
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.cache import cache_manager, CacheKeys, CacheExpire, CacheTags
+from app.core.performance import performance_metrics
+from app.models.student_data import StudentFitnessData
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 学生列表可选字段（输出名 -> 列），level为total_level的别名
+STUDENT_FIELDS = {
+    column.name: column for column in StudentFitnessData.__table__.columns
+    if column.name not in ('id', 'row_hash')
+}
+STUDENT_FIELDS['level'] = StudentFitnessData.__table__.columns['total_level']
+
+DEFAULT_STUDENT_FIELDS = ['student_id', 'gender', 'total_score', 'level']
+
+
+class ClassStatsService:
+    """班级统计服务"""
+
+    def compute(self, db: Session, class_name: str) -> Optional[Dict]:
+        """
+        聚合查询班级统计
+
+        Args:
+            db: 数据库会话
+            class_name: 班级名称
+
+        Returns:
+            统计结果；班级不存在返回None
+        """
+        total_count, score_sum = db.query(
+            func.count(StudentFitnessData.id),
+            func.sum(StudentFitnessData.total_score)
+        ).filter(
+            StudentFitnessData.class_name == class_name
+        ).one()
+
+        if not total_count:
+            return None
+
+        levels = db.query(
+            StudentFitnessData.total_level,
+            func.count(StudentFitnessData.id)
+        ).filter(
+            StudentFitnessData.class_name == class_name
+        ).group_by(StudentFitnessData.total_level).all()
+
+        level_stats = {}
+        for level, count in levels:
+            # 空等级与原先一样归入"未知"
+            key = level or "未知"
+            level_stats[key] = level_stats.get(key, 0) + count
+
+        return {
+            "class_name": class_name,
+            "total_count": total_count,
+            # 平均分按全班人数计算（无成绩的学生计0分）
+            "avg_score": round((score_sum or 0) / total_count, 2),
+            "level_stats": level_stats,
+        }
+
+    async def get_stats(self, db: Session, class_name: str) -> Optional[Dict]:
+        """获取班级统计（优先读缓存）"""
+        cache_key = CacheKeys.class_stats(class_name)
+        cached = await cache_manager.get(cache_key)
+        if cached:
+            performance_metrics.record_cache_hit("class_stats")
+            return cached
+        performance_metrics.record_cache_miss("class_stats")
+
+        stats = self.compute(db, class_name)
+        if stats:
+            await cache_manager.set(
+                cache_key, stats, CacheExpire.HOUR_1,
+                tags=[CacheTags.class_name(class_name)]
+            )
+        return stats
+
+    def list_students(
+        self,
+        db: Session,
+        class_name: str,
+        fields: List[str],
+        skip: int = 0,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        分页查询班级学生，只查询需要的列
+
+        Args:
+            db: 数据库会话
+            class_name: 班级名称
+            fields: 输出字段（见STUDENT_FIELDS）
+            skip: 跳过条数
+            limit: 返回条数，None表示不限
+
+        Returns:
+            学生列表
+        """
+        query = db.query(*[STUDENT_FIELDS[field] for field in fields]).filter(
+            StudentFitnessData.class_name == class_name
+        ).order_by(StudentFitnessData.id).offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+
+        return [dict(zip(fields, row)) for row in query.all()]
+
+    async def invalidate(self, class_names: Iterable[str]):
+        """使班级相关缓存失效"""
+        await cache_manager.invalidate_tags(*[CacheTags.class_name(name) for name in class_names])
+
+
+# 创建全局服务实例
+class_stats_service = ClassStatsService()
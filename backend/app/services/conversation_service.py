@@ -0,0 +1,204 @@
+"""
+对话列表服务
+对话表冗余最后一条消息的预览、时间和消息数，列表只查对话表，按 (updated_at, id) 游标分页
+"""
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
+from sqlalchemy import Select, Update, and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.conversation import Conversation
+from app.models.message import Message
+
+# 最后一条消息预览的长度（字符）
+PREVIEW_LENGTH = 50
+
+# 每页最大条数
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(updated_at: datetime, conversation_id: int) -> str:
+    """由一页最后一个对话的 (updated_at, id) 生成游标"""
+    raw = f"{updated_at.isoformat()}|{conversation_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析游标
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        updated_at, conversation_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(updated_at), int(conversation_id)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError(f"无效的游标: {cursor}") from e
+
+
+def build_list_query(
+    user_id: int,
+    limit: int,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    skip: int = 0
+) -> Select:
+    """
+    构建对话列表查询（只读conversations表，走 (user_id, updated_at) 索引）
+
+    Args:
+        user_id: 用户ID
+        limit: 返回条数
+        cursor: 上一页最后一个对话的 (updated_at, id)
+        skip: 跳过条数（兼容旧的偏移分页）
+
+    Returns:
+        每行为 (id, title, updated_at, last_message_preview, message_count) 的查询
+    """
+    query = select(
+        Conversation.id,
+        Conversation.title,
+        Conversation.updated_at,
+        Conversation.last_message_preview,
+        Conversation.message_count
+    ).where(Conversation.user_id == user_id)
+    if cursor is not None:
+        updated_at, conversation_id = cursor
+        query = query.where(or_(
+            Conversation.updated_at < updated_at,
+            and_(Conversation.updated_at == updated_at, Conversation.id < conversation_id)
+        ))
+    return query.order_by(
+        Conversation.updated_at.desc(), Conversation.id.desc()
+    ).offset(skip).limit(limit)
+
+
+def build_record_statement(conversation_id: int, last_text: str, count: int) -> Update:
+    """
+    构建写入消息后更新对话冗余字段的语句
+
+    计数在数据库端累加，并发写同一对话时不会丢失；updated_at由onupdate一并刷新
+
+    Args:
+        conversation_id: 对话ID
+        last_text: 最后一条消息内容
+        count: 新增消息数
+    """
+    return update(Conversation).where(Conversation.id == conversation_id).values(
+        last_message_preview=last_text[:PREVIEW_LENGTH],
+        last_message_at=func.now(),
+        message_count=Conversation.message_count + count
+    ).execution_options(synchronize_session=False)
+
+
+def build_backfill_statement(start_id: int, end_id: int) -> Update:
+    """
+    构建回填对话冗余字段的语句（处理 start_id <= id < end_id 的对话）
+
+    Args:
+        start_id: 起始对话ID（含）
+        end_id: 结束对话ID（不含）
+    """
+    messages = select(Message).where(Message.conversation_id == Conversation.id)
+    last_message = messages.order_by(Message.created_at.desc(), Message.id.desc()).limit(1)
+
+    return update(Conversation).where(
+        Conversation.id >= start_id, Conversation.id < end_id
+    ).values(
+        last_message_preview=last_message.with_only_columns(
+            func.substr(Message.content, 1, PREVIEW_LENGTH)
+        ).scalar_subquery(),
+        last_message_at=messages.with_only_columns(func.max(Message.created_at)).scalar_subquery(),
+        message_count=messages.with_only_columns(func.count(Message.id)).scalar_subquery(),
+        # 回填不应改变列表顺序
+        updated_at=Conversation.updated_at
+    ).execution_options(synchronize_session=False)
+
+
+def build_page(rows, limit: int) -> Dict:
+    """
+    查询结果转为接口返回格式（查询时多取一条用于判断是否还有下一页）
+
+    Args:
+        rows: build_list_query的结果，最多limit+1行
+        limit: 每页条数
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    conversations: List[Dict] = [
+        {
+            "id": row.id,
+            "title": row.title or "未命名对话",
+            "lastMessage": row.last_message_preview or "",
+            "messageCount": row.message_count,
+            "updated_at": row.updated_at.isoformat() if row.updated_at else None
+        }
+        for row in rows
+    ]
+
+    next_cursor = None
+    if has_more and rows[-1].updated_at is not None:
+        next_cursor = encode_cursor(rows[-1].updated_at, rows[-1].id)
+
+    return {
+        "conversations": conversations,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+    }
+
+
+class ConversationService:
+    """对话列表服务"""
+
+    async def list_conversations(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        skip: int = 0
+    ) -> Dict:
+        """
+        分页获取用户的对话列表（单条查询，不访问消息表）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            limit: 每页条数
+            cursor: 上一页返回的next_cursor
+            skip: 跳过条数
+
+        Returns:
+            对话列表、是否还有下一页及下一页游标
+
+        Raises:
+            ValueError: 游标格式无效
+        """
+        position = decode_cursor(cursor) if cursor else None
+        result = await db.execute(build_list_query(user_id, limit + 1, position, skip))
+        return build_page(result.all(), limit)
+
+    def record_messages(
+        self,
+        db: Session,
+        conversation_id: int,
+        last_text: str,
+        count: int
+    ):
+        """
+        写入消息后更新对话的冗余字段（与消息在同一事务中，由调用方提交）
+
+        Args:
+            db: 数据库会话
+            conversation_id: 对话ID
+            last_text: 最后一条消息内容
+            count: 新增消息数
+        """
+        db.execute(build_record_statement(conversation_id, last_text, count))
+
+
+# 创建全局服务实例
+conversation_service = ConversationService()
@@ -0,0 +1,413 @@
+"""
+体测数据与动作库批量导入服务
+按列向量化清洗数据，一次查询已存在记录，批量写入；大文件分块流式导入
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+import logging
+import sqlite3
+import numpy as np
+import pandas as pd
+from sqlalchemy import Float, Integer, Row
+from sqlalchemy.orm import Session
+from app.models.student_data import SportsExercise, StudentFitnessData
+
+logger = logging.getLogger(__name__)
+
+
+# 表头 -> 字段 映射（新增与更新共用）
+FITNESS_FIELD_MAP = {
+    '年级编号': 'grade_code',
+    '年级': 'grade_name',
+    '班级名称': 'class_name',
+    '学生编号': 'student_id',
+    '性别': 'gender',
+    '身高': 'height',
+    '体重': 'weight',
+    '体重评分': 'weight_score',
+    '体重等级': 'weight_level',
+    '肺活量': 'lung_capacity',
+    '肺活量评分': 'lung_capacity_score',
+    '肺活量等级': 'lung_capacity_level',
+    '50米跑': 'run_50m',
+    '50米跑评分': 'run_50m_score',
+    '50米跑等级': 'run_50m_level',
+    '坐位体前屈': 'sit_reach',
+    '坐位体前屈评分': 'sit_reach_score',
+    '坐位体前屈等级': 'sit_reach_level',
+    '一分钟仰卧起坐': 'sit_up',
+    '一分钟仰卧起坐评分': 'sit_up_score',
+    '一分钟仰卧起坐等级': 'sit_up_level',
+    '一分钟仰卧起坐附加分': 'sit_up_bonus',
+    '一分钟跳绳': 'rope_skip',
+    '一分钟跳绳评分': 'rope_skip_score',
+    '一分钟跳绳等级': 'rope_skip_level',
+    '一分钟跳绳附加分': 'rope_skip_bonus',
+    '立定跳远': 'standing_jump',
+    '立定跳远评分': 'standing_jump_score',
+    '立定跳远等级': 'standing_jump_level',
+    '800米跑': 'run_800m',
+    '800米跑评分': 'run_800m_score',
+    '800米跑等级': 'run_800m_level',
+    '800米跑附加分': 'run_800m_bonus',
+    '1000米跑': 'run_1000m',
+    '1000米跑评分': 'run_1000m_score',
+    '1000米跑等级': 'run_1000m_level',
+    '1000米跑附加分': 'run_1000m_bonus',
+    '引体向上': 'pull_up',
+    '引体向上评分': 'pull_up_score',
+    '引体向上等级': 'pull_up_level',
+    '引体向上附加分': 'pull_up_bonus',
+    '50米×8往返跑': 'run_50m_8',
+    '50米×8往返跑评分': 'run_50m_8_score',
+    '50米×8往返跑等级': 'run_50m_8_level',
+    '标准分': 'standard_score',
+    '附加分': 'bonus_score',
+    '总分': 'total_score',
+    '总分等级': 'total_level',
+}
+
+# 动作库表头 -> 字段 映射
+EXERCISE_FIELD_MAP = {
+    '名称': 'name',
+    '来源': 'source',
+    '编号': 'code',
+    '说明': 'description',
+    '使用器械': 'equipment',
+    '开展形式': 'form',
+    '运动方式': 'movement_type',
+    '难度等级': 'difficulty',
+    '适用水平': 'suitable_level',
+    '锻炼身体素质': 'fitness_quality',
+    '提升体测项目': 'improve_test',
+    '图片': 'image_url',
+}
+
+# 学生编号补齐位数
+STUDENT_ID_WIDTH = 9
+
+# 导入结果中保留的错误信息条数
+MAX_ERRORS = 100
+
+# 导入统计中按块累加的计数项
+COUNT_KEYS = ("success_count", "inserted_count", "updated_count", "unchanged_count", "error_count")
+
+# 单条IN查询的参数个数：SQLite 3.32之前的绑定参数上限为999，之后为32766，PostgreSQL为65535；
+# 按数据库取值并留出余量，默认块大小（UPLOAD_CHUNK_SIZE）的每块只需一次查询
+IN_QUERY_BATCH = 30000
+LEGACY_SQLITE_IN_QUERY_BATCH = 900
+
+
+def in_query_batch(dialect) -> int:
+    """当前数据库单条IN查询可用的参数个数"""
+    if dialect.name == 'sqlite' and sqlite3.sqlite_version_info < (3, 32, 0):
+        return LEGACY_SQLITE_IN_QUERY_BATCH
+    return IN_QUERY_BATCH
+
+
+def _blank_to_none(series: pd.Series) -> pd.Series:
+    """空值和空字符串统一为None"""
+    series[series.isna() | series.isin(['', 'nan'])] = None
+    return series
+
+
+def normalize_student_ids(series: pd.Series) -> pd.Series:
+    """
+    批量规范化学生编号（保留前导0）
+
+    数值型编号转为整数字符串并补齐到9位，文本型编号去除首尾空白；
+    空编号返回None
+    """
+    result = pd.Series(None, index=series.index, dtype=object)
+    present = series.notna()
+    if not present.any():
+        return result
+
+    values = series[present]
+    if pd.api.types.is_numeric_dtype(values):
+        numeric = pd.Series(True, index=values.index)
+    else:
+        numeric = values.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+
+    if numeric.any():
+        digits = pd.to_numeric(values[numeric]).astype('int64').astype(str)
+        result[digits.index] = digits.str.zfill(STUDENT_ID_WIDTH)
+    if (~numeric).any():
+        text = values[~numeric].astype(str).str.strip()
+        result[text.index] = text
+
+    return _blank_to_none(result)
+
+
+def _coerce_text(series: pd.Series) -> pd.Series:
+    """文本列：整数值去掉小数点（如年级编号11.0），空值为None"""
+    present = series.notna()
+    result = pd.Series(None, index=series.index, dtype=object)
+    if pd.api.types.is_numeric_dtype(series):
+        integral = present & (series % 1 == 0)
+        result[integral] = series[integral].astype('int64').astype(str)
+        result[present & ~integral] = series[present & ~integral].astype(str)
+    else:
+        result[present] = series[present].astype(str).str.strip()
+    return _blank_to_none(result)
+
+
+def row_fingerprints(data: pd.DataFrame) -> pd.Series:
+    """
+    按行计算内容指纹（16位十六进制）
+
+    列已按字段类型统一dtype，同样的数据无论来自CSV还是Excel指纹都相同
+    """
+    hashes = pd.util.hash_pandas_object(data, index=False)
+    return hashes.map('{:016x}'.format)
+
+
+def prepare_fitness_data(df: pd.DataFrame) -> Tuple[List[Dict], List[str]]:
+    """
+    按列清洗体测数据
+
+    Args:
+        df: 原始表格（中文表头，索引为原始行号）
+
+    Returns:
+        (记录列表, 错误信息列表)；记录包含全部字段（缺失为None）和行指纹row_hash。
+        无学生编号的行直接跳过，数值无效的行记入错误，同一学生编号保留最后一行
+    """
+    if '学生编号' not in df.columns:
+        return [], []
+
+    table = StudentFitnessData.__table__.columns
+    data = pd.DataFrame(index=df.index)
+    invalid = pd.Series(False, index=df.index)
+    errors: List[str] = []
+
+    for source, field in FITNESS_FIELD_MAP.items():
+        # 表格中没有的列按全空处理（与空单元格一样不覆盖已有值）
+        series = df[source] if source in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if field == 'student_id':
+            data[field] = normalize_student_ids(series)
+            continue
+
+        column_type = table[field].type
+        if isinstance(column_type, (Float, Integer)):
+            coerced = pd.to_numeric(series, errors='coerce')
+            bad = series.notna() & coerced.isna() & (series.astype(str).str.strip() != '')
+            for index in bad[bad & ~invalid].index:
+                errors.append(f"第{index + 2}行: {source}数值无效: {series[index]}")
+            invalid |= bad
+            if isinstance(column_type, Integer):
+                data[field] = np.trunc(coerced).astype('Int64')
+            else:
+                data[field] = coerced.astype('float64')
+        else:
+            data[field] = _coerce_text(series)
+
+    data = data[data['student_id'].notna() & ~invalid]
+    data = data[~data['student_id'].duplicated(keep='last')]
+    data['row_hash'] = row_fingerprints(data)
+
+    # 转为Python原生类型，缺失值为None
+    data = data.astype(object).where(data.notna(), None)
+    return data.to_dict('records'), errors
+
+
+def prepare_exercise_data(df: pd.DataFrame) -> List[Dict]:
+    """
+    按列清洗动作库数据
+
+    Returns:
+        记录列表；无编号的行直接跳过，同一编号保留最后一行
+    """
+    columns = {col: EXERCISE_FIELD_MAP[col] for col in df.columns if col in EXERCISE_FIELD_MAP}
+    if 'code' not in columns.values():
+        return []
+
+    data = pd.DataFrame(
+        {field: _coerce_text(df[source]) for source, field in columns.items()},
+        index=df.index
+    )
+    data = data[data['code'].notna()]
+    data = data[~data['code'].duplicated(keep='last')]
+    return data.to_dict('records')
+
+
+class DataImportService:
+    """数据导入服务"""
+
+    def fetch_existing(self, db: Session, student_ids: List[str]) -> Dict[str, Row]:
+        """
+        一次查询已存在的学生及其行指纹（按批拆分IN参数）
+
+        Returns:
+            学生编号 -> (学生编号, 主键, 行指纹, 班级)
+        """
+        return self._fetch_existing(
+            db,
+            StudentFitnessData.student_id,
+            student_ids,
+            StudentFitnessData.row_hash,
+            StudentFitnessData.class_name
+        )
+
+    def _fetch_existing(self, db: Session, key_column, values: List[str], *columns) -> Dict[str, Row]:
+        """按唯一列批量查询主键及附加列"""
+        model = key_column.class_
+        existing: Dict[str, Row] = {}
+        batch_size = in_query_batch(db.get_bind().dialect)
+        for start in range(0, len(values), batch_size):
+            batch = values[start:start + batch_size]
+            rows = db.query(key_column, model.id, *columns).filter(key_column.in_(batch)).all()
+            existing.update({row[0]: row for row in rows})
+        return existing
+
+    def import_fitness_data(self, db: Session, df: pd.DataFrame) -> Dict:
+        """
+        增量导入体测数据（不提交事务）
+
+        与已存储的行指纹比较：新学生批量插入，内容有变化的学生只更新表格中有值的字段，
+        未变化的学生不写库
+
+        Args:
+            db: 数据库会话
+            df: 原始表格
+
+        Returns:
+            导入统计
+        """
+        records, errors = prepare_fitness_data(df)
+        existing = self.fetch_existing(db, [r['student_id'] for r in records])
+        now = datetime.now()
+
+        inserts = []
+        updates = []
+        unchanged = 0
+        classes = set()  # 数据有变化的班级（用于刷新班级统计）
+        for record in records:
+            row = existing.get(record['student_id'])
+            if row is None:
+                inserts.append(record)
+                classes.add(record['class_name'])
+            elif row.row_hash == record['row_hash']:
+                unchanged += 1
+            else:
+                update = {k: v for k, v in record.items() if v is not None}
+                update['id'] = row.id
+                update['update_time'] = now
+                updates.append(update)
+                classes.update((row.class_name, record['class_name']))
+
+        if inserts:
+            db.bulk_insert_mappings(StudentFitnessData, inserts)
+        if updates:
+            db.bulk_update_mappings(StudentFitnessData, updates)
+
+        logger.debug(
+            f"体测数据导入: 新增{len(inserts)}条，更新{len(updates)}条，"
+            f"未变化{unchanged}条，失败{len(errors)}条"
+        )
+        return {
+            "success_count": len(records),
+            "inserted_count": len(inserts),
+            "updated_count": len(updates),
+            "unchanged_count": unchanged,
+            "error_count": len(errors),
+            "errors": errors,
+            "classes": sorted(c for c in classes if c),
+        }
+
+    def import_fitness_chunks(
+        self,
+        db: Session,
+        chunks: Iterable[pd.DataFrame],
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """流式导入体测数据，每块处理完即提交"""
+        return self._import_chunks(db, chunks, self.import_fitness_data, on_progress)
+
+    def import_sports_exercises(self, db: Session, df: pd.DataFrame) -> Dict:
+        """
+        批量导入动作库（不提交事务）
+
+        Args:
+            db: 数据库会话
+            df: 原始表格
+
+        Returns:
+            导入统计
+        """
+        records = prepare_exercise_data(df)
+        existing = self._fetch_existing(db, SportsExercise.code, [r['code'] for r in records])
+        now = datetime.now()
+
+        inserts = []
+        updates = []
+        for record in records:
+            row = existing.get(record['code'])
+            if row is None:
+                inserts.append(record)
+            else:
+                updates.append(dict(record, id=row.id, update_time=now))
+
+        if inserts:
+            db.bulk_insert_mappings(SportsExercise, inserts)
+        if updates:
+            db.bulk_update_mappings(SportsExercise, updates)
+
+        return {
+            "success_count": len(records),
+            "inserted_count": len(inserts),
+            "updated_count": len(updates),
+            "unchanged_count": 0,
+            "error_count": 0,
+            "errors": [],
+        }
+
+    def import_exercise_chunks(
+        self,
+        db: Session,
+        chunks: Iterable[pd.DataFrame],
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """流式导入动作库，每块处理完即提交"""
+        return self._import_chunks(db, chunks, self.import_sports_exercises, on_progress)
+
+    def _import_chunks(
+        self,
+        db: Session,
+        chunks: Iterable[pd.DataFrame],
+        import_chunk: Callable[[Session, pd.DataFrame], Dict],
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        逐块导入并提交，峰值内存只与块大小有关
+
+        Args:
+            db: 数据库会话
+            chunks: 分块读取的表格
+            import_chunk: 单块导入函数
+            on_progress: 每块提交后的进度回调（参数为累计统计）
+
+        Returns:
+            各块累计的导入统计
+        """
+        total = dict.fromkeys(COUNT_KEYS, 0)
+        total.update(errors=[], classes=[], chunk_count=0, rows_processed=0)
+        classes = set()
+        for chunk in chunks:
+            result = import_chunk(db, chunk)
+            db.commit()
+            total["chunk_count"] += 1
+            total["rows_processed"] += len(chunk)
+            for key in COUNT_KEYS:
+                total[key] += result[key]
+            # 错误信息只保留前MAX_ERRORS条
+            total["errors"].extend(result["errors"][:MAX_ERRORS - len(total["errors"])])
+            classes.update(result.get("classes", []))
+            total["classes"] = sorted(classes)
+            if on_progress:
+                on_progress(total)
+        return total
+
+
+# 创建全局服务实例
+data_import_service = DataImportService()
@@ -0,0 +1,347 @@
+"""
+训练动作推荐索引
+启动时从动作库构建 体测项目/身体素质 -> 动作 的倒排索引，推荐时只查内存；
+动作库导入后递增Redis中的版本号，各进程检查到版本变化时重建
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import re
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+from app.core.cache import CacheKeys, cache_manager
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.models.student_data import SportsExercise, StudentFitnessData
+from app.services.fitness_analytics_service import ANALYTICS_ITEMS
+from app.utils.keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+
+# 体测项目 -> (显示名称, 动作库中的写法, 相关身体素质)
+EXERCISE_ITEMS = {
+    'weight': ('体重', ['体重', 'BMI'], ['耐力']),
+    'lung_capacity': ('肺活量', ['肺活量'], ['心肺', '耐力']),
+    'run_50m': ('50米跑', ['50米跑'], ['速度']),
+    'sit_reach': ('坐位体前屈', ['坐位体前屈'], ['柔韧']),
+    'sit_up': ('1分钟仰卧起坐', ['仰卧起坐'], ['力量', '核心']),
+    'rope_skip': ('1分钟跳绳', ['跳绳'], ['协调', '灵敏']),
+    'standing_jump': ('立定跳远', ['立定跳远'], ['力量', '爆发力']),
+    'run_800m': ('800米跑', ['800米'], ['耐力']),
+    'run_1000m': ('1000米跑', ['1000米'], ['耐力']),
+    'pull_up': ('引体向上', ['引体向上'], ['力量', '上肢']),
+    'run_50m_8': ('50米×8往返跑', ['50米×8', '50米x8', '往返跑'], ['耐力', '灵敏']),
+}
+
+# 难度写法 -> 等级（1最易）
+DIFFICULTY_LEVELS = {
+    '初级': 1, '简单': 1, '容易': 1, '低': 1,
+    '中级': 2, '中等': 2, '一般': 2, '中': 2,
+    '高级': 3, '困难': 3, '较难': 3, '高': 3,
+}
+
+# 评分低于该值视为薄弱项目
+WEAK_SCORE = 70
+
+# 身体素质字段的分隔符
+_SEPARATORS = re.compile(r'[、,，;；/\s]+')
+
+# 推荐结果中返回的动作字段
+EXERCISE_FIELDS = (
+    'name', 'description', 'difficulty', 'improve_test', 'fitness_quality', 'image_url'
+)
+
+
+def difficulty_level(difficulty: Optional[str]) -> int:
+    """难度文字转为等级（1~3），无法识别时按中等处理"""
+    if not difficulty:
+        return 2
+    for word, level in DIFFICULTY_LEVELS.items():
+        if word in difficulty:
+            return level
+    stars = difficulty.count('★')
+    return min(max(stars, 1), 3) if stars else 2
+
+
+def target_difficulty(score: float) -> int:
+    """按项目评分确定适合的动作难度：不及格从初级练起"""
+    if score < 60:
+        return 1
+    if score < 80:
+        return 2
+    return 3
+
+
+class ExerciseIndex:
+    """
+    动作推荐倒排索引
+
+    重建时先构建新索引再整体替换，查询不加锁。
+    """
+
+    def __init__(self):
+        self._exercises: Dict[int, Dict] = {}
+        self._by_item: Dict[str, List[int]] = {}
+        self._by_quality: Dict[str, List[int]] = {}
+        self._matcher = KeywordMatcher(
+            (alias, item)
+            for item, (_, aliases, _) in EXERCISE_ITEMS.items()
+            for alias in aliases
+        )
+        self.built_at: Optional[float] = None
+        # 当前索引对应的动作库版本号
+        self.version: Optional[int] = None
+        self._checked_at = 0.0
+        self._flight = SingleFlight()
+
+    def __len__(self) -> int:
+        return len(self._exercises)
+
+    def build(self, exercises: Iterable[Dict]):
+        """
+        由动作数据构建索引
+
+        Args:
+            exercises: 含id及EXERCISE_FIELDS字段的动作
+        """
+        catalog: Dict[int, Dict] = {}
+        by_item: Dict[str, List[int]] = {}
+        by_quality: Dict[str, List[int]] = {}
+
+        for exercise in exercises:
+            exercise_id = exercise['id']
+            entry = {field: exercise.get(field) for field in EXERCISE_FIELDS}
+            entry['level'] = difficulty_level(entry['difficulty'])
+            catalog[exercise_id] = entry
+
+            items = {match.value for match in self._matcher.find_all(entry['improve_test'] or '')}
+            for item in items:
+                by_item.setdefault(item, []).append(exercise_id)
+            for quality in _SEPARATORS.split(entry['fitness_quality'] or ''):
+                if quality:
+                    by_quality.setdefault(quality, []).append(exercise_id)
+
+        self._exercises, self._by_item, self._by_quality = catalog, by_item, by_quality
+        self.built_at = time.time()
+        logger.info(f"动作推荐索引已构建: {len(catalog)}个动作，{len(by_item)}个体测项目")
+
+    def rebuild(self, db: Session):
+        """从数据库重新构建索引（只查询需要的列）"""
+        columns = [SportsExercise.id] + [getattr(SportsExercise, f) for f in EXERCISE_FIELDS]
+        rows = db.query(*columns).all()
+        self.build(dict(zip(['id', *EXERCISE_FIELDS], row)) for row in rows)
+
+    async def publish(self) -> Optional[int]:
+        """动作库已更新：递增版本号，所有进程在下次检查时重建"""
+        return await cache_manager.incr(CacheKeys.exercise_index_version())
+
+    async def ensure_current(self, force: bool = False):
+        """
+        动作库版本号变化时重建索引（在线程池中查询数据库，不阻塞事件循环）
+
+        两次检查的间隔不小于EXERCISE_INDEX_CHECK_INTERVAL；
+        同一版本的并发检查共享一次重建
+
+        Args:
+            force: 不论间隔和版本号都重建（启动时、本进程导入后）
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < settings.EXERCISE_INDEX_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+
+        version = await cache_manager.get_counter(CacheKeys.exercise_index_version())
+        if not force and (version is None or version == self.version):
+            return
+        await self._flight.do(version, lambda: self._rebuild_version(version))
+
+    async def _rebuild_version(self, version: Optional[int]):
+        """在线程池中重建，成功后记录版本号"""
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, self._rebuild_from_database):
+            self.version = version
+
+    def _rebuild_from_database(self) -> bool:
+        """使用独立会话重建索引，失败时保留旧索引"""
+        from app.core.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.rebuild(db)
+            return True
+        except Exception as e:
+            logger.error(f"重建动作推荐索引失败: {e}")
+            return False
+        finally:
+            db.close()
+
+    def candidates(self, item: str) -> List[int]:
+        """某体测项目的候选动作：直接标注该项目的动作，其次是锻炼相关身体素质的动作"""
+        direct = self._by_item.get(item, [])
+        related = [
+            exercise_id
+            for quality in EXERCISE_ITEMS[item][2]
+            for exercise_id in self._by_quality.get(quality, [])
+        ]
+        return list(dict.fromkeys(direct + related))
+
+    def weak_items(self, scores: Dict[str, Optional[float]]) -> List[Tuple[str, float]]:
+        """
+        找出薄弱项目（评分低于WEAK_SCORE），最弱的排在前面
+
+        Args:
+            scores: 体测项目 -> 评分
+        """
+        weak = [
+            (item, score) for item, score in scores.items()
+            if item in EXERCISE_ITEMS and score is not None and score < WEAK_SCORE
+        ]
+        return sorted(weak, key=lambda pair: pair[1])
+
+    def recommend(
+        self,
+        scores: Dict[str, Optional[float]],
+        per_item: int = 3
+    ) -> Tuple[List[str], List[Dict]]:
+        """
+        根据各项目评分推荐训练动作
+
+        Args:
+            scores: 体测项目 -> 评分
+            per_item: 每个薄弱项目推荐的动作数
+
+        Returns:
+            (薄弱项目名称列表, 推荐动作列表)
+        """
+        plan = [(item, target_difficulty(score)) for item, score in self.weak_items(scores)]
+        return self.recommend_plan(plan, per_item)
+
+    def recommend_plan(
+        self,
+        plan: Sequence[Tuple[str, int]],
+        per_item: int = 3
+    ) -> Tuple[List[str], List[Dict]]:
+        """
+        按 薄弱项目及目标难度 推荐训练动作
+
+        同一项目内按 与目标难度的差距、能同时改善的薄弱项目数 排序，
+        已推荐过的动作不重复推荐；plan相同的学生推荐结果相同
+
+        Args:
+            plan: [(体测项目, 目标难度)]，最弱的在前
+            per_item: 每个薄弱项目推荐的动作数
+
+        Returns:
+            (薄弱项目名称列表, 推荐动作列表)
+        """
+        coverage: Dict[int, int] = {}
+        for item, _ in plan:
+            for exercise_id in self._by_item.get(item, []):
+                coverage[exercise_id] = coverage.get(exercise_id, 0) + 1
+
+        recommended: List[Dict] = []
+        seen = set()
+        for item, target in plan:
+            direct = set(self._by_item.get(item, []))
+            ranked = sorted(
+                (exercise_id for exercise_id in self.candidates(item) if exercise_id not in seen),
+                key=lambda exercise_id: (
+                    exercise_id not in direct,
+                    abs(self._exercises[exercise_id]['level'] - target),
+                    -coverage.get(exercise_id, 0),
+                    exercise_id,
+                )
+            )
+            for exercise_id in ranked[:per_item]:
+                seen.add(exercise_id)
+                exercise = dict(self._exercises[exercise_id])
+                del exercise['level']
+                exercise['target_item'] = EXERCISE_ITEMS[item][0]
+                recommended.append(exercise)
+
+        return [EXERCISE_ITEMS[item][0] for item, _ in plan], recommended
+
+    def recommend_batch(self, frame: pd.DataFrame, per_item: int = 3) -> Dict:
+        """
+        批量推荐：向量化找出每个学生的薄弱项目，薄弱情况相同的学生合并为一组
+
+        Args:
+            frame: 含student_id及各项目评分列的数据（每个学生一行）
+            per_item: 每个薄弱项目推荐的动作数
+
+        Returns:
+            各项目薄弱人数及分组推荐结果
+        """
+        items = list(EXERCISE_ITEMS)
+        scores = frame[[ANALYTICS_ITEMS[item][0] for item in items]].astype('float64').to_numpy()
+        weak = scores < WEAK_SCORE  # 缺测（NaN）不算薄弱
+        targets = np.select([scores < 60, scores < 80], [1, 2], 3)
+        # 非薄弱项目排到最后，薄弱项目按评分从低到高
+        order = np.argsort(np.where(weak, scores, np.inf), axis=1, kind='stable')
+
+        groups: Dict[Tuple, Dict] = {}
+        for row, student_id in enumerate(frame['student_id']):
+            plan = tuple(
+                (items[col], int(targets[row, col]))
+                for col in order[row, :weak[row].sum()]
+            )
+            group = groups.get(plan)
+            if group is None:
+                weak_items, recommended = self.recommend_plan(plan, per_item)
+                group = groups[plan] = {
+                    'weak_items': weak_items,
+                    'student_ids': [],
+                    'recommended_exercises': recommended,
+                }
+            group['student_ids'].append(student_id)
+
+        return {
+            'student_count': len(frame),
+            'weak_item_counts': {
+                EXERCISE_ITEMS[item][0]: int(count)
+                for item, count in zip(items, weak.sum(axis=0)) if count
+            },
+            'groups': sorted(groups.values(), key=lambda g: -len(g['student_ids'])),
+        }
+
+
+def load_student_scores(
+    db: Session,
+    class_name: Optional[str] = None,
+    student_ids: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    一次查询读取一批学生的各项目评分
+
+    Args:
+        db: 数据库会话
+        class_name: 班级名称
+        student_ids: 学号列表（与班级同时提供时取交集）
+
+    Returns:
+        每个学生一行的DataFrame
+    """
+    columns = ['student_id', *(ANALYTICS_ITEMS[item][0] for item in EXERCISE_ITEMS)]
+    query = db.query(*[getattr(StudentFitnessData, name) for name in columns])
+    if class_name is not None:
+        query = query.filter(StudentFitnessData.class_name == class_name)
+    if student_ids is not None:
+        query = query.filter(StudentFitnessData.student_id.in_(student_ids))
+
+    rows = query.order_by(StudentFitnessData.student_id).all()
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def student_item_scores(student) -> Dict[str, Optional[float]]:
+    """学生各体测项目的评分"""
+    return {
+        item: getattr(student, ANALYTICS_ITEMS[item][0])
+        for item in EXERCISE_ITEMS
+    }
+
+
+# 创建全局索引实例
+exercise_index = ExerciseIndex()
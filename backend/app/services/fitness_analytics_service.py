@@ -0,0 +1,234 @@
+"""
+体测数据分析服务
+按列投影一次读取全年级/全校数据，用pandas分组计算各项目分布和学生百分位
+"""
+from typing import Dict, List, Optional, Sequence
+import logging
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.cache import cache_manager, CacheKeys, CacheExpire, CacheTags
+from app.core.performance import performance_metrics
+from app.models.student_data import StudentFitnessData
+
+logger = logging.getLogger(__name__)
+
+
+# 分析项目 -> (评分列, 等级列)
+ANALYTICS_ITEMS = {
+    'weight': ('weight_score', 'weight_level'),
+    'lung_capacity': ('lung_capacity_score', 'lung_capacity_level'),
+    'run_50m': ('run_50m_score', 'run_50m_level'),
+    'sit_reach': ('sit_reach_score', 'sit_reach_level'),
+    'sit_up': ('sit_up_score', 'sit_up_level'),
+    'rope_skip': ('rope_skip_score', 'rope_skip_level'),
+    'standing_jump': ('standing_jump_score', 'standing_jump_level'),
+    'run_800m': ('run_800m_score', 'run_800m_level'),
+    'run_1000m': ('run_1000m_score', 'run_1000m_level'),
+    'pull_up': ('pull_up_score', 'pull_up_level'),
+    'run_50m_8': ('run_50m_8_score', 'run_50m_8_level'),
+    'total': ('total_score', 'total_level'),
+}
+
+# 可用的分组维度
+GROUP_FIELDS = ('grade_code', 'class_name', 'gender')
+
+# 输出的分位点
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# 及格分数线（国家学生体质健康标准：60分及格）
+PASS_SCORE = 60
+
+
+def _clean(value):
+    """NaN转为None，numpy数值转为Python类型（便于JSON序列化）"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
+
+
+def grade_percentiles(frame: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """
+    计算学生总分在年级内的百分位（超过了年级百分之多少的学生）
+
+    Args:
+        frame: 含student_id、grade_code、total_score列的数据
+
+    Returns:
+        年级编号 -> {学生编号: 百分位(0~100)}；无总分的学生不参与排名
+    """
+    scored = frame[frame['total_score'].notna()]
+    grades = scored['grade_code'].fillna('')
+    lower = scored.groupby(grades)['total_score'].rank(method='min') - 1
+    size = grades.map(grades.value_counts())
+    percent = (lower / size * 100).round(1)
+
+    result: Dict[str, Dict[str, float]] = {}
+    for grade, student_id, value in zip(grades, scored['student_id'], percent):
+        result.setdefault(grade, {})[student_id] = float(value)
+    return result
+
+
+class FitnessAnalyticsService:
+    """体测数据分析服务"""
+
+    def load_frame(self, db: Session, grade_code: Optional[str] = None) -> pd.DataFrame:
+        """
+        按列投影读取分析所需的数据
+
+        Args:
+            db: 数据库会话
+            grade_code: 年级编号，None表示全校
+
+        Returns:
+            每个学生一行的DataFrame
+        """
+        columns = ['student_id', *GROUP_FIELDS]
+        for score_column, level_column in ANALYTICS_ITEMS.values():
+            columns.extend((score_column, level_column))
+
+        query = select(*[getattr(StudentFitnessData, name) for name in columns])
+        if grade_code is not None:
+            query = query.where(StudentFitnessData.grade_code == grade_code)
+
+        rows = db.execute(query).all()
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def summarize(self, frame: pd.DataFrame, group_by: Sequence[str]) -> List[Dict]:
+        """
+        分组统计各项目的均值、标准差、分位数、等级人数和及格率
+
+        Args:
+            frame: load_frame读取的数据
+            group_by: 分组维度（空表示整体）
+
+        Returns:
+            每组一条统计
+        """
+        group_by = list(group_by)
+        if frame.empty:
+            return []
+
+        keys = [frame[field].fillna('') for field in group_by] or [pd.Series(0, index=frame.index)]
+        score_columns = [score for score, _ in ANALYTICS_ITEMS.values()]
+        scores = frame[score_columns].astype('float64')
+        grouped = scores.groupby(keys)
+
+        stats = grouped.agg(['count', 'mean', 'std', 'min', 'max'])
+        quantiles = grouped.quantile(list(QUANTILES))
+        passed = scores.ge(PASS_SCORE).where(scores.notna()).groupby(keys).mean()
+        sizes = grouped.size()
+        levels = {
+            item: frame[level_column].groupby(keys).value_counts()
+            for item, (_, level_column) in ANALYTICS_ITEMS.items()
+        }
+
+        groups = []
+        for group_key in sizes.index:
+            key_values = group_key if isinstance(group_key, tuple) else (group_key,)
+            entry = {field: (value or None) for field, value in zip(group_by, key_values)}
+            entry['student_count'] = int(sizes[group_key])
+            entry['items'] = {}
+
+            for item, (score_column, _) in ANALYTICS_ITEMS.items():
+                count = int(stats.loc[group_key, (score_column, 'count')])
+                if not count:
+                    continue
+                level_counts = levels[item].loc[key_values] if key_values in levels[item] else {}
+                entry['items'][item] = {
+                    'count': count,
+                    'mean': _clean(stats.loc[group_key, (score_column, 'mean')]),
+                    'std': _clean(stats.loc[group_key, (score_column, 'std')]),
+                    'min': _clean(stats.loc[group_key, (score_column, 'min')]),
+                    'max': _clean(stats.loc[group_key, (score_column, 'max')]),
+                    'quantiles': {
+                        f"p{int(q * 100)}": _clean(quantiles.loc[(*key_values, q), score_column])
+                        for q in QUANTILES
+                    },
+                    'pass_rate': _clean(passed.loc[group_key, score_column]),
+                    'level_counts': {str(k): int(v) for k, v in level_counts.items()},
+                }
+            groups.append(entry)
+        return groups
+
+    async def get_analytics(
+        self,
+        db: Session,
+        grade_code: Optional[str] = None,
+        group_by: Sequence[str] = ('grade_code',)
+    ) -> Dict:
+        """
+        获取年级或全校的分析结果（优先读缓存）
+
+        计算时顺带缓存涉及年级的学生百分位，供学生查询使用
+        """
+        cache_key = CacheKeys.fitness_analytics(grade_code or 'all', ','.join(group_by))
+        cached = await cache_manager.get(cache_key)
+        if cached:
+            performance_metrics.record_cache_hit("fitness_analytics")
+            return cached
+        performance_metrics.record_cache_miss("fitness_analytics")
+
+        frame = self.load_frame(db, grade_code)
+        result = {
+            'grade_code': grade_code,
+            'group_by': list(group_by),
+            'student_count': len(frame),
+            'groups': self.summarize(frame, group_by),
+        }
+        await cache_manager.set(cache_key, result, CacheExpire.HOUR_1, tags=[CacheTags.ANALYTICS])
+        await self._cache_percentiles(grade_percentiles(frame))
+        return result
+
+    async def get_percentile(
+        self,
+        db: Session,
+        student_id: str,
+        grade_code: Optional[str]
+    ) -> Optional[float]:
+        """
+        获取学生总分在年级内的百分位
+
+        Returns:
+            超过了年级百分之多少的学生；无年级或无总分时返回None
+        """
+        if not grade_code:
+            return None
+
+        grade = grade_code
+        ranks = await cache_manager.get(CacheKeys.grade_percentiles(grade))
+        if ranks is None:
+            performance_metrics.record_cache_miss("grade_percentiles")
+            frame = self.load_frame(db, grade_code)
+            percentiles = grade_percentiles(frame)
+            await self._cache_percentiles(percentiles)
+            ranks = percentiles.get(grade, {})
+            if grade not in percentiles:
+                # 年级内无人有总分，同样缓存，避免重复查询
+                await cache_manager.set(
+                    CacheKeys.grade_percentiles(grade), ranks, CacheExpire.HOUR_1,
+                    tags=[CacheTags.ANALYTICS]
+                )
+        else:
+            performance_metrics.record_cache_hit("grade_percentiles")
+        return ranks.get(student_id)
+
+    async def invalidate(self):
+        """数据变化后清除全部分析缓存"""
+        await cache_manager.invalidate_tags(CacheTags.ANALYTICS)
+
+    async def _cache_percentiles(self, percentiles: Dict[str, Dict[str, float]]):
+        await cache_manager.set_many(
+            {CacheKeys.grade_percentiles(grade): ranks for grade, ranks in percentiles.items()},
+            CacheExpire.HOUR_1,
+            tags=[CacheTags.ANALYTICS]
+        )
+
+
+# 创建全局服务实例
+fitness_analytics_service = FitnessAnalyticsService()
@@ -0,0 +1,291 @@
+"""
+后台数据导入任务
+上传文件先落盘，解析和入库在独立进程中执行，进度写入任务状态文件供轮询
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import BinaryIO, Dict, Optional
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.class_stats_service import class_stats_service
+from app.services.exercise_index import exercise_index
+from app.services.fitness_analytics_service import fitness_analytics_service
+
+logger = logging.getLogger(__name__)
+
+
+# 任务类型
+JOB_FITNESS = 'fitness'  # 体测数据
+JOB_EXERCISE = 'exercise'  # 体育动作库
+
+# 任务状态
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+_JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ImportJobStore:
+    """
+    任务状态存储（每个任务一个JSON文件）
+
+    工作进程与Web进程通过文件共享进度，多个Web进程也能查询同一任务。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def ensure_dir(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def status_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def upload_path(self, job_id: str, filename: str) -> str:
+        """落盘文件路径（保留扩展名用于判断格式）"""
+        return os.path.join(self.directory, f"{job_id}{os.path.splitext(filename)[1].lower()}")
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        """读取任务状态，任务不存在返回None"""
+        if not _JOB_ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(self.status_path(job_id), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, job: Dict):
+        """原子写入任务状态（先写临时文件再替换）"""
+        path = self.status_path(job['job_id'])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def update(self, job_id: str, **fields) -> Dict:
+        """更新任务状态的部分字段"""
+        job = self.load(job_id) or {'job_id': job_id}
+        job.update(fields)
+        self.save(job)
+        return job
+
+    def cleanup(self, ttl: int):
+        """删除超过保留时间的任务文件"""
+        if not os.path.isdir(self.directory):
+            return
+        expire_before = time.time() - ttl
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < expire_before:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def run_import_job(
+    directory: str,
+    job_id: str,
+    kind: str,
+    filename: str,
+    chunk_size: int
+) -> Optional[Dict]:
+    """
+    执行导入任务（在工作进程中运行）
+
+    Args:
+        directory: 任务目录
+        job_id: 任务ID
+        kind: 任务类型
+        filename: 原始文件名
+        chunk_size: 每块行数
+
+    Returns:
+        导入统计；失败返回None
+    """
+    from app.core.database import SessionLocal
+    from app.services.data_import_service import data_import_service
+    from app.utils.spreadsheet import iter_spreadsheet_chunks
+
+    store = ImportJobStore(directory)
+    path = store.upload_path(job_id, filename)
+    start = time.monotonic()
+
+    def report(total: Dict, **fields):
+        elapsed = time.monotonic() - start
+        store.update(
+            job_id,
+            **total,
+            elapsed=round(elapsed, 2),
+            rows_per_second=round(total['rows_processed'] / elapsed, 1) if elapsed else 0.0,
+            **fields
+        )
+
+    store.update(job_id, status=STATUS_RUNNING, started_at=datetime.now().isoformat())
+    db = SessionLocal()
+    try:
+        import_chunks = (
+            data_import_service.import_fitness_chunks
+            if kind == JOB_FITNESS
+            else data_import_service.import_exercise_chunks
+        )
+        with open(path, 'rb') as f:
+            chunks = iter_spreadsheet_chunks(f, filename, chunk_size)
+            total = import_chunks(db, chunks, on_progress=report)
+        report(total, status=STATUS_DONE, finished_at=datetime.now().isoformat())
+        return total
+    except Exception as e:
+        db.rollback()
+        logger.error(f"导入任务失败 {job_id}: {e}")
+        store.update(
+            job_id,
+            status=STATUS_FAILED,
+            message=f"文件处理失败: {str(e)}",
+            finished_at=datetime.now().isoformat()
+        )
+        return None
+    finally:
+        db.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+async def _refresh_fitness_caches(classes):
+    """体测数据变化后清除班级统计和年级分析缓存"""
+    await class_stats_service.invalidate(classes)
+    await fitness_analytics_service.invalidate()
+
+
+async def _refresh_exercise_index():
+    """动作库变化后发布新版本号，本进程立即重建推荐索引，其他进程检查到版本变化后重建"""
+    await exercise_index.publish()
+    await exercise_index.ensure_current(force=True)
+
+
+class ImportJobService:
+    """后台导入任务服务"""
+
+    def __init__(self):
+        directory = settings.IMPORT_SPOOL_DIR or os.path.join(tempfile.gettempdir(), 'health_import_jobs')
+        self.store = ImportJobStore(directory)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """工作进程池（首次提交任务时创建）"""
+        if self._executor is None:
+            # spawn方式启动，避免fork继承事件循环和数据库连接
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.IMPORT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    async def submit(self, kind: str, source: BinaryIO, filename: str) -> Dict:
+        """
+        落盘上传文件并提交导入任务
+
+        Args:
+            kind: 任务类型
+            source: 上传文件对象
+            filename: 原始文件名
+
+        Returns:
+            任务状态
+        """
+        job_id = uuid.uuid4().hex
+        path = self.store.upload_path(job_id, filename)
+        await run_in_threadpool(self._spool, source, path)
+
+        job = {
+            'job_id': job_id,
+            'kind': kind,
+            'filename': filename,
+            'status': STATUS_PENDING,
+            'created_at': datetime.now().isoformat(),
+            'rows_processed': 0,
+        }
+        self.store.save(job)
+
+        future = self.executor.submit(
+            run_import_job,
+            self.store.directory,
+            job_id,
+            kind,
+            filename,
+            settings.UPLOAD_CHUNK_SIZE
+        )
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda f: self._on_done(job_id, kind, path, f, loop))
+        logger.info(f"导入任务已提交: {job_id} ({kind}, {filename})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """查询任务状态"""
+        return self.store.load(job_id)
+
+    def shutdown(self):
+        """关闭工作进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _spool(self, source: BinaryIO, path: str):
+        """将上传文件复制到任务目录，并清理过期任务"""
+        self.store.ensure_dir()
+        self.store.cleanup(settings.IMPORT_JOB_TTL)
+        source.seek(0)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(source, f, 1024 * 1024)
+
+    def _on_done(
+        self,
+        job_id: str,
+        kind: str,
+        path: str,
+        future: Future,
+        loop: asyncio.AbstractEventLoop
+    ):
+        """
+        任务结束回调（在进程池的管理线程中执行）
+
+        成功时清除涉及班级的统计缓存和分析缓存，或更新动作推荐索引（交给事件循环执行）；
+        工作进程异常退出时标记任务失败并删除落盘文件
+        """
+        if not future.cancelled() and future.exception() is None:
+            total = future.result()
+            if not total or loop.is_closed():
+                return
+            if kind == JOB_EXERCISE:
+                asyncio.run_coroutine_threadsafe(_refresh_exercise_index(), loop)
+            elif total.get('classes'):
+                asyncio.run_coroutine_threadsafe(_refresh_fitness_caches(total['classes']), loop)
+            return
+
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+        message = "任务已取消" if future.cancelled() else f"导入进程异常: {future.exception()}"
+        logger.error(f"导入任务异常结束 {job_id}: {message}")
+        self.store.update(job_id, status=STATUS_FAILED, message=message)
+
+
+# 创建全局服务实例
+import_job_service = ImportJobService()
@@ -1,9 +1,16 @@
 """
 关键词识别服务（优化版）
 """
-from typing import Dict, List
-from app.core.cache import cache_manager, CacheKeys, CacheExpire
+from typing import Dict, List, Optional
+import hashlib
+from app.core.cache import CacheKeys, CacheExpire, LRUCache, cached
 from app.core.performance import performance_metrics
+from app.services.text_classifier import (
+    text_classifier,
+    TextVerdict,
+    LABEL_TOPIC_EXCLUDED,
+    LABEL_INTERNAL,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -62,53 +69,94 @@ class KeywordService:
         '作文', '考试', '作业', '成绩单'
     ]
     
-    async def detect_keywords(self, text: str) -> Dict:
+    def __init__(self, local_cache_size: int = 2048):
+        # 进程内LRU，位于Redis之前，重复问题无需网络往返
+        self._local_cache = LRUCache(
+            maxsize=local_cache_size, ttl=CacheExpire.HOUR_1
+        )
+    
+    def _cache_key(self, text: str) -> str:
+        """内容寻址的缓存键（跨进程稳定，关键词表变化后自动失效）"""
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return CacheKeys.keyword_detect(text_classifier.version, digest)
+    
+    async def detect_keywords(
+        self,
+        text: str,
+        verdict: Optional[TextVerdict] = None
+    ) -> Dict:
         """
         检测文本中的关键词（带缓存）
         
         Args:
             text: 输入文本
+            verdict: 已有的分类结果（可选，传入时直接复用，不查缓存）
             
         Returns:
             检测结果字典
         """
-        # 尝试从缓存获取
-        cache_key = f"keyword:detect:{hash(text)}"
-        cached = await cache_manager.get(cache_key)
-        if cached:
-            performance_metrics.record_cache_hit()
-            return cached
-        performance_metrics.record_cache_miss()
+        if verdict is not None:
+            return self._build_result(verdict)
+        
+        cache_key = self._cache_key(text)
+        
+        # 一级：进程内LRU（Redis不可用时同样生效）
+        cached_result = self._local_cache.get(cache_key)
+        if cached_result is not None:
+            performance_metrics.record_cache_hit("keyword:local")
+            return cached_result
+        performance_metrics.record_cache_miss("keyword:local")
+        
+        # 二级：Redis
+        result = await self._detect(text)
+        self._local_cache.set(cache_key, result)
+        return result
+    
+    @cached(
+        key=lambda self, text: self._cache_key(text),
+        ttl=CacheExpire.HOUR_1,
+        namespace="keyword:redis"
+    )
+    async def _detect(self, text: str) -> Dict:
+        """分类文本并生成检测结果（经Redis缓存）"""
+        return self._build_result(text_classifier.classify(text))
+    
+    def _build_result(self, verdict: TextVerdict) -> Dict:
+        """
+        根据分类结果生成检测结果字典
         
+        Args:
+            verdict: 统一分类器的判定
+            
+        Returns:
+            检测结果字典
+        """
         result = {
             'has_internal': False,
             'internal_keywords': [],
             'categories': [],
             'is_excluded': False,
-            'matched_keywords': []
+            'matched_keywords': [],
+            'positions': []
         }
         
         # 检查排除关键词
-        for keyword in self.EXCLUDED_KEYWORDS:
-            if keyword in text:
-                result['is_excluded'] = True
-                result['matched_keywords'].append(keyword)
-                await cache_manager.set(
-                    cache_key, result, CacheExpire.HOUR_1
-                )
-                return result
-        
-        # 检查内部资源关键词
-        for keyword, category in self.INTERNAL_KEYWORDS.items():
-            if keyword in text:
-                result['has_internal'] = True
-                result['internal_keywords'].append(keyword)
-                if category not in result['categories']:
-                    result['categories'].append(category)
-                result['matched_keywords'].append(keyword)
-        
-        # 缓存结果
-        await cache_manager.set(cache_key, result, CacheExpire.HOUR_1)
+        excluded = verdict.keywords(LABEL_TOPIC_EXCLUDED)
+        if excluded:
+            result['is_excluded'] = True
+            result['matched_keywords'].append(excluded[0])
+            return result
+        
+        # 检查内部资源关键词（含重叠命中，如“运动会”与“运动会方案”）
+        for match, category in verdict.labelled(LABEL_INTERNAL):
+            if match.keyword in result['internal_keywords']:
+                continue
+            result['has_internal'] = True
+            result['internal_keywords'].append(match.keyword)
+            if category not in result['categories']:
+                result['categories'].append(category)
+            result['matched_keywords'].append(match.keyword)
+            result['positions'].append([match.start, match.end])
         
         return result
     
@@ -142,5 +190,9 @@ class KeywordService:
         return categories[0] if categories else None
 
 
+# 注册到统一分类引擎
+text_classifier.register(LABEL_TOPIC_EXCLUDED, KeywordService.EXCLUDED_KEYWORDS)
+text_classifier.register_mapping(LABEL_INTERNAL, KeywordService.INTERNAL_KEYWORDS)
+
 # 创建全局关键词服务实例
 keyword_service = KeywordService()
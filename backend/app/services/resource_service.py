@@ -5,17 +5,49 @@ from typing import List, Optional
 from sqlalchemy import select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.resource import InternalResource
-from app.core.cache import cache_manager, CacheKeys, CacheExpire
-from app.core.performance import timing_decorator, performance_metrics
+from app.core.cache import CacheKeys, CacheExpire, CacheTags, cached
+from app.core.performance import timing_decorator
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _to_cache_items(resources: List[InternalResource]) -> List[dict]:
+    """资源转为可缓存的字典"""
+    return [
+        {
+            "id": r.id,
+            "title": r.title,
+            "content": r.content,
+            "type": r.type,
+            "category": r.category,
+            "keywords": r.keywords,
+            "file_url": r.file_url,
+        }
+        for r in resources
+    ]
+
+
+def _from_cache_items(items: List[dict]) -> List[InternalResource]:
+    return [InternalResource(**item) for item in items]
+
+
 class ResourceService:
     """资源检索服务"""
     
     @timing_decorator
+    @cached(
+        key=lambda self, keywords, category, db, limit: (
+            CacheKeys.resource_search(keywords, category, limit) if keywords else None
+        ),
+        ttl=CacheExpire.HOUR_1,
+        stale_ttl=0,  # 查询依赖请求级数据库会话，不做过期后的后台刷新
+        negative_ttl=CacheExpire.MINUTE_5,
+        tags=[CacheTags.RESOURCE],
+        namespace="resource",
+        dump=_to_cache_items,
+        load=_from_cache_items,
+    )
     async def search_internal(
         self,
         keywords: List[str],
@@ -24,7 +56,7 @@ class ResourceService:
         limit: int = 10
     ) -> List[InternalResource]:
         """
-        搜索内部资源（带缓存）
+        搜索内部资源（按关键词组合缓存，"无资源"同样缓存）
         
         Args:
             keywords: 关键词列表
@@ -35,16 +67,6 @@ class ResourceService:
         Returns:
             资源列表
         """
-        # 尝试从缓存获取
-        if keywords and len(keywords) == 1:
-            cache_key = CacheKeys.resource_by_keyword(keywords[0])
-            cached = await cache_manager.get(cache_key)
-            if cached:
-                performance_metrics.record_cache_hit()
-                logger.debug(f"缓存命中: {cache_key}")
-                return [InternalResource(**item) for item in cached]
-            performance_metrics.record_cache_miss()
-        
         query = select(InternalResource)
         
         # 按分类筛选
@@ -53,40 +75,15 @@ class ResourceService:
         
         # 关键词匹配
         if keywords:
-            keyword_conditions = []
-            for keyword in keywords:
-                keyword_conditions.append(
-                    InternalResource.keywords.contains([keyword])
-                )
-            
-            if keyword_conditions:
-                query = query.where(or_(*keyword_conditions))
+            query = query.where(or_(*[
+                InternalResource.keywords.contains([keyword])
+                for keyword in keywords
+            ]))
         
         query = query.limit(limit)
         
         result = await db.execute(query)
-        resources = result.scalars().all()
-        
-        # 缓存结果
-        if keywords and len(keywords) == 1 and resources:
-            cache_key = CacheKeys.resource_by_keyword(keywords[0])
-            cache_data = [
-                {
-                    "id": r.id,
-                    "title": r.title,
-                    "content": r.content,
-                    "type": r.type,
-                    "category": r.category,
-                    "keywords": r.keywords,
-                    "file_url": r.file_url,
-                }
-                for r in resources
-            ]
-            await cache_manager.set(
-                cache_key, cache_data, CacheExpire.HOUR_1
-            )
-        
-        return resources
+        return result.scalars().all()
     
     async def get_by_type(
         self,
@@ -2,6 +2,13 @@
 安全检查服务
 """
 from typing import Dict, Optional
+from app.services.text_classifier import (
+    text_classifier,
+    TextVerdict,
+    LABEL_MEDICAL,
+    LABEL_MENTAL,
+    LABEL_EXCLUDED,
+)
 
 
 class SafetyService:
@@ -34,16 +41,24 @@ class SafetyService:
         '学习', '功课', '补习'
     ]
     
-    def check_risk(self, text: str) -> Dict:
+    def check_risk(
+        self,
+        text: str,
+        verdict: Optional[TextVerdict] = None
+    ) -> Dict:
         """
         检查健康风险
         
         Args:
             text: 输入文本
+            verdict: 已有的分类结果（可选，避免重复扫描）
             
         Returns:
             风险检查结果
         """
+        if verdict is None:
+            verdict = text_classifier.classify(text)
+        
         result = {
             'has_risk': False,
             'risk_type': None,
@@ -52,52 +67,59 @@ class SafetyService:
         }
         
         # 检查医疗风险
-        for keyword in self.MEDICAL_KEYWORDS:
-            if keyword in text:
-                result['has_risk'] = True
-                result['risk_type'] = 'medical'
-                result['warning'] = '⚠️ 健康提示：建议及时就医，以下内容仅供参考，不能替代专业医疗诊断。'
-                result['matched_keywords'].append(keyword)
-                return result
+        medical = verdict.keywords(LABEL_MEDICAL)
+        if medical:
+            result['has_risk'] = True
+            result['risk_type'] = 'medical'
+            result['warning'] = '⚠️ 健康提示：建议及时就医，以下内容仅供参考，不能替代专业医疗诊断。'
+            result['matched_keywords'].append(medical[0])
+            return result
         
         # 检查心理风险
-        for keyword in self.MENTAL_KEYWORDS:
-            if keyword in text:
-                result['has_risk'] = True
-                result['risk_type'] = 'mental'
-                result['warning'] = '''⚠️ 紧急提示：请立即联系专业心理医生或拨打心理援助热线。
+        mental = verdict.keywords(LABEL_MENTAL)
+        if mental:
+            result['has_risk'] = True
+            result['risk_type'] = 'mental'
+            result['warning'] = '''⚠️ 紧急提示：请立即联系专业心理医生或拨打心理援助热线。
 
 全国心理援助热线：400-161-9995
 北京心理危机干预热线：010-82951332
 
 您的生命很重要，请寻求专业帮助。'''
-                result['matched_keywords'].append(keyword)
-                return result
+            result['matched_keywords'].append(mental[0])
+            return result
         
         return result
     
-    def check_excluded(self, text: str) -> Dict:
+    def check_excluded(
+        self,
+        text: str,
+        verdict: Optional[TextVerdict] = None
+    ) -> Dict:
         """
         检查是否为排除内容
         
         Args:
             text: 输入文本
+            verdict: 已有的分类结果（可选，避免重复扫描）
             
         Returns:
             检查结果
         """
+        if verdict is None:
+            verdict = text_classifier.classify(text)
+        
         result = {
             'is_excluded': False,
             'matched_keywords': [],
             'message': None
         }
         
-        for keyword in self.EXCLUDED_KEYWORDS:
-            if keyword in text:
-                result['is_excluded'] = True
-                result['matched_keywords'].append(keyword)
-                result['message'] = '我们是大健康智能体，专注于健康、体育、营养、心理等相关内容。您可以问我运动训练、健康饮食、心理调节等方面的问题，换个问题试试吧。'
-                return result
+        excluded = verdict.keywords(LABEL_EXCLUDED)
+        if excluded:
+            result['is_excluded'] = True
+            result['matched_keywords'].append(excluded[0])
+            result['message'] = '我们是大健康智能体，专注于健康、体育、营养、心理等相关内容。您可以问我运动训练、健康饮食、心理调节等方面的问题，换个问题试试吧。'
         
         return result
     
@@ -116,5 +138,10 @@ class SafetyService:
         return content
 
 
+# 注册到统一分类引擎
+text_classifier.register(LABEL_MEDICAL, SafetyService.MEDICAL_KEYWORDS)
+text_classifier.register(LABEL_MENTAL, SafetyService.MENTAL_KEYWORDS)
+text_classifier.register(LABEL_EXCLUDED, SafetyService.EXCLUDED_KEYWORDS)
+
 # 创建全局安全服务实例
 safety_service = SafetyService()
@@ -0,0 +1,138 @@
+"""
+统一文本分类引擎
+各服务的关键词表注册到同一个自动机，一次扫描得到完整判定
+"""
+from dataclasses import dataclass, field
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.utils.keyword_matcher import KeywordMatch, KeywordMatcher
+
+
+# 标签类型
+LABEL_MEDICAL = 'medical'  # 医疗风险
+LABEL_MENTAL = 'mental'  # 心理风险
+LABEL_EXCLUDED = 'excluded'  # 安全服务排除内容
+LABEL_TOPIC_EXCLUDED = 'topic_excluded'  # 关键词服务排除内容
+LABEL_INTERNAL = 'internal'  # 内部资源关键词
+
+
+@dataclass
+class TextVerdict:
+    """一次分类的综合判定"""
+    text: str
+    matches: List[KeywordMatch] = field(default_factory=list)
+
+    def keywords(self, kind: str) -> List[str]:
+        """某类标签命中的关键词（去重，按出现顺序）"""
+        seen = {}
+        for match in self.matches:
+            for label_kind, _ in match.value:
+                if label_kind == kind:
+                    seen.setdefault(match.keyword, None)
+        return list(seen)
+
+    def labelled(self, kind: str) -> List[Tuple[KeywordMatch, Any]]:
+        """某类标签的命中及其附加值"""
+        return [
+            (match, label_value)
+            for match in self.matches
+            for label_kind, label_value in match.value
+            if label_kind == kind
+        ]
+
+    @property
+    def categories(self) -> List[str]:
+        """命中的内部资源分类（去重，按出现顺序）"""
+        seen = {}
+        for _, category in self.labelled(LABEL_INTERNAL):
+            seen.setdefault(category, None)
+        return list(seen)
+
+    @property
+    def is_excluded(self) -> bool:
+        return bool(self.keywords(LABEL_EXCLUDED))
+
+    @property
+    def risk_type(self) -> Optional[str]:
+        """风险类型，医疗风险优先"""
+        if self.keywords(LABEL_MEDICAL):
+            return LABEL_MEDICAL
+        if self.keywords(LABEL_MENTAL):
+            return LABEL_MENTAL
+        return None
+
+
+class TextClassifier:
+    """
+    统一文本分类器
+
+    所有关键词表共用一个自动机，分类耗时与关键词表数量、规模无关。
+    """
+
+    def __init__(self):
+        self._labels: Dict[str, List[Tuple[str, Any]]] = {}
+        self._matcher: Optional[KeywordMatcher] = None
+        self._version: Optional[str] = None
+
+    def register(
+        self,
+        kind: str,
+        keywords: Iterable[str],
+        value: Any = None
+    ):
+        """
+        注册关键词表
+
+        Args:
+            kind: 标签类型
+            keywords: 关键词列表
+            value: 附加值（如资源分类）
+        """
+        for keyword in keywords:
+            labels = self._labels.setdefault(keyword, [])
+            if (kind, value) not in labels:
+                labels.append((kind, value))
+        self._matcher = None
+        self._version = None
+
+    def register_mapping(self, kind: str, mapping: Dict[str, Any]):
+        """注册 关键词 -> 附加值 映射表"""
+        for keyword, value in mapping.items():
+            self.register(kind, [keyword], value)
+
+    @property
+    def matcher(self) -> KeywordMatcher:
+        """合并后的自动机（注册变化后首次使用时重建）"""
+        if self._matcher is None:
+            self._matcher = KeywordMatcher(
+                (keyword, tuple(labels))
+                for keyword, labels in self._labels.items()
+            )
+        return self._matcher
+
+    @property
+    def version(self) -> str:
+        """关键词表版本（内容摘要），关键词变化后缓存键随之变化"""
+        if self._version is None:
+            digest = hashlib.sha1()
+            for keyword in sorted(self._labels):
+                labels = sorted(repr(label) for label in self._labels[keyword])
+                digest.update(f"{keyword}\x00{'|'.join(labels)}\n".encode('utf-8'))
+            self._version = digest.hexdigest()[:12]
+        return self._version
+    
+    def classify(self, text: str) -> TextVerdict:
+        """
+        单次扫描分类文本
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            综合判定
+        """
+        return TextVerdict(text=text, matches=self.matcher.find_all(text))
+
+
+# 创建全局分类器实例
+text_classifier = TextClassifier()
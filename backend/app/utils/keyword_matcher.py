@@ -0,0 +1,132 @@
+"""
+多模式关键词匹配（Aho-Corasick自动机）
+一次扫描文本即可找出所有关键词及其位置
+"""
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    """关键词命中结果"""
+    start: int  # 起始位置（包含）
+    end: int  # 结束位置（不包含）
+    keyword: str
+    value: Any
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick多模式匹配器
+
+    构建完成后，匹配耗时只与文本长度和命中数有关，
+    与关键词数量无关；重叠关键词（如“运动会”与“运动会方案”）会全部报告。
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, Any]] = ()):
+        """
+        Args:
+            keywords: (关键词, 附加值) 序列，重复关键词以后者为准
+        """
+        # 每个状态：转移表、失败指针、输出（本状态及其后缀上的关键词）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, Any]]] = [[]]
+        self._values: Dict[str, Any] = {}
+
+        for keyword, value in keywords:
+            self._add(keyword, value)
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, keyword: str) -> bool:
+        return keyword in self._values
+
+    def _add(self, keyword: str, value: Any):
+        """插入关键词到字典树"""
+        if not keyword:
+            return
+        self._values[keyword] = value
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state] = [(keyword, value)]
+
+    def _build(self):
+        """广度优先计算失败指针并合并输出"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail_next = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail_next if fail_next != next_state else 0
+                # 后缀状态的输出追加在后，保证长关键词先于其后缀报告
+                self._output[next_state] = (
+                    self._output[next_state] + self._output[self._fail[next_state]]
+                )
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """
+        查找文本中所有关键词（含重叠命中）
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            按起始位置排序的命中列表
+        """
+        matches = []
+        if not text or not self._values:
+            return matches
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword, value in output[state]:
+                matches.append(
+                    KeywordMatch(index + 1 - len(keyword), index + 1, keyword, value)
+                )
+
+        matches.sort(key=lambda m: (m.start, -m.end))
+        return matches
+
+    def find_keywords(self, text: str) -> List[str]:
+        """返回命中的关键词（去重，按首次出现顺序）"""
+        seen = {}
+        for match in self.find_all(text):
+            seen.setdefault(match.keyword, None)
+        return list(seen)
+
+    def contains_any(self, text: str) -> bool:
+        """文本是否包含任一关键词（命中即返回）"""
+        if not text or not self._values:
+            return False
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                return True
+        return False
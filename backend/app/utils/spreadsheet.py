@@ -0,0 +1,83 @@
+"""
+表格流式读取
+按固定行数分块读取CSV/XLSX，内存占用与文件大小无关
+"""
+from typing import BinaryIO, Iterator, List
+import pandas as pd
+
+
+def iter_csv_chunks(source: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    分块读取CSV
+
+    索引为连续的数据行号（从0开始），与整表读取一致
+    """
+    with pd.read_csv(source, chunksize=chunk_size) as reader:
+        yield from reader
+
+
+def iter_xlsx_chunks(source: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    通过只读工作表逐行读取XLSX（第一个工作表，首行为表头）
+
+    索引为连续的数据行号（从0开始），与整表读取一致
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+
+        offset = 0
+        buffer: List[tuple] = []
+        for row in rows:
+            buffer.append(row[:len(columns)])
+            if len(buffer) >= chunk_size:
+                yield _frame(buffer, columns, offset)
+                offset += len(buffer)
+                buffer = []
+        if buffer:
+            yield _frame(buffer, columns, offset)
+    finally:
+        workbook.close()
+
+
+def iter_spreadsheet_chunks(
+    source: BinaryIO,
+    filename: str,
+    chunk_size: int
+) -> Iterator[pd.DataFrame]:
+    """
+    按文件类型分块读取表格
+
+    Args:
+        source: 文件对象（可为磁盘临时文件）
+        filename: 文件名（用于判断格式）
+        chunk_size: 每块行数
+
+    Returns:
+        DataFrame迭代器
+    """
+    if filename.endswith('.csv'):
+        return iter_csv_chunks(source, chunk_size)
+    if filename.endswith('.xlsx'):
+        return iter_xlsx_chunks(source, chunk_size)
+    # 旧版.xls格式不支持流式读取，整表读取后再分块
+    return _split(pd.read_excel(source), chunk_size)
+
+
+def _frame(rows: List[tuple], columns: List[str], offset: int) -> pd.DataFrame:
+    """由行数据构造一块DataFrame"""
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    frame.index = pd.RangeIndex(offset, offset + len(rows))
+    return frame
+
+
+def _split(df: pd.DataFrame, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """整表按行数切块"""
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
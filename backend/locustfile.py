@@ -1,5 +1,15 @@
 """
 性能测试 - Locust配置
+
+离线压测（不依赖DashScope，只测量后端自身开销）：
+    1. 启动模拟大模型服务
+       python -m scripts.fake_llm_server --port 9100 --latency fixed:0.2
+    2. 后端指向模拟服务
+       AI_BASE_URL=http://127.0.0.1:9100/api/v1/services/aigc/text-generation/generation uvicorn app.main:app
+    3. 运行压测
+       locust -f locustfile.py --host=http://localhost:8000
+
+模拟服务支持延迟分布、流式输出间隔和错误注入，参见 scripts/fake_llm_server.py。
 """
 from locust import HttpUser, task, between
 import random
@@ -10,10 +20,19 @@ class APIUser(HttpUser):
     
     wait_time = between(1, 3)
     
+    messages = [
+        "如何提高跑步速度？",
+        "体测成绩怎么分析？",
+        "有什么课课练资料？",
+        "如何提高立定跳远成绩？",
+        "怎么训练耐力？"
+    ]
+    
     def on_start(self):
         """初始化：登录获取token"""
         response = self.client.post("/api/auth/login", json={
-            "wechat_code": f"test_code_{random.randint(1000, 9999)}"
+            "username": f"loadtest_{random.randint(1000, 9999)}",
+            "password": "test"
         })
         
         if response.status_code == 200:
@@ -24,23 +43,36 @@ class APIUser(HttpUser):
     @task(5)
     def send_message(self):
         """发送对话消息（高频）"""
-        messages = [
-            "如何提高跑步速度？",
-            "体测成绩怎么分析？",
-            "有什么课课练资料？",
-            "如何提高立定跳远成绩？",
-            "怎么训练耐力？"
-        ]
-        
         self.client.post(
             "/api/chat/send",
             json={
-                "message": random.choice(messages),
+                "message": random.choice(self.messages),
                 "conversation_id": None
             },
             headers={"Authorization": f"Bearer {self.token}"}
         )
     
+    @task(2)
+    def send_message_stream(self):
+        """流式发送对话消息（读取完整事件流）"""
+        with self.client.post(
+            "/api/chat/send/stream",
+            json={
+                "message": random.choice(self.messages),
+                "conversation_id": None
+            },
+            headers={"Authorization": f"Bearer {self.token}"},
+            stream=True,
+            catch_response=True,
+            name="/api/chat/send/stream"
+        ) as response:
+            for _ in response.iter_lines():
+                pass
+            if response.status_code == 200:
+                response.success()
+            else:
+                response.failure(f"状态码 {response.status_code}")
+    
     @task(2)
     def get_conversations(self):
         """获取对话列表（中频）"""
@@ -0,0 +1,46 @@
+"""
+对话冗余字段回填脚本（一次性）
+为已有对话表补充 last_message_preview / last_message_at / message_count 列及列表索引，
+并按消息表分批回填
+
+用法: python -m scripts.backfill_conversation_stats [--batch-size 1000]
+"""
+import argparse
+from sqlalchemy import func, select
+from app.core.database import Base, add_missing_columns, add_missing_indexes, engine
+from app.models import fitness_test, message, student, user  # noqa: F401  注册关系映射
+from app.models.conversation import Conversation
+from app.services.conversation_service import build_backfill_statement
+
+
+def add_columns():
+    """补充新增列和索引（已存在时跳过）"""
+    add_missing_columns(Base.metadata, bind=engine)
+    add_missing_indexes(Base.metadata, bind=engine)
+    print("✅ 列和索引已就绪")
+
+
+def backfill(batch_size: int):
+    """按对话ID分批回填，每批一个事务"""
+    with engine.connect() as conn:
+        max_id = conn.execute(select(func.max(Conversation.id))).scalar() or 0
+
+    for start_id in range(1, max_id + 1, batch_size):
+        with engine.begin() as conn:
+            result = conn.execute(build_backfill_statement(start_id, start_id + batch_size))
+        print(f"  已回填对话 {start_id} ~ {start_id + batch_size - 1}（{result.rowcount}条）")
+
+    print("✅ 回填完成")
+
+
+def main(batch_size: int):
+    print("🚀 开始回填对话冗余字段...")
+    add_columns()
+    backfill(batch_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="回填对话的最后一条消息和消息数")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批处理的对话数")
+    args = parser.parse_args()
+    main(args.batch_size)
@@ -0,0 +1,117 @@
+"""
+缓存编码基准测试
+按缓存命名空间构造典型的值，比较各序列化/压缩组合的字节数和编解码耗时（以json无压缩为基准）
+
+用法: python -m scripts.benchmark_cache_codec [--repeat 200] [--min-size 1024]
+"""
+import argparse
+import random
+import time
+from app.core.codec import CacheCodec, available_compressions, available_serializers
+
+
+def sample_values() -> dict:
+    """各命名空间的典型缓存值"""
+    rng = random.Random(0)
+    content = "练习方法：\n1. 双脚并拢站立，双手叉腰\n2. 抬起一只脚，保持平衡\n注意事项：保持身体挺直，目视前方。"
+
+    resources = [
+        {
+            "id": i,
+            "title": f"平衡能力训练 - 动作{i}",
+            "content": content * rng.randint(3, 8),
+            "type": "course_practice",
+            "category": "balance",
+            "keywords": ["平衡", "课课练", f"动作{i}"],
+            "file_url": None,
+        }
+        for i in range(10)
+    ]
+    keyword_detect = {
+        "has_internal": True,
+        "internal_keywords": ["跳绳", "耐力"],
+        "categories": ["training"],
+        "is_excluded": False,
+    }
+    class_stats = {
+        "class_name": "1班",
+        "total_count": 45,
+        "avg_score": 78.35,
+        "level_stats": {"优秀": 8, "良好": 17, "及格": 15, "不及格": 5},
+    }
+    item = {
+        "count": 180, "mean": 75.2, "std": 9.81, "min": 42.0, "max": 100.0,
+        "quantiles": {"p10": 62.0, "p25": 69.0, "p50": 76.0, "p75": 82.0, "p90": 88.0},
+        "pass_rate": 0.93,
+        "level_counts": {"优秀": 30, "良好": 70, "及格": 67, "不及格": 13},
+    }
+    analytics = {
+        "grade_code": "14",
+        "group_by": ["class_name"],
+        "student_count": 180,
+        "groups": [
+            {"class_name": f"{c}班", "student_count": 45, "items": {f"item{i}": item for i in range(12)}}
+            for c in range(1, 5)
+        ],
+    }
+    percentiles = {f"0928{i:05d}": round(rng.uniform(0, 100), 1) for i in range(400)}
+
+    return {
+        "resource:search": resources,
+        "keyword:detect": keyword_detect,
+        "data:class_stats": class_stats,
+        "data:analytics:summary": analytics,
+        "data:analytics:percentiles": percentiles,
+    }
+
+
+def _best_time(func, repeat: int, rounds: int = 3) -> float:
+    """多轮取最快一轮的单次耗时（微秒），减少抖动"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1e6
+
+
+def measure(codec: CacheCodec, value, repeat: int):
+    """返回 (字节数, 编码微秒, 解码微秒)"""
+    data = codec.encode(value)
+    encode_us = _best_time(lambda: codec.encode(value), repeat)
+    decode_us = _best_time(lambda: codec.decode(data), repeat)
+    return len(data), encode_us, decode_us
+
+
+def main(repeat: int, min_size: int):
+    serializers = sorted(available_serializers())
+    compressions = sorted(available_compressions())
+    print(f"可用序列化: {', '.join(serializers)}；可用压缩: {', '.join(compressions)}\n")
+
+    for namespace, value in sample_values().items():
+        base_size, base_encode, base_decode = measure(
+            CacheCodec("json", "none", min_size), value, repeat
+        )
+        print(f"[{namespace}] json无压缩: {base_size}字节, 编码{base_encode:.1f}µs, 解码{base_decode:.1f}µs")
+        print(f"  {'组合':<16}{'字节':>8}{'节省':>8}{'编码µs':>10}{'解码µs':>10}{'CPU节省':>10}")
+        for serializer in serializers:
+            for compression in compressions:
+                size, encode_us, decode_us = measure(
+                    CacheCodec(serializer, compression, min_size), value, repeat
+                )
+                saved_bytes = 1 - size / base_size
+                saved_cpu = 1 - (encode_us + decode_us) / (base_encode + base_decode)
+                print(
+                    f"  {serializer + '+' + compression:<16}{size:>8}{saved_bytes:>8.0%}"
+                    f"{encode_us:>10.1f}{decode_us:>10.1f}{saved_cpu:>10.0%}"
+                )
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比较缓存值编码方式的大小和耗时")
+    parser.add_argument("--repeat", type=int, default=200, help="每种组合重复编解码的次数")
+    parser.add_argument("--min-size", type=int, default=1024, help="压缩阈值（字节）")
+    args = parser.parse_args()
+    main(args.repeat, args.min_size)
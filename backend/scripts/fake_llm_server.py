@@ -0,0 +1,157 @@
+"""
+本地模拟大模型服务（离线压测用）
+接口与DashScope文本生成接口一致，支持延迟分布、逐字流式输出和错误注入
+
+启动：
+    python -m scripts.fake_llm_server --port 9100 --latency lognormal:-0.5,0.6 --error-rate 0.02
+
+后端指向模拟服务：
+    AI_BASE_URL=http://127.0.0.1:9100/api/v1/services/aigc/text-generation/generation
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+GENERATION_PATH = "/api/v1/services/aigc/text-generation/generation"
+
+DEFAULT_REPLY = (
+    "提高跑步速度可以从以下几个方面入手：\n"
+    "1. 加强下肢力量训练，如深蹲、弓步跳；\n"
+    "2. 进行间歇冲刺跑，提升无氧能力；\n"
+    "3. 改进摆臂和步频，保持正确的跑姿；\n"
+    "4. 训练前充分热身，训练后做好拉伸。"
+)
+
+
+class FakeLLMConfig:
+    """模拟服务配置（可通过环境变量或命令行设置）"""
+
+    def __init__(self):
+        # 首字延迟分布：fixed:秒 | uniform:最小,最大 | lognormal:mu,sigma
+        self.latency = os.getenv("FAKE_LLM_LATENCY", "fixed:0.2")
+        # 流式输出时每个字符的间隔（秒）
+        self.token_delay = float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.02"))
+        # 错误注入：按概率返回指定状态码
+        self.error_rate = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+        self.error_status = int(os.getenv("FAKE_LLM_ERROR_STATUS", "500"))
+        # 按概率挂起直到客户端超时
+        self.hang_rate = float(os.getenv("FAKE_LLM_HANG_RATE", "0"))
+        self.reply = os.getenv("FAKE_LLM_REPLY", DEFAULT_REPLY)
+
+    def sample_latency(self) -> float:
+        """按配置的分布采样一次延迟（秒）"""
+        kind, _, params = self.latency.partition(':')
+        values = [float(v) for v in params.split(',') if v]
+        if kind == 'uniform':
+            return random.uniform(values[0], values[1])
+        if kind == 'lognormal':
+            return math.exp(random.gauss(values[0], values[1]))
+        return values[0] if values else 0.0
+
+
+config = FakeLLMConfig()
+app = FastAPI(title="模拟大模型服务")
+
+
+def _result(content: str, finish_reason: str, request_id: str) -> Dict:
+    """DashScope响应体（result_format=message）"""
+    return {
+        'request_id': request_id,
+        'output': {
+            'choices': [
+                {
+                    'finish_reason': finish_reason,
+                    'message': {'role': 'assistant', 'content': content}
+                }
+            ]
+        },
+        'usage': {
+            'input_tokens': 0,
+            'output_tokens': len(content),
+        }
+    }
+
+
+def _reply_for(messages: List[Dict]) -> str:
+    """根据最后一条用户消息生成回复"""
+    question = messages[-1].get('content', '') if messages else ''
+    return f"关于“{question}”：\n{config.reply}" if question else config.reply
+
+
+@app.post(GENERATION_PATH)
+async def generation(request: Request):
+    """文本生成接口"""
+    body = await request.json()
+    request_id = str(uuid.uuid4())
+
+    # 错误注入
+    if random.random() < config.hang_rate:
+        await asyncio.sleep(3600)
+    if random.random() < config.error_rate:
+        return JSONResponse(
+            status_code=config.error_status,
+            content={
+                'request_id': request_id,
+                'code': 'InternalError',
+                'message': 'injected error'
+            }
+        )
+
+    await asyncio.sleep(config.sample_latency())
+    reply = _reply_for(body.get('input', {}).get('messages', []))
+
+    if request.headers.get('X-DashScope-SSE') != 'enable':
+        return _result(reply, 'stop', request_id)
+
+    incremental = body.get('parameters', {}).get('incremental_output', False)
+
+    async def event_stream():
+        for index, char in enumerate(reply):
+            if config.token_delay:
+                await asyncio.sleep(config.token_delay)
+            finish = 'stop' if index == len(reply) - 1 else 'null'
+            content = char if incremental else reply[:index + 1]
+            data = json.dumps(_result(content, finish, request_id), ensure_ascii=False)
+            yield f"id:{index + 1}\nevent:result\ndata:{data}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.get("/health")
+async def health_check():
+    """健康检查"""
+    return {"status": "healthy"}
+
+
+def main():
+    """命令行入口"""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="本地模拟大模型服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", help="首字延迟分布，如 fixed:0.2、uniform:0.1,1、lognormal:-0.5,0.6")
+    parser.add_argument("--token-delay", type=float, help="流式输出每个字符的间隔（秒）")
+    parser.add_argument("--error-rate", type=float, help="错误注入概率")
+    parser.add_argument("--error-status", type=int, help="注入错误的状态码")
+    parser.add_argument("--hang-rate", type=float, help="挂起不响应的概率")
+    args = parser.parse_args()
+
+    for name in ("latency", "token_delay", "error_rate", "error_status", "hang_rate"):
+        value = getattr(args, name)
+        if value is not None:
+            setattr(config, name, value)
+
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
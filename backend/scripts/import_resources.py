@@ -4,6 +4,7 @@
 import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import AsyncSessionLocal
+from app.core.cache import cache_manager, CacheTags
 from app.models.resource import InternalResource
 
 
@@ -232,6 +233,12 @@ async def main():
     await import_exercise_library()
     await import_sports_meeting()
     
+    # 清除资源检索缓存
+    await cache_manager.connect()
+    cleared = await cache_manager.invalidate_tags(CacheTags.RESOURCE)
+    await cache_manager.disconnect()
+    print(f"✅ 已清除 {cleared} 条资源缓存")
+    
     print("✅ 所有资源导入完成！")
 
 
@@ -3,7 +3,17 @@ pytest配置文件
 """
 import pytest
 import asyncio
+import sys
 from typing import Generator
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models import fitness_test, student  # noqa: F401  注册关系映射
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.student_data import Base as StudentDataBase
+from app.models.user import User
 
 
 @pytest.fixture(scope="session")
@@ -15,13 +25,78 @@ def event_loop() -> Generator:
 
 
 @pytest.fixture(scope="function")
-async def db_session():
-    """数据库会话fixture"""
-    # 这里可以配置测试数据库
-    pass
+def db_engine():
+    """内存SQLite引擎（单连接共享，线程池中也可使用），已建好体测数据表和对话相关表"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    StudentDataBase.metadata.create_all(bind=engine)
+    Base.metadata.create_all(
+        bind=engine,
+        tables=[User.__table__, Conversation.__table__, Message.__table__]
+    )
+    yield engine
+    engine.dispose()
 
 
 @pytest.fixture(scope="function")
-def mock_redis():
-    """模拟Redis"""
-    pass
+def db_session(db_engine):
+    """数据库会话fixture（数据由各测试自行准备）"""
+    session = sessionmaker(bind=db_engine)()
+    yield session
+    session.close()
+
+
+class MemoryCache:
+    """内存版缓存管理器（与CacheManager接口一致）"""
+
+    def __init__(self):
+        self.store = {}
+        self.expires = {}
+        self.tags = {}
+        self.scores = {}
+        self.counters = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, expire=3600, tags=()):
+        self.store[key] = value
+        self.expires[key] = expire
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+        return True
+
+    async def delete(self, key):
+        return self.store.pop(key, None) is not None
+
+    async def incr_score(self, key, member, amount=1.0, expire=None, max_members=None):
+        scores = self.scores.setdefault(key, {})
+        scores[member] = scores.get(member, 0) + amount
+        return scores[member]
+
+    async def top_scores(self, key, limit=10):
+        scores = self.scores.get(key, {})
+        return sorted(scores.items(), key=lambda item: -item[1])[:limit]
+
+    async def incr(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+    async def get_counter(self, key):
+        return self.counters.get(key)
+
+
+@pytest.fixture(scope="function")
+def fake_cache(monkeypatch):
+    """用内存缓存替换全局cache_manager（包括各模块导入的引用）"""
+    from app.core import cache as cache_module
+
+    original = cache_module.cache_manager
+    cache = MemoryCache()
+    for name, module in list(sys.modules.items()):
+        if name.startswith("app.") and getattr(module, "cache_manager", None) is original:
+            monkeypatch.setattr(module, "cache_manager", cache)
+    return cache
@@ -0,0 +1,250 @@
+"""
+单元测试 - AI服务
+"""
+import asyncio
+import json
+import time
+import httpx
+import pytest
+from app.core.http_client import http_client_manager
+from app.core.limiter import AdmissionController
+from app.services.ai_service import AIService, AIServiceError
+
+
+def _reply(content: str) -> dict:
+    """构造DashScope响应体"""
+    return {
+        'output': {
+            'choices': [
+                {'message': {'role': 'assistant', 'content': content}}
+            ]
+        }
+    }
+
+
+@pytest.fixture
+def mock_upstream(monkeypatch):
+    """用MockTransport替换共享HTTP客户端"""
+    
+    def install(handler):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(http_client_manager, "_client", client)
+        return client
+    
+    return install
+
+
+@pytest.fixture
+def ai_service():
+    return AIService()
+
+
+class TestAIService:
+    """AI服务测试"""
+    
+    @pytest.mark.asyncio
+    async def test_chat(self, ai_service, mock_upstream):
+        """测试普通对话"""
+        def handler(request):
+            body = json.loads(request.content)
+            assert body['input']['messages'][0]['role'] == 'system'
+            return httpx.Response(200, json=_reply("多做冲刺跑"))
+        
+        mock_upstream(handler)
+        reply = await ai_service.chat([{'role': 'user', 'content': '如何提高跑步速度？'}])
+        
+        assert reply == "多做冲刺跑"
+    
+    @pytest.mark.asyncio
+    async def test_chat_upstream_error(self, ai_service, mock_upstream):
+        """测试上游错误返回兜底文案"""
+        mock_upstream(lambda request: httpx.Response(500))
+        reply = await ai_service.chat([{'role': 'user', 'content': '你好'}])
+        
+        assert "暂时不可用" in reply
+    
+    @pytest.mark.asyncio
+    async def test_stream_chat(self, ai_service, mock_upstream):
+        """测试流式对话逐段返回增量内容"""
+        def handler(request):
+            assert request.headers['X-DashScope-SSE'] == 'enable'
+            body = json.loads(request.content)
+            assert body['parameters']['incremental_output'] is True
+            events = "".join(
+                f"id:{i}\nevent:result\ndata:{json.dumps(_reply(part), ensure_ascii=False)}\n\n"
+                for i, part in enumerate(["多做", "冲刺", "跑"])
+            )
+            return httpx.Response(
+                200,
+                content=events.encode('utf-8'),
+                headers={'Content-Type': 'text/event-stream'}
+            )
+        
+        mock_upstream(handler)
+        deltas = [
+            delta async for delta in ai_service.stream_chat(
+                [{'role': 'user', 'content': '如何提高跑步速度？'}]
+            )
+        ]
+        
+        assert deltas == ["多做", "冲刺", "跑"]
+    
+    @pytest.mark.asyncio
+    async def test_stream_chat_interrupted(self, ai_service, mock_upstream):
+        """测试已输出部分内容后上游中断时抛出异常，而不是拼接兜底文案"""
+        async def body():
+            yield f"data:{json.dumps(_reply('多做'), ensure_ascii=False)}\n\n".encode('utf-8')
+            raise httpx.ReadError("connection reset")
+        
+        mock_upstream(lambda request: httpx.Response(200, content=body()))
+        deltas = []
+        with pytest.raises(AIServiceError):
+            async for delta in ai_service.stream_chat([{'role': 'user', 'content': '你好'}]):
+                deltas.append(delta)
+        
+        assert deltas == ["多做"]
+    
+    @pytest.mark.asyncio
+    async def test_identical_prompts_coalesced(self, ai_service, mock_upstream):
+        """测试相同问题的并发请求只调用一次上游"""
+        calls = []
+        
+        async def handler(request):
+            calls.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json=_reply("多做冲刺跑"))
+        
+        mock_upstream(handler)
+        replies = await asyncio.gather(
+            ai_service.chat([{'role': 'user', 'content': '如何提高跑步速度？'}]),
+            ai_service.chat([{'role': 'user', 'content': ' 如何提高跑步速度? '}]),
+            ai_service.chat([{'role': 'user', 'content': '如何提高跑步速度'}]),
+        )
+        
+        assert replies == ["多做冲刺跑"] * 3
+        assert len(calls) == 1
+    
+    @pytest.mark.asyncio
+    async def test_different_roles_not_coalesced(self, ai_service, mock_upstream):
+        """测试不同角色的请求不合并"""
+        calls = []
+        
+        async def handler(request):
+            calls.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json=_reply("回复"))
+        
+        mock_upstream(handler)
+        await asyncio.gather(
+            ai_service.chat([{'role': 'user', 'content': '怎么训练耐力？'}], 'student'),
+            ai_service.chat([{'role': 'user', 'content': '怎么训练耐力？'}], 'teacher'),
+        )
+        
+        assert len(calls) == 2
+    
+    @pytest.mark.asyncio
+    async def test_circuit_opens_on_failures(self, ai_service, mock_upstream):
+        """测试连续失败后熔断，不再请求上游"""
+        calls = []
+        
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(500)
+        
+        mock_upstream(handler)
+        threshold = ai_service._breaker.failure_threshold
+        for i in range(threshold + 3):
+            await ai_service.chat([{'role': 'user', 'content': f'问题{i}'}])
+        
+        assert len(calls) == threshold
+        reply = await ai_service.chat([{'role': 'user', 'content': '再问一次'}])
+        assert "暂时不可用" in reply
+        assert len(calls) == threshold
+
+    
+    @pytest.mark.asyncio
+    async def test_hedging_within_admission_limit(self, ai_service, mock_upstream, monkeypatch):
+        """测试开启对冲时上游并发仍不超过准入上限"""
+        ai_service._admission = AdmissionController("test", max_in_flight=3, max_queue=10)
+        monkeypatch.setattr(ai_service, "_hedge_delay", lambda: 0.005)
+        running = []
+        peak = []
+        
+        async def handler(request):
+            running.append(1)
+            peak.append(len(running))
+            try:
+                await asyncio.sleep(0.03)
+            finally:
+                # 对冲胜出后另一个请求被取消
+                running.pop()
+            return httpx.Response(200, json=_reply("回复"))
+        
+        mock_upstream(handler)
+        await asyncio.gather(*[
+            ai_service.chat([{'role': 'user', 'content': f'问题{i}'}]) for i in range(2)
+        ])
+        assert max(peak) == 3  # 有空闲名额时对冲
+        
+        peak.clear()
+        await asyncio.gather(*[
+            ai_service.chat([{'role': 'user', 'content': f'新问题{i}'}]) for i in range(6)
+        ])
+        
+        assert max(peak) <= 3
+        assert ai_service._admission.in_flight == 0
+
+
+class TestReplyCache:
+    """AI回复缓存测试"""
+    
+    @pytest.mark.asyncio
+    async def test_cached_reply(self, ai_service, mock_upstream, fake_cache):
+        """测试相同问题第二次命中缓存"""
+        calls = []
+        
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json=_reply("多做冲刺跑"))
+        
+        mock_upstream(handler)
+        first = await ai_service.chat([{'role': 'user', 'content': '如何提高跑步速度？'}])
+        second = await ai_service.chat([{'role': 'user', 'content': '如何提高跑步速度'}])
+        
+        assert first == second == "多做冲刺跑"
+        assert len(calls) == 1
+        stats = await ai_service.get_cache_stats()
+        assert stats == [{'role': 'student', 'question': '如何提高跑步速度', 'hits': 1}]
+    
+    @pytest.mark.asyncio
+    async def test_cache_partitioned_by_role(self, ai_service, mock_upstream, fake_cache):
+        """测试不同角色的回复分别缓存"""
+        calls = []
+        
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json=_reply(f"回复{len(calls)}"))
+        
+        mock_upstream(handler)
+        student = await ai_service.chat([{'role': 'user', 'content': '怎么训练耐力'}], 'student')
+        teacher = await ai_service.chat([{'role': 'user', 'content': '怎么训练耐力'}], 'teacher')
+        
+        assert student != teacher
+        assert len(calls) == 2
+    
+    @pytest.mark.asyncio
+    async def test_failure_not_cached(self, ai_service, mock_upstream, fake_cache):
+        """测试失败回复不写入缓存"""
+        mock_upstream(lambda request: httpx.Response(503))
+        reply = await ai_service.chat([{'role': 'user', 'content': '你好'}])
+        
+        assert "暂时不可用" in reply
+        assert fake_cache.store == {}
+    
+    def test_early_refresh(self, ai_service):
+        """测试临近过期时提前刷新"""
+        fresh = {'reply': '', 'delta': 1.0, 'expires_at': time.time() + 3600}
+        expired = {'reply': '', 'delta': 1.0, 'expires_at': time.time() - 1}
+        
+        assert ai_service._should_refresh(fresh) is False
+        assert ai_service._should_refresh(expired) is True
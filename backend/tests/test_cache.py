@@ -0,0 +1,495 @@
+"""
+单元测试 - 缓存管理
+"""
+from fnmatch import fnmatchcase
+import asyncio
+import json
+import pytest
+import redis.asyncio as redis
+from app.core.cache import CacheManager, CacheTags, LRUCache, cached
+from app.core.performance import performance_metrics
+
+
+class TestLRUCache:
+    """进程内LRU缓存测试"""
+    
+    def test_evicts_least_recently_used(self):
+        """测试超出容量时淘汰最久未使用条目"""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+    
+    def test_expired_entry(self, monkeypatch):
+        """测试过期条目"""
+        import app.core.cache as cache_module
+        
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        cache = LRUCache(maxsize=10, ttl=5)
+        cache.set("a", 1)
+        
+        assert cache.get("a") == 1
+        now[0] += 6
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class FakePubSub:
+    """内存版订阅"""
+    
+    def __init__(self, server):
+        self.server = server
+        self.queue = asyncio.Queue()
+    
+    async def subscribe(self, channel):
+        self.server.subscribers.setdefault(channel, []).append(self.queue)
+    
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+    
+    async def reset(self):
+        for queues in self.server.subscribers.values():
+            if self.queue in queues:
+                queues.remove(self.queue)
+
+
+class FakePipeline:
+    """内存版管道：记录命令，execute时依次执行"""
+    
+    def __init__(self, server):
+        self.server = server
+        self.commands = []
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+        return command
+    
+    async def execute(self):
+        self.server.pipelines += 1
+        return [
+            await getattr(self.server, name)(*args, **kwargs)
+            for name, args, kwargs in self.commands
+        ]
+
+
+class FakeRedis:
+    """内存版Redis（多个CacheManager共享，模拟多进程）"""
+    
+    def __init__(self):
+        self.store = {}
+        self.subscribers = {}
+        self.reads = 0
+        self.mgets = []
+        self.pipelines = 0
+        self.sets = {}
+        self.ttls = {}
+        self.deletes = []
+        self.zsets = {}
+    
+    async def get(self, key):
+        self.reads += 1
+        return self.store.get(key)
+    
+    async def mget(self, keys):
+        self.reads += 1
+        self.mgets.append(list(keys))
+        return [self.store.get(key) for key in keys]
+    
+    async def setex(self, key, expire, value):
+        self.store[key] = value
+    
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+    
+    async def delete(self, *keys):
+        self.deletes.append(keys)
+        return sum(
+            (self.store.pop(key, None) or self.sets.pop(key, None)) is not None
+            for key in keys
+        )
+    
+    async def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+    
+    async def expire(self, key, time, nx=False, gt=False):
+        if nx and key in self.ttls:
+            return False
+        if gt and (key not in self.ttls or time <= self.ttls[key]):
+            return False
+        self.ttls[key] = time
+        return True
+    
+    async def rename(self, src, dst):
+        if src not in self.sets:
+            raise redis.ResponseError("no such key")
+        self.sets[dst] = self.sets.pop(src)
+    
+    async def sscan_iter(self, key, count=None):
+        for member in list(self.sets.get(key, ())):
+            yield member
+    
+    async def scan_iter(self, match):
+        for key in list(self.store):
+            if fnmatchcase(key, match):
+                yield key
+    
+    async def zincrby(self, key, amount, member):
+        zset = self.zsets.setdefault(key, {})
+        zset[member] = zset.get(member, 0) + amount
+        return zset[member]
+    
+    async def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+    
+    async def zremrangebyrank(self, key, start, end):
+        ranked = sorted(self.zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        end = len(ranked) + end if end < 0 else end
+        removed = ranked[start:end + 1]
+        for member, _ in removed:
+            del self.zsets[key][member]
+        return len(removed)
+    
+    async def publish(self, channel, data):
+        for queue in self.subscribers.get(channel, []):
+            queue.put_nowait({"type": "message", "data": data})
+    
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+async def connect_manager(server: FakeRedis, **kwargs) -> CacheManager:
+    """连接到内存Redis并启动失效订阅"""
+    manager = CacheManager(**kwargs)
+    manager.redis_client = manager._value_client = server
+    manager._connected = True
+    manager._listener = asyncio.create_task(manager._listen_invalidations())
+    await asyncio.sleep(0)
+    return manager
+
+
+async def close_manager(manager: CacheManager):
+    manager._listener.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await manager._listener
+
+
+class TestTwoTierCache:
+    """进程内L1 + Redis L2缓存测试"""
+    
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        performance_metrics.reset()
+    
+    @pytest.mark.asyncio
+    async def test_l1_serves_repeat_reads(self):
+        """测试配置了L1的命名空间重复读取不访问Redis，其他命名空间不受影响"""
+        server = FakeRedis()
+        manager = await connect_manager(server, l1_ttls={"safety:": 60})
+        server.store["safety:keywords:all"] = json.dumps(["危险"])
+        server.store["user:info:1"] = json.dumps({"id": 1})
+        
+        for _ in range(3):
+            assert await manager.get("safety:keywords:all") == ["危险"]
+            assert await manager.get("user:info:1") == {"id": 1}
+        
+        assert server.reads == 4
+        tiers = performance_metrics.get_summary()["cache_tiers"]
+        assert tiers["l1"] == {"hits": 2, "misses": 1, "hit_rate": 2 / 3}
+        assert tiers["l2"]["hits"] == 4
+        await close_manager(manager)
+    
+    @pytest.mark.asyncio
+    async def test_set_invalidates_other_workers(self):
+        """测试一个进程写入后其他进程丢弃L1副本"""
+        server = FakeRedis()
+        first = await connect_manager(server, l1_ttls={"fitness:": 60})
+        second = await connect_manager(server, l1_ttls={"fitness:": 60})
+        
+        await first.set("fitness:standards:all", {"v": 1})
+        assert await second.get("fitness:standards:all") == {"v": 1}
+        
+        await first.set("fitness:standards:all", {"v": 2})
+        await asyncio.sleep(0)
+        assert await second.get("fitness:standards:all") == {"v": 2}
+        assert await first.get("fitness:standards:all") == {"v": 2}
+        
+        await second.delete("fitness:standards:all")
+        await asyncio.sleep(0)
+        assert await first.get("fitness:standards:all") is None
+        await close_manager(first)
+        await close_manager(second)
+    
+    @pytest.mark.asyncio
+    async def test_clear_pattern_invalidates_l1(self):
+        """测试按模式清除同时清除各进程的L1"""
+        server = FakeRedis()
+        first = await connect_manager(server, l1_ttls={"data:analytics": 60})
+        second = await connect_manager(server, l1_ttls={"data:analytics": 60})
+        await first.set("data:analytics:summary:all:grade_code", {"n": 1})
+        assert await second.get("data:analytics:summary:all:grade_code") == {"n": 1}
+        
+        assert await first.clear_pattern("data:analytics:*") == 1
+        await asyncio.sleep(0)
+        
+        assert await second.get("data:analytics:summary:all:grade_code") is None
+        await close_manager(first)
+        await close_manager(second)
+    
+    @pytest.mark.asyncio
+    async def test_l1_copy_isolated_from_caller(self):
+        """测试写入后调用方修改原对象不影响L1"""
+        server = FakeRedis()
+        manager = await connect_manager(server, l1_ttls={"resource:": 60})
+        value = {"items": [1]}
+        await manager.set("resource:keywords:all", value)
+        value["items"].append(2)
+        
+        assert await manager.get("resource:keywords:all") == {"items": [1]}
+        await close_manager(manager)
+
+
+class TestBatchedCache:
+    """批量读写与自动合并读取测试"""
+    
+    @pytest.mark.asyncio
+    async def test_get_many_uses_one_mget(self):
+        """测试批量读取：L1命中的键不再访问Redis，其余一次MGET"""
+        server = FakeRedis()
+        manager = await connect_manager(server, l1_ttls={"safety:": 60})
+        await manager.set_many({"safety:a": 1, "user:info:1": {"id": 1}, "user:info:2": [2]})
+        
+        values = await manager.get_many(["safety:a", "user:info:1", "user:info:3", "user:info:2"])
+        
+        assert values == [1, {"id": 1}, None, [2]]
+        assert server.pipelines == 1
+        assert server.mgets == [["user:info:1", "user:info:3", "user:info:2"]]
+        await close_manager(manager)
+    
+    @pytest.mark.asyncio
+    async def test_delete_many(self):
+        """测试批量删除同时清除其他进程的L1"""
+        server = FakeRedis()
+        first = await connect_manager(server, l1_ttls={"data:": 60})
+        second = await connect_manager(server, l1_ttls={"data:": 60})
+        await first.set_many({"data:class_stats:一班": 1, "data:class_stats:二班": 2})
+        assert await second.get_many(["data:class_stats:一班", "data:class_stats:二班"]) == [1, 2]
+        
+        assert await first.delete_many(["data:class_stats:一班", "data:class_stats:二班"]) == 2
+        await asyncio.sleep(0)
+        
+        assert await second.get_many(["data:class_stats:一班", "data:class_stats:二班"]) == [None, None]
+        await close_manager(first)
+        await close_manager(second)
+    
+    @pytest.mark.asyncio
+    async def test_auto_batch_coalesces_concurrent_gets(self):
+        """测试同一轮次内并发的单键读取合并为一次MGET，每个调用方拿到独立的对象"""
+        server = FakeRedis()
+        manager = CacheManager(l1_ttls={}, auto_batch=True)
+        manager.redis_client = manager._value_client = server
+        manager._connected = True
+        server.store.update({"a": json.dumps({"v": 1}), "b": json.dumps({"v": 2})})
+        
+        results = await asyncio.gather(
+            manager.get("a"), manager.get("b"), manager.get("a"), manager.get("c")
+        )
+        
+        assert results == [{"v": 1}, {"v": 2}, {"v": 1}, None]
+        assert results[0] is not results[2]
+        assert server.mgets == [["a", "b", "c"]]
+        
+        assert await manager.get("b") == {"v": 2}
+        assert len(server.mgets) == 2
+
+
+class TestTagInvalidation:
+    """按标签失效测试"""
+    
+    @pytest.mark.asyncio
+    async def test_invalidate_deletes_only_tag_members(self):
+        """测试按标签只删除登记的键，并清除其他进程的L1"""
+        server = FakeRedis()
+        first = await connect_manager(server, l1_ttls={"data:": 60})
+        second = await connect_manager(server, l1_ttls={"data:": 60})
+        await first.set("data:class_stats:一班", 1, tags=[CacheTags.class_name("一班")])
+        await first.set("data:class_stats:二班", 2, tags=[CacheTags.class_name("二班")])
+        assert await second.get("data:class_stats:一班") == 1
+        
+        assert await first.invalidate_tags(CacheTags.class_name("一班")) == 1
+        await asyncio.sleep(0)
+        
+        assert await second.get("data:class_stats:一班") is None
+        assert await second.get("data:class_stats:二班") == 2
+        assert not any(key.startswith("tag:class:一班") for key in server.sets)
+        assert await first.invalidate_tags(CacheTags.class_name("一班")) == 0
+        await close_manager(first)
+        await close_manager(second)
+    
+    @pytest.mark.asyncio
+    async def test_invalidate_in_batches(self, monkeypatch):
+        """测试标签成员分批删除"""
+        import app.core.cache as cache_module
+        monkeypatch.setattr(cache_module, "TAG_BATCH_SIZE", 2)
+        server = FakeRedis()
+        manager = await connect_manager(server, l1_ttls={})
+        await manager.set_many({f"resource:keyword:{i}": [i] for i in range(5)}, tags=[CacheTags.RESOURCE])
+        await manager.set("resource:keywords:all", ["x"])
+        
+        assert await manager.invalidate_tags(CacheTags.RESOURCE) == 5
+        
+        member_deletes = [keys for keys in server.deletes if keys[0].startswith("resource:")]
+        assert [len(keys) for keys in member_deletes] == [2, 2, 1]
+        assert list(server.store) == ["resource:keywords:all"]
+        await close_manager(manager)
+    
+    @pytest.mark.asyncio
+    async def test_tag_expire_covers_longest_member(self):
+        """测试标签集合的过期时间不短于任何成员"""
+        server = FakeRedis()
+        manager = await connect_manager(server, l1_ttls={})
+        for key, expire in (("a", 60), ("b", 3600), ("c", 60)):
+            await manager.set(key, 1, expire, tags=[CacheTags.ANALYTICS])
+        
+        assert server.ttls["tag:analytics"] == 3600
+        await close_manager(manager)
+
+
+class TestCachedDecorator:
+    """读穿缓存装饰器测试"""
+    
+    @pytest.fixture
+    def cache(self, fake_cache):
+        return fake_cache
+    
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        import app.core.cache as cache_module
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+        return now
+    
+    @pytest.mark.asyncio
+    async def test_single_flight_on_miss(self, cache):
+        """测试并发未命中只计算一次"""
+        calls = []
+        
+        class Service:
+            @cached(key=lambda self, name: f"test:{name}")
+            async def load(self, name):
+                calls.append(name)
+                await asyncio.sleep(0.01)
+                return {"name": name}
+        
+        results = await asyncio.gather(*[Service().load("a") for _ in range(5)])
+        
+        assert results == [{"name": "a"}] * 5
+        assert calls == ["a"]
+        assert cache.expires["test:a"] == 3600
+    
+    @pytest.mark.asyncio
+    async def test_stale_while_revalidate(self, cache, clock):
+        """测试过期后先返回旧值，由后台任务刷新"""
+        version = [1]
+        
+        @cached(key=lambda: "test:v", ttl=60, stale_ttl=30)
+        async def load():
+            return version[0]
+        
+        assert await load() == 1
+        assert cache.expires["test:v"] == 90
+        
+        version[0] = 2
+        clock[0] += 61
+        assert await load() == 1
+        await asyncio.sleep(0.01)
+        assert await load() == 2
+    
+    @pytest.mark.asyncio
+    async def test_negative_caching(self, cache):
+        """测试空结果按negative_ttl缓存，negative_ttl为None时不缓存"""
+        calls = []
+        
+        @cached(key=lambda name: f"test:neg:{name}", negative_ttl=30)
+        async def cached_empty(name):
+            calls.append(name)
+            return []
+        
+        @cached(key=lambda name: f"test:none:{name}", negative_ttl=None)
+        async def uncached_empty(name):
+            calls.append(name)
+            return None
+        
+        for _ in range(2):
+            assert await cached_empty("a") == []
+            assert await uncached_empty("b") is None
+        
+        assert calls == ["a", "b", "b"]
+        assert cache.expires == {"test:neg:a": 30}
+    
+    @pytest.mark.asyncio
+    async def test_errors_not_cached(self, cache):
+        """测试异常传递给所有等待者且不写缓存"""
+        @cached(key=lambda: "test:error")
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("数据库不可用")
+        
+        results = await asyncio.gather(fail(), fail(), return_exceptions=True)
+        
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert cache.store == {}
+    
+    @pytest.mark.asyncio
+    async def test_none_key_bypasses_cache(self, cache):
+        """测试键为None时直接调用"""
+        @cached(key=lambda value: None)
+        async def echo(value):
+            return value
+        
+        assert await echo(5) == 5
+        assert cache.store == {}
+
+
+class TestScoreCounter:
+    """有序集合计数测试"""
+    
+    @pytest.mark.asyncio
+    async def test_trimmed_with_headroom(self):
+        """测试超过上限的1.1倍才裁剪，新条目在此之前不会因并列低分被删除"""
+        server = FakeRedis()
+        manager = CacheManager(l1_ttls={})
+        manager.redis_client = manager._value_client = server
+        manager._connected = True
+        
+        for i in range(10):
+            for _ in range(i + 2):
+                await manager.incr_score("hits", f"问题{i}", expire=60, max_members=10)
+        score = await manager.incr_score("hits", "新问题", max_members=10)
+        
+        assert score == 1
+        assert "新问题" in server.zsets["hits"]
+        assert server.ttls["hits"] == 60
+        
+        for _ in range(2):
+            await manager.incr_score("hits", "新问题", max_members=10)
+        await manager.incr_score("hits", "另一个", max_members=10)
+        
+        assert len(server.zsets["hits"]) == 10
+        assert "新问题" in server.zsets["hits"]
+        assert "另一个" not in server.zsets["hits"]
+        assert "问题0" not in server.zsets["hits"]
@@ -0,0 +1,101 @@
+"""
+单元测试 - 对话保存与流式对话接口
+"""
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.api import chat
+from app.models.conversation import Conversation
+from app.models.message import Message, MessageRole, MessageSource
+from app.models.user import User, UserRole
+from app.services.ai_service import AIServiceError
+
+
+@pytest.fixture
+def session_factory(db_engine, db_session, monkeypatch):
+    """内存数据库（预置用户1）替换接口使用的会话工厂"""
+    db_session.add(User(id=1, openid='u1', role=UserRole.TEACHER))
+    db_session.commit()
+    factory = sessionmaker(bind=db_engine)
+    monkeypatch.setattr(chat, "SessionLocal", factory)
+    return factory
+
+
+@pytest.fixture
+def use_reply(monkeypatch):
+    """无内部关键词，AI流式回复由各测试指定"""
+    async def detect_keywords(message, verdict=None):
+        return {'has_internal': False, 'internal_keywords': [], 'categories': [], 'is_excluded': False}
+
+    monkeypatch.setattr(chat.keyword_service, "detect_keywords", detect_keywords)
+
+    def install(stream):
+        monkeypatch.setattr(chat.ai_service, "stream_chat", lambda **kwargs: stream())
+
+    return install
+
+
+async def collect(response) -> str:
+    return "".join([chunk async for chunk in response.body_iterator])
+
+
+class TestSaveConversation:
+    """对话保存测试"""
+
+    def test_new_conversation(self, session_factory):
+        """测试新建对话并保存一问一答，同事务更新冗余字段"""
+        with session_factory() as session:
+            conversation_id = chat._save_conversation(
+                session, user_id=1, conversation_id=None,
+                user_text="如何提高跑步速度？", reply="多做冲刺跑", message_source="internet"
+            )
+
+        with session_factory() as session:
+            conversation = session.get(Conversation, conversation_id)
+            messages = session.query(Message).order_by(Message.id).all()
+
+            assert conversation.title == "如何提高跑步速度？"
+            assert conversation.message_count == 2
+            assert conversation.last_message_preview == "多做冲刺跑"
+            assert [m.role for m in messages] == [MessageRole.USER, MessageRole.ASSISTANT]
+            assert messages[1].source == MessageSource.INTERNET
+
+
+class TestSendMessageStream:
+    """流式对话测试"""
+
+    @pytest.mark.asyncio
+    async def test_saved_after_stream(self, session_factory, use_reply):
+        """测试回复完整后使用独立会话保存"""
+        async def reply():
+            yield "多做"
+            yield "冲刺跑"
+        use_reply(reply)
+
+        response = await chat.send_message_stream(
+            chat.ChatRequest(message="如何提高跑步速度？"), current_user={'user_id': 1}, db=None
+        )
+        body = await collect(response)
+
+        assert 'event: done\ndata: {"conversation_id": 1}' in body
+        with session_factory() as session:
+            conversation = session.get(Conversation, 1)
+            assert conversation.message_count == 2
+            assert conversation.last_message_preview.startswith("多做冲刺跑")
+
+    @pytest.mark.asyncio
+    async def test_error_event_when_interrupted(self, session_factory, use_reply):
+        """测试上游中途失败时发送error事件且不保存"""
+        async def reply():
+            yield "多做"
+            raise AIServiceError("流式回复中断")
+        use_reply(reply)
+
+        response = await chat.send_message_stream(
+            chat.ChatRequest(message="如何提高跑步速度？"), current_user={'user_id': 1}, db=None
+        )
+        body = await collect(response)
+
+        assert body.rstrip().split("\n\n")[-1].startswith("event: error")
+        assert "event: done" not in body
+        with session_factory() as session:
+            assert session.query(Conversation).count() == 0
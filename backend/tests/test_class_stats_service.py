@@ -0,0 +1,60 @@
+"""
+单元测试 - 班级统计
+"""
+import pandas as pd
+import pytest
+from app.services.class_stats_service import class_stats_service
+from app.services.data_import_service import data_import_service
+
+
+@pytest.fixture
+def db(db_session):
+    """内存SQLite会话，预置一个班级"""
+    data_import_service.import_fitness_data(db_session, pd.DataFrame({
+        '学生编号': [1, 2, 3, 4],
+        '班级名称': ['一班', '一班', '一班', '二班'],
+        '性别': ['男', '女', '男', '女'],
+        '总分': [80, 90, None, 70],
+        '总分等级': ['良好', '优秀', None, '及格'],
+    }))
+    db_session.commit()
+    return db_session
+
+
+class TestClassStatsService:
+    """班级统计测试"""
+    
+    def test_compute(self, db):
+        """测试聚合结果与原逐行统计一致"""
+        stats = class_stats_service.compute(db, '一班')
+        
+        assert stats == {
+            'class_name': '一班',
+            'total_count': 3,
+            'avg_score': round(170 / 3, 2),
+            'level_stats': {'良好': 1, '优秀': 1, '未知': 1},
+        }
+    
+    def test_compute_missing(self, db):
+        """测试班级不存在"""
+        assert class_stats_service.compute(db, '三班') is None
+    
+    def test_list_students(self, db):
+        """测试只查询指定字段并分页"""
+        students = class_stats_service.list_students(
+            db, '一班', ['student_id', 'level'], skip=1, limit=1
+        )
+        
+        assert students == [{'student_id': '000000002', 'level': '优秀'}]
+    
+    def test_import_reports_classes(self, db):
+        """测试导入结果包含数据有变化的班级"""
+        result = data_import_service.import_fitness_data(db, pd.DataFrame({
+            '学生编号': [1, 2, 5],
+            '班级名称': ['一班', '三班', '二班'],
+            '总分': [80, 90, 60],
+            '总分等级': ['良好', '优秀', '及格'],
+        }))
+        
+        # 学生2从一班转到三班，两个班都需要刷新；学生1未变化
+        assert result['classes'] == ['一班', '三班', '二班']
@@ -0,0 +1,78 @@
+"""
+单元测试 - 缓存值编解码
+"""
+import json
+import pytest
+from app.core import codec as codec_module
+from app.core.codec import CacheCodec, MAGIC, available_compressions, available_serializers
+
+
+VALUE = {
+    "title": "平衡能力训练",
+    "content": "练习方法：双脚并拢站立，双手叉腰。" * 100,
+    "keywords": ["平衡", "课课练"],
+    "score": 85.5,
+    "count": 3,
+    "missing": None,
+}
+
+
+class TestCacheCodec:
+    """编解码测试"""
+
+    @pytest.mark.parametrize("serializer", sorted(available_serializers()))
+    @pytest.mark.parametrize("compression", sorted(available_compressions()))
+    def test_roundtrip(self, serializer, compression):
+        """测试各组合编码后可解码"""
+        codec = CacheCodec(serializer=serializer, compression=compression, min_size=64)
+
+        data = codec.encode(VALUE)
+
+        assert data.startswith(MAGIC)
+        assert codec.decode(data) == VALUE
+
+    def test_compress_above_threshold(self):
+        """测试只压缩超过阈值的值"""
+        codec = CacheCodec(serializer="json", compression="zlib", min_size=1024)
+        small = codec.encode({"a": 1})
+        large = codec.encode(VALUE)
+
+        assert small[3] == 0
+        assert large[3] == 1
+        assert len(large) < len(json.dumps(VALUE, ensure_ascii=False).encode("utf-8"))
+
+    def test_legacy_json(self):
+        """测试没有头部的旧JSON值仍可解码"""
+        codec = CacheCodec()
+        legacy = json.dumps(VALUE, ensure_ascii=False)
+
+        assert codec.decode(legacy) == VALUE
+        assert codec.decode(legacy.encode("utf-8")) == VALUE
+
+    def test_decode_independent_of_config(self):
+        """测试按头部解码，切换配置后旧格式的值仍可读取"""
+        old = CacheCodec(serializer="json", compression="zlib", min_size=0).encode(VALUE)
+
+        assert CacheCodec(serializer="orjson", compression="none").decode(old) == VALUE
+
+    def test_fallback_when_missing(self, monkeypatch):
+        """测试库未安装时退回json/zlib"""
+        monkeypatch.setattr(codec_module, "orjson", None)
+        monkeypatch.setattr(codec_module, "zstandard", None)
+
+        codec = CacheCodec(serializer="orjson", compression="zstd")
+
+        assert (codec.serializer, codec.compression) == ("json", "zlib")
+        assert codec.decode(codec.encode(VALUE)) == VALUE
+
+    def test_invalid_header(self):
+        """测试无效头部"""
+        with pytest.raises(ValueError):
+            CacheCodec().decode(MAGIC + bytes((9, 1, 0)) + b"{}")
+
+    def test_msgpack_bytes(self):
+        """测试msgpack可缓存二进制内容"""
+        pytest.importorskip("msgpack")
+        codec = CacheCodec(serializer="msgpack", compression="none")
+
+        assert codec.decode(codec.encode({"raw": b"\x00\x01"})) == {"raw": b"\x00\x01"}
@@ -0,0 +1,215 @@
+"""
+单元测试 - 对话列表
+"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from app.models.conversation import Conversation
+from app.models.message import Message, MessageRole
+from app.models.user import User, UserRole
+from app.services.conversation_service import (
+    PREVIEW_LENGTH,
+    build_backfill_statement,
+    build_list_query,
+    build_page,
+    build_record_statement,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+BASE_TIME = datetime(2025, 1, 1, 8, 0, 0)
+
+
+@pytest.fixture
+def engine(db_engine):
+    """内存SQLite：用户1有5个对话（第3个无消息、第4、5个更新时间相同），用户2有1个；冗余字段分两批回填"""
+    engine = db_engine
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        User(id=1, openid='u1', role=UserRole.TEACHER),
+        User(id=2, openid='u2', role=UserRole.STUDENT),
+    ])
+    times = [BASE_TIME + timedelta(minutes=m) for m in (1, 2, 3, 4, 4)]
+    for conversation_id, updated_at in enumerate(times, start=1):
+        session.add(Conversation(
+            id=conversation_id, user_id=1, title=f"对话{conversation_id}",
+            created_at=BASE_TIME, updated_at=updated_at
+        ))
+    session.add(Conversation(id=6, user_id=2, title=None, created_at=BASE_TIME, updated_at=BASE_TIME))
+
+    message_id = 0
+    for conversation_id in (1, 2, 4, 5, 6):
+        for minute in range(3):
+            message_id += 1
+            session.add(Message(
+                id=message_id, conversation_id=conversation_id, role=MessageRole.USER,
+                content=f"{conversation_id}-{minute}" + "长" * 100,
+                created_at=BASE_TIME + timedelta(seconds=minute)
+            ))
+    session.commit()
+    session.close()
+
+    with engine.begin() as conn:
+        conn.execute(build_backfill_statement(1, 4))
+        conn.execute(build_backfill_statement(4, 100))
+    return engine
+
+
+def fetch_page(engine, user_id, limit, cursor=None, skip=0):
+    """执行列表查询并记录语句条数"""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        with engine.connect() as conn:
+            position = decode_cursor(cursor) if cursor else None
+            rows = conn.execute(build_list_query(user_id, limit + 1, position, skip)).all()
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    return build_page(rows, limit), statements
+
+
+class TestConversationList:
+    """对话列表测试"""
+
+    def test_single_query_with_preview(self, engine):
+        """测试一条SQL取出对话及最后一条消息的截断预览，不访问消息表"""
+        page, statements = fetch_page(engine, 1, 20)
+
+        assert len(statements) == 1
+        assert 'messages' not in statements[0]
+        assert [c['id'] for c in page['conversations']] == [5, 4, 3, 2, 1]
+        previews = {c['id']: c['lastMessage'] for c in page['conversations']}
+        assert previews[5].startswith('5-2')
+        assert len(previews[5]) == PREVIEW_LENGTH
+        assert previews[3] == ''
+        counts = {c['id']: c['messageCount'] for c in page['conversations']}
+        assert counts == {5: 3, 4: 3, 3: 0, 2: 3, 1: 3}
+        assert page['has_more'] is False
+        assert page['next_cursor'] is None
+
+    def test_cursor_pagination(self, engine):
+        """测试游标翻页覆盖全部对话且不重复（更新时间相同时按id区分）"""
+        seen = []
+        cursor = None
+        while True:
+            page, _ = fetch_page(engine, 1, 2, cursor)
+            seen.extend(c['id'] for c in page['conversations'])
+            if not page['has_more']:
+                break
+            cursor = page['next_cursor']
+
+        assert seen == [5, 4, 3, 2, 1]
+
+    def test_skip_limit(self, engine):
+        """测试兼容偏移分页"""
+        page, _ = fetch_page(engine, 1, 2, skip=1)
+
+        assert [c['id'] for c in page['conversations']] == [4, 3]
+        assert page['has_more'] is True
+
+    def test_other_user_and_default_title(self, engine):
+        """测试只返回本人对话，无标题时显示默认标题"""
+        page, _ = fetch_page(engine, 2, 20)
+
+        assert [c['title'] for c in page['conversations']] == ['未命名对话']
+
+    def test_backfill_keeps_order(self, engine):
+        """测试回填不改变更新时间，最后消息时间取最新消息"""
+        with engine.connect() as conn:
+            row = conn.execute(
+                select(Conversation.updated_at, Conversation.last_message_at)
+                .where(Conversation.id == 1)
+            ).one()
+
+        assert row.updated_at == BASE_TIME + timedelta(minutes=1)
+        assert row.last_message_at == BASE_TIME + timedelta(seconds=2)
+
+    def test_record_messages(self, engine):
+        """测试写入消息后对话计数累加、预览更新并排到列表最前"""
+        with engine.begin() as conn:
+            conn.execute(build_record_statement(1, '新回复' * 30, 2))
+        page, _ = fetch_page(engine, 1, 20)
+
+        first = page['conversations'][0]
+        assert first['id'] == 1
+        assert first['messageCount'] == 5
+        assert first['lastMessage'] == ('新回复' * 30)[:PREVIEW_LENGTH]
+
+    def test_cursor_roundtrip(self):
+        """测试游标编解码"""
+        cursor = encode_cursor(BASE_TIME, 42)
+
+        assert decode_cursor(cursor) == (BASE_TIME, 42)
+        with pytest.raises(ValueError):
+            decode_cursor('not-a-cursor')
+
+
+class TestBackfillScript:
+    """回填脚本测试"""
+
+    def test_upgrade_legacy_database(self, tmp_path, monkeypatch):
+        """测试在旧表结构的SQLite文件上补列、建索引并分批回填"""
+        from sqlalchemy import inspect, text
+        from scripts import backfill_conversation_stats as script
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE conversations (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                "title VARCHAR(200), created_at DATETIME, updated_at DATETIME)"
+            ))
+            conn.execute(text(
+                "CREATE TABLE messages (id INTEGER PRIMARY KEY, conversation_id INTEGER NOT NULL, "
+                "role VARCHAR(20), content TEXT, created_at DATETIME)"
+            ))
+            for conversation_id in (1, 2, 3):
+                conn.execute(text(
+                    "INSERT INTO conversations VALUES (:id, 1, '对话', :t, :t)"
+                ), {"id": conversation_id, "t": BASE_TIME})
+            for message_id, (conversation_id, content) in enumerate(
+                [(1, '第一条'), (1, '第二条'), (3, '唯一一条')], start=1
+            ):
+                conn.execute(text(
+                    "INSERT INTO messages VALUES (:id, :cid, 'USER', :content, :t)"
+                ), {"id": message_id, "cid": conversation_id, "content": content,
+                    "t": BASE_TIME + timedelta(seconds=message_id)})
+        monkeypatch.setattr(script, "engine", engine)
+
+        script.main(batch_size=2)
+        script.main(batch_size=2)  # 重复执行不报错
+
+        inspector = inspect(engine)
+        columns = {c['name'] for c in inspector.get_columns('conversations')}
+        assert {'last_message_preview', 'last_message_at', 'message_count'} <= columns
+        assert 'ix_conversations_user_updated' in {
+            index['name'] for index in inspector.get_indexes('conversations')
+        }
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT id, last_message_preview, message_count "
+                "FROM conversations ORDER BY id"
+            )).all()
+        assert [(r.id, r.last_message_preview, r.message_count) for r in rows] == [
+            (1, '第二条', 2), (2, None, 0), (3, '唯一一条', 1)
+        ]
+
+    def test_missing_index_added(self, tmp_path):
+        """测试启动时为已有对话表补建列表索引，同列的已有索引和主键不重复创建"""
+        from sqlalchemy import inspect, text
+        from app.core.database import Base, add_missing_columns, add_missing_indexes
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE conversations (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                "title VARCHAR(200), created_at DATETIME, updated_at DATETIME)"
+            ))
+        add_missing_columns(Base.metadata, bind=engine)
+        add_missing_indexes(Base.metadata, bind=engine)
+        add_missing_indexes(Base.metadata, bind=engine)
+
+        names = {index['name'] for index in inspect(engine).get_indexes('conversations')}
+        assert names == {'ix_conversations_user_updated'}
@@ -0,0 +1,236 @@
+"""
+单元测试 - 体测数据批量导入
+"""
+import io
+from typing import List
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, event
+from app.models.student_data import Base, StudentFitnessData
+from app.core.config import settings
+from app.services import data_import_service as import_module
+from app.services.data_import_service import (
+    LEGACY_SQLITE_IN_QUERY_BATCH,
+    data_import_service,
+    normalize_student_ids,
+    prepare_fitness_data,
+)
+from app.utils.spreadsheet import iter_spreadsheet_chunks
+
+
+class TestPrepareFitnessData:
+    """数据清洗测试"""
+    
+    def test_normalize_student_ids(self):
+        """测试学生编号补齐前导0"""
+        ids = normalize_student_ids(pd.Series([12345, 1.0, ' 000000007 ', None, '']))
+        
+        assert list(ids) == ['000012345', '000000001', '000000007', None, None]
+    
+    def test_coerce_columns(self):
+        """测试按列转换类型"""
+        df = pd.DataFrame({
+            '学生编号': [1, 2],
+            '年级编号': [11.0, 12.0],
+            '身高': ['150.5', 160],
+            '一分钟跳绳': [120.0, None],
+            '800米跑': ["3'45", None],
+        })
+        records, errors = prepare_fitness_data(df)
+        
+        assert errors == []
+        assert records[0]['student_id'] == '000000001'
+        assert records[0]['grade_code'] == '11'
+        assert records[0]['height'] == 150.5
+        assert records[0]['rope_skip'] == 120
+        assert records[0]['run_800m'] == "3'45"
+        assert records[0]['total_score'] is None
+        assert records[1]['rope_skip'] is None
+        assert type(records[0]['rope_skip']) is int
+    
+    def test_invalid_rows(self):
+        """测试数值无效的行记入错误"""
+        df = pd.DataFrame({'学生编号': [1, 2, None], '身高': [150, 'abc', 160]})
+        records, errors = prepare_fitness_data(df)
+        
+        assert [r['student_id'] for r in records] == ['000000001']
+        assert errors == ["第3行: 身高数值无效: abc"]
+    
+    def test_row_hash_stable(self):
+        """测试行指纹与读取方式无关，内容变化时指纹变化"""
+        as_int = pd.DataFrame({'学生编号': [1], '总分': [80]})
+        as_text = pd.DataFrame({'学生编号': ['000000001'], '总分': ['80.0'], '性别': [None]})
+        changed = pd.DataFrame({'学生编号': [1], '总分': [81]})
+        
+        hash_int = prepare_fitness_data(as_int)[0][0]['row_hash']
+        assert hash_int == prepare_fitness_data(as_text)[0][0]['row_hash']
+        assert hash_int != prepare_fitness_data(changed)[0][0]['row_hash']
+    
+    def test_duplicate_keep_last(self):
+        """测试同一学生保留最后一行"""
+        df = pd.DataFrame({'学生编号': [1, 1], '身高': [150, 151]})
+        records, _ = prepare_fitness_data(df)
+        
+        assert len(records) == 1
+        assert records[0]['height'] == 151
+
+
+class TestImportFitnessData:
+    """批量导入测试"""
+    
+    def test_insert_and_update(self, db_session):
+        """测试新增与更新"""
+        first = pd.DataFrame({
+            '学生编号': [1, 2],
+            '班级名称': ['一班', '一班'],
+            '总分': [80, 90],
+        })
+        result = data_import_service.import_fitness_data(db_session, first)
+        db_session.commit()
+        
+        assert result['inserted_count'] == 2
+        assert result['updated_count'] == 0
+        
+        # 空单元格不覆盖已有值
+        second = pd.DataFrame({
+            '学生编号': [2, 3],
+            '班级名称': [None, '二班'],
+            '总分': [95, 70],
+        })
+        result = data_import_service.import_fitness_data(db_session, second)
+        db_session.commit()
+        
+        assert result['inserted_count'] == 1
+        assert result['updated_count'] == 1
+        student = db_session.query(StudentFitnessData).filter_by(student_id='000000002').one()
+        assert student.total_score == 95
+        assert student.class_name == '一班'
+        assert db_session.query(StudentFitnessData).count() == 3
+    
+    def test_unchanged_rows_skipped(self, db_session):
+        """测试重复上传未变化的数据不写库"""
+        df = pd.DataFrame({'学生编号': [1, 2], '总分': [80, 90]})
+        data_import_service.import_fitness_data(db_session, df)
+        db_session.commit()
+        before = db_session.query(StudentFitnessData).filter_by(student_id='000000001').one().update_time
+        
+        df.loc[1, '总分'] = 91
+        result = data_import_service.import_fitness_data(db_session, df)
+        db_session.commit()
+        
+        assert result['inserted_count'] == 0
+        assert result['updated_count'] == 1
+        assert result['unchanged_count'] == 1
+        db_session.expire_all()
+        assert db_session.query(StudentFitnessData).filter_by(student_id='000000001').one().update_time == before
+    
+    def _count_statements(self, db_session, run) -> List[int]:
+        """执行run并返回每条非批量语句的参数个数"""
+        statements = []
+        
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            if not executemany:
+                statements.append(len(parameters))
+        
+        event.listen(db_session.get_bind(), 'before_cursor_execute', listener)
+        try:
+            run()
+        finally:
+            event.remove(db_session.get_bind(), 'before_cursor_execute', listener)
+        return statements
+    
+    def test_one_query_per_chunk(self, db_session):
+        """测试按默认块大小重复导入未变化的数据时，每块只查询一次"""
+        count = settings.UPLOAD_CHUNK_SIZE * 2
+        df = pd.DataFrame({'学生编号': range(1, count + 1), '总分': [80] * count})
+        data_import_service.import_fitness_data(db_session, df)
+        db_session.commit()
+        chunks = [df.iloc[:count // 2], df.iloc[count // 2:]]
+        
+        results = []
+        statements = self._count_statements(
+            db_session, lambda: results.append(data_import_service.import_fitness_chunks(db_session, chunks))
+        )
+        
+        assert results[0]['unchanged_count'] == count
+        assert len(statements) == 2
+    
+    def test_legacy_sqlite_batches(self, db_session, monkeypatch):
+        """测试旧版SQLite分批查询，每条语句的参数不超过999"""
+        monkeypatch.setattr(import_module.sqlite3, 'sqlite_version_info', (3, 31, 1))
+        count = LEGACY_SQLITE_IN_QUERY_BATCH * 2 + 1
+        df = pd.DataFrame({'学生编号': range(1, count + 1), '总分': [80] * count})
+        data_import_service.import_fitness_data(db_session, df)
+        db_session.commit()
+        
+        results = []
+        statements = self._count_statements(
+            db_session, lambda: results.append(data_import_service.import_fitness_data(db_session, df))
+        )
+        
+        assert results[0]['unchanged_count'] == count
+        assert len(statements) == 3
+        assert max(statements) <= 999
+    
+    def test_import_chunks(self, db_session):
+        """测试分块导入逐块提交，跨块重复的学生按更新处理"""
+        chunks = [
+            pd.DataFrame({'学生编号': [1, 2], '总分': [80, 90]}),
+            pd.DataFrame({'学生编号': [2, 3], '总分': [95, 'x']}, index=[2, 3]),
+        ]
+        result = data_import_service.import_fitness_chunks(db_session, chunks)
+        
+        assert result['chunk_count'] == 2
+        assert result['inserted_count'] == 2
+        assert result['updated_count'] == 1
+        assert result['errors'] == ["第5行: 总分数值无效: x"]
+        assert db_session.query(StudentFitnessData).count() == 2
+
+
+class TestSpreadsheetChunks:
+    """表格分块读取测试"""
+    
+    def _sample(self) -> pd.DataFrame:
+        return pd.DataFrame({'学生编号': range(1, 6), '总分': [60, 70, 80, 90, 100]})
+    
+    def test_csv_chunks(self):
+        """测试CSV分块读取"""
+        source = io.BytesIO(self._sample().to_csv(index=False).encode('utf-8'))
+        chunks = list(iter_spreadsheet_chunks(source, 'data.csv', 2))
+        
+        assert [len(c) for c in chunks] == [2, 2, 1]
+        assert list(chunks[2].index) == [4]
+    
+    def test_xlsx_chunks(self):
+        """测试XLSX只读逐行读取，结果与整表读取一致"""
+        source = io.BytesIO()
+        self._sample().to_excel(source, index=False)
+        source.seek(0)
+        chunks = list(iter_spreadsheet_chunks(source, 'data.xlsx', 2))
+        
+        assert [len(c) for c in chunks] == [2, 2, 1]
+        assert list(chunks[1].index) == [2, 3]
+        pd.testing.assert_frame_equal(
+            pd.concat(chunks), self._sample(), check_dtype=False
+        )
+
+
+class TestAddMissingColumns:
+    """新增列补充测试"""
+    
+    def test_add_row_hash(self, monkeypatch):
+        """测试旧表补充row_hash列"""
+        from sqlalchemy import inspect, text
+        from app.core import database
+        
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE student_fitness_data (id INTEGER PRIMARY KEY, student_id VARCHAR(50))"
+            ))
+        monkeypatch.setattr(database, "engine", engine)
+        database.add_missing_columns(Base.metadata)
+        
+        columns = {c['name'] for c in inspect(engine).get_columns('student_fitness_data')}
+        assert 'row_hash' in columns
+        assert 'total_score' in columns
@@ -0,0 +1,153 @@
+"""
+单元测试 - 训练动作推荐索引
+"""
+import asyncio
+import time
+import pandas as pd
+import pytest
+from app.services.exercise_index import (
+    ExerciseIndex,
+    difficulty_level,
+    target_difficulty,
+)
+
+
+EXERCISES = [
+    {'id': 1, 'name': '高抬腿', 'difficulty': '初级', 'improve_test': '50米跑', 'fitness_quality': '速度'},
+    {'id': 2, 'name': '冲刺跑', 'difficulty': '高级', 'improve_test': '50米跑、立定跳远', 'fitness_quality': '速度、力量'},
+    {'id': 3, 'name': '蛙跳', 'difficulty': '中级', 'improve_test': '立定跳远', 'fitness_quality': '力量'},
+    {'id': 4, 'name': '并脚跳', 'difficulty': '中级', 'improve_test': '一分钟跳绳', 'fitness_quality': '协调'},
+    {'id': 5, 'name': '折返跑', 'difficulty': '中级', 'improve_test': '50米×8往返跑', 'fitness_quality': '耐力'},
+    {'id': 6, 'name': '小步跑', 'difficulty': '中级', 'improve_test': '', 'fitness_quality': '速度'},
+]
+
+
+@pytest.fixture
+def index():
+    """预置动作的索引"""
+    exercise_index = ExerciseIndex()
+    exercise_index.build(EXERCISES)
+    return exercise_index
+
+
+class TestExerciseIndex:
+    """推荐索引测试"""
+    
+    def test_difficulty(self):
+        """测试难度识别"""
+        assert difficulty_level('初级') == 1
+        assert difficulty_level('★★★') == 3
+        assert difficulty_level(None) == 2
+        assert target_difficulty(50) == 1
+        assert target_difficulty(65) == 2
+    
+    def test_candidates(self, index):
+        """测试项目写法归一（跳绳、往返跑与50米跑互不混淆）"""
+        assert index.candidates('rope_skip') == [4]
+        assert index.candidates('run_50m_8') == [5]
+        # 直接标注的动作在前，锻炼相关素质的动作在后
+        assert index.candidates('run_50m') == [1, 2, 6]
+    
+    def test_recommend_by_difficulty(self, index):
+        """测试按难度匹配排序"""
+        weak, recommended = index.recommend({'run_50m': 50}, per_item=2)
+        
+        assert weak == ['50米跑']
+        assert [e['name'] for e in recommended] == ['高抬腿', '冲刺跑']
+        assert recommended[0]['target_item'] == '50米跑'
+        assert 'level' not in recommended[0]
+    
+    def test_recommend_multiple_items(self, index):
+        """测试多个薄弱项目：最弱的在前，动作不重复"""
+        weak, recommended = index.recommend(
+            {'run_50m': 65, 'standing_jump': 40, 'sit_reach': 90, 'pull_up': None},
+            per_item=2
+        )
+        
+        assert weak == ['立定跳远', '50米跑']
+        names = [e['name'] for e in recommended]
+        assert names[:2] == ['蛙跳', '冲刺跑']
+        assert len(names) == len(set(names))
+    
+    def test_empty_index(self):
+        """测试动作库为空"""
+        weak, recommended = ExerciseIndex().recommend({'run_50m': 50})
+        
+        assert weak == ['50米跑']
+        assert recommended == []
+    
+    def test_recommend_batch(self, index):
+        """测试批量推荐与逐个推荐一致，薄弱情况相同的学生合并"""
+        frame = pd.DataFrame({
+            'student_id': ['1', '2', '3', '4'],
+            'run_50m_score': [50, 55, 65, 90],
+            'standing_jump_score': [40, 45, None, 90],
+        })
+        for column in ('weight_score', 'lung_capacity_score', 'sit_reach_score', 'sit_up_score',
+                       'rope_skip_score', 'run_800m_score', 'run_1000m_score', 'pull_up_score',
+                       'run_50m_8_score'):
+            frame[column] = None
+        result = index.recommend_batch(frame, per_item=2)
+        
+        assert result['student_count'] == 4
+        assert result['weak_item_counts'] == {'50米跑': 3, '立定跳远': 2}
+        groups = {tuple(g['student_ids']): g for g in result['groups']}
+        assert set(groups) == {('1', '2'), ('3',), ('4',)}
+        
+        single = index.recommend({'run_50m': 50, 'standing_jump': 40}, per_item=2)
+        assert groups[('1', '2')]['weak_items'] == single[0]
+        assert groups[('1', '2')]['recommended_exercises'] == single[1]
+        assert groups[('4',)]['weak_items'] == []
+
+
+@pytest.fixture
+def versioned_index(monkeypatch, fake_cache):
+    """使用内存计数器的索引，重建只记录次数"""
+    import app.services.exercise_index as index_module
+    monkeypatch.setattr(index_module.settings, "EXERCISE_INDEX_CHECK_INTERVAL", 0)
+    
+    exercise_index = ExerciseIndex()
+    rebuilds = []
+    
+    def rebuild_from_database():
+        time.sleep(0.01)
+        rebuilds.append(1)
+        return True
+    
+    exercise_index._rebuild_from_database = rebuild_from_database
+    return exercise_index, rebuilds
+
+
+class TestIndexVersion:
+    """多进程索引同步测试"""
+    
+    @pytest.mark.asyncio
+    async def test_rebuild_on_new_version(self, versioned_index):
+        """测试其他进程发布新版本后重建一次，版本未变时不重建"""
+        exercise_index, rebuilds = versioned_index
+        await exercise_index.ensure_current(force=True)
+        assert len(rebuilds) == 1
+        
+        await exercise_index.ensure_current()
+        assert len(rebuilds) == 1
+        
+        other = ExerciseIndex()
+        await other.publish()
+        await asyncio.gather(*[exercise_index.ensure_current() for _ in range(3)])
+        
+        assert len(rebuilds) == 2
+        assert exercise_index.version == 1
+    
+    @pytest.mark.asyncio
+    async def test_check_interval(self, versioned_index, monkeypatch):
+        """测试检查间隔内不读取版本号"""
+        import app.services.exercise_index as index_module
+        exercise_index, rebuilds = versioned_index
+        monkeypatch.setattr(index_module.settings, "EXERCISE_INDEX_CHECK_INTERVAL", 60)
+        await exercise_index.ensure_current(force=True)
+        
+        await exercise_index.publish()
+        await exercise_index.ensure_current()
+        
+        assert len(rebuilds) == 1
+        assert exercise_index.version is None
@@ -0,0 +1,66 @@
+"""
+单元测试 - 模拟大模型服务
+"""
+import httpx
+import pytest
+from app.core.http_client import http_client_manager
+from app.services.ai_service import AIService
+from scripts import fake_llm_server
+
+
+@pytest.fixture
+def fake_upstream(monkeypatch):
+    """AI服务指向进程内的模拟大模型服务"""
+    monkeypatch.setattr(fake_llm_server.config, "latency", "fixed:0")
+    monkeypatch.setattr(fake_llm_server.config, "token_delay", 0)
+    monkeypatch.setattr(fake_llm_server.config, "reply", "多做冲刺跑")
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_llm_server.app),
+        base_url="http://fake-llm"
+    )
+    monkeypatch.setattr(http_client_manager, "_client", client)
+    
+    service = AIService()
+    service.base_url = "http://fake-llm" + fake_llm_server.GENERATION_PATH
+    return service
+
+
+class TestFakeLLMServer:
+    """模拟大模型服务测试"""
+    
+    @pytest.mark.asyncio
+    async def test_chat(self, fake_upstream):
+        """测试非流式接口与AI服务解析格式一致"""
+        reply = await fake_upstream.chat([{'role': 'user', 'content': '如何提高跑步速度？'}])
+        
+        assert reply == "关于“如何提高跑步速度？”：\n多做冲刺跑"
+    
+    @pytest.mark.asyncio
+    async def test_stream_chat(self, fake_upstream):
+        """测试逐字流式输出"""
+        deltas = [
+            delta async for delta in fake_upstream.stream_chat(
+                [{'role': 'user', 'content': '跑步'}]
+            )
+        ]
+        
+        assert len(deltas) > 1
+        assert "".join(deltas) == "关于“跑步”：\n多做冲刺跑"
+    
+    @pytest.mark.asyncio
+    async def test_error_injection(self, fake_upstream, monkeypatch):
+        """测试错误注入"""
+        monkeypatch.setattr(fake_llm_server.config, "error_rate", 1.0)
+        reply = await fake_upstream.chat([{'role': 'user', 'content': '你好'}])
+        
+        assert "暂时不可用" in reply
+    
+    def test_latency_distributions(self, monkeypatch):
+        """测试延迟分布配置"""
+        config = fake_llm_server.FakeLLMConfig()
+        config.latency = "fixed:0.5"
+        assert config.sample_latency() == 0.5
+        config.latency = "uniform:0.1,0.2"
+        assert 0.1 <= config.sample_latency() <= 0.2
+        config.latency = "lognormal:-1,0.1"
+        assert config.sample_latency() > 0
@@ -0,0 +1,76 @@
+"""
+单元测试 - 体测数据分析
+"""
+import pandas as pd
+import pytest
+from app.services.data_import_service import data_import_service
+from app.services.fitness_analytics_service import (
+    fitness_analytics_service,
+    grade_percentiles,
+)
+
+
+@pytest.fixture
+def db(db_session):
+    """内存SQLite会话，预置两个年级"""
+    data_import_service.import_fitness_data(db_session, pd.DataFrame({
+        '学生编号': [1, 2, 3, 4, 5],
+        '年级编号': [11, 11, 11, 11, 12],
+        '班级名称': ['1班', '1班', '2班', '2班', '1班'],
+        '性别': ['男', '女', '男', '女', '男'],
+        '50米跑评分': [50, 70, 80, None, 90],
+        '总分': [55, 65, 75, 85, 95],
+        '总分等级': ['不及格', '及格', '及格', '良好', '优秀'],
+    }))
+    db_session.commit()
+    return db_session
+
+
+class TestFitnessAnalytics:
+    """分析统计测试"""
+    
+    def test_summarize_by_grade(self, db):
+        """测试按年级统计"""
+        frame = fitness_analytics_service.load_frame(db)
+        groups = fitness_analytics_service.summarize(frame, ['grade_code'])
+        
+        grade = next(g for g in groups if g['grade_code'] == '11')
+        assert grade['student_count'] == 4
+        total = grade['items']['total']
+        assert total['count'] == 4
+        assert total['mean'] == 70
+        assert total['quantiles']['p50'] == 70
+        assert total['pass_rate'] == 0.75
+        assert total['level_counts'] == {'及格': 2, '不及格': 1, '良好': 1}
+        # 缺测不计入
+        assert grade['items']['run_50m']['count'] == 3
+        # 无数据的项目不输出
+        assert 'pull_up' not in grade['items']
+    
+    def test_summarize_multi_group(self, db):
+        """测试多维分组"""
+        frame = fitness_analytics_service.load_frame(db, grade_code='11')
+        groups = fitness_analytics_service.summarize(frame, ['class_name', 'gender'])
+        
+        assert len(groups) == 4
+        assert {g['class_name'] for g in groups} == {'1班', '2班'}
+        assert all(g['student_count'] == 1 for g in groups)
+    
+    def test_grade_percentiles(self, db):
+        """测试年级内百分位"""
+        frame = fitness_analytics_service.load_frame(db)
+        percentiles = grade_percentiles(frame)
+        
+        assert percentiles['11'] == {
+            '000000001': 0.0,
+            '000000002': 25.0,
+            '000000003': 50.0,
+            '000000004': 75.0,
+        }
+        assert percentiles['12'] == {'000000005': 0.0}
+    
+    @pytest.mark.asyncio
+    async def test_get_percentile_without_cache(self, db):
+        """测试缓存不可用时直接按年级计算"""
+        assert await fitness_analytics_service.get_percentile(db, '000000004', '11') == 75.0
+        assert await fitness_analytics_service.get_percentile(db, '000000004', None) is None
@@ -0,0 +1,32 @@
+"""
+单元测试 - 共享HTTP客户端
+"""
+import pytest
+from app.core.http_client import HTTPClientManager
+
+
+class TestHTTPClientManager:
+    """HTTP客户端管理器测试"""
+    
+    @pytest.mark.asyncio
+    async def test_client_is_shared(self):
+        """测试多次获取复用同一客户端"""
+        manager = HTTPClientManager()
+        await manager.start()
+        
+        assert manager.client is manager.client
+        await manager.close()
+    
+    @pytest.mark.asyncio
+    async def test_client_recreated_after_close(self):
+        """测试关闭后按需重新创建"""
+        manager = HTTPClientManager()
+        await manager.start()
+        first = manager.client
+        await manager.close()
+        
+        assert first.is_closed
+        second = manager.client
+        assert second is not first
+        assert not second.is_closed
+        await manager.close()
@@ -0,0 +1,122 @@
+"""
+单元测试 - 后台导入任务
+"""
+from concurrent.futures import Future
+import asyncio
+import os
+import threading
+import pandas as pd
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.core import database
+from app.models.student_data import StudentFitnessData
+from app.services import import_job_service as import_job_module
+from app.services.import_job_service import (
+    JOB_EXERCISE,
+    JOB_FITNESS,
+    STATUS_DONE,
+    STATUS_FAILED,
+    ImportJobService,
+    ImportJobStore,
+    run_import_job,
+)
+
+
+@pytest.fixture
+def session_factory(monkeypatch, db_engine):
+    """工作进程使用的内存数据库"""
+    factory = sessionmaker(bind=db_engine)
+    monkeypatch.setattr(database, "SessionLocal", factory)
+    return factory
+
+
+class TestImportJobStore:
+    """任务状态存储测试"""
+    
+    def test_save_and_update(self, tmp_path):
+        """测试保存与部分更新"""
+        store = ImportJobStore(str(tmp_path))
+        job_id = 'a' * 32
+        store.save({'job_id': job_id, 'status': 'pending'})
+        store.update(job_id, rows_processed=10)
+        
+        assert store.load(job_id) == {'job_id': job_id, 'status': 'pending', 'rows_processed': 10}
+    
+    def test_invalid_job_id(self, tmp_path):
+        """测试非法任务ID（防止路径穿越）"""
+        store = ImportJobStore(str(tmp_path))
+        
+        assert store.load('../etc/passwd') is None
+        assert store.load('b' * 32) is None
+    
+    def test_cleanup(self, tmp_path):
+        """测试清理过期任务"""
+        store = ImportJobStore(str(tmp_path))
+        store.save({'job_id': 'c' * 32})
+        path = store.status_path('c' * 32)
+        os.utime(path, (0, 0))
+        store.cleanup(ttl=60)
+        
+        assert not os.path.exists(path)
+
+
+class TestRunImportJob:
+    """导入任务执行测试"""
+    
+    def test_run_job(self, tmp_path, session_factory):
+        """测试任务执行后记录进度并删除落盘文件"""
+        store = ImportJobStore(str(tmp_path))
+        job_id = 'd' * 32
+        path = store.upload_path(job_id, 'data.csv')
+        pd.DataFrame({'学生编号': range(1, 6), '总分': [60, 70, 'x', 90, 100]}).to_csv(path, index=False)
+        store.save({'job_id': job_id, 'status': 'pending'})
+        
+        run_import_job(str(tmp_path), job_id, JOB_FITNESS, 'data.csv', 2)
+        job = store.load(job_id)
+        
+        assert job['status'] == STATUS_DONE
+        assert job['rows_processed'] == 5
+        assert job['chunk_count'] == 3
+        assert job['inserted_count'] == 4
+        assert job['errors'] == ["第4行: 总分数值无效: x"]
+        assert 'rows_per_second' in job
+        assert not os.path.exists(path)
+        assert session_factory().query(StudentFitnessData).count() == 4
+    
+    def test_run_job_failed(self, tmp_path, session_factory):
+        """测试文件损坏时任务标记为失败"""
+        store = ImportJobStore(str(tmp_path))
+        job_id = 'e' * 32
+        with open(store.upload_path(job_id, 'data.xlsx'), 'wb') as f:
+            f.write(b'not a workbook')
+        
+        run_import_job(str(tmp_path), job_id, JOB_FITNESS, 'data.xlsx', 2)
+        job = store.load(job_id)
+        
+        assert job['status'] == STATUS_FAILED
+        assert job['message'].startswith("文件处理失败")
+
+
+class TestOnDone:
+    """任务结束回调测试"""
+    
+    @pytest.mark.asyncio
+    async def test_exercise_index_refreshed_on_loop(self, tmp_path, monkeypatch):
+        """测试动作库导入完成后在事件循环中更新索引，而不是在回调线程中重建"""
+        threads = []
+        
+        async def refresh():
+            threads.append(threading.get_ident())
+        
+        monkeypatch.setattr(import_job_module, "_refresh_exercise_index", refresh)
+        future = Future()
+        future.set_result({'rows_processed': 3})
+        loop = asyncio.get_running_loop()
+        
+        await loop.run_in_executor(
+            None, ImportJobService()._on_done,
+            'f' * 32, JOB_EXERCISE, str(tmp_path / 'data.csv'), future, loop
+        )
+        await asyncio.sleep(0.01)
+        
+        assert threads == [threading.get_ident()]
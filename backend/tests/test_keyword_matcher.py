@@ -0,0 +1,56 @@
+"""
+单元测试 - 多模式关键词匹配
+"""
+import pytest
+from app.utils.keyword_matcher import KeywordMatcher
+
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher([
+        ('运动会', 'sports_meeting'),
+        ('运动会方案', 'sports_meeting'),
+        ('全员运动会', 'sports_meeting'),
+        ('体测', 'fitness_test'),
+        ('体测成绩', 'fitness_test'),
+        ('成绩', 'fitness_test'),
+    ])
+
+
+class TestKeywordMatcher:
+    """关键词匹配器测试"""
+    
+    def test_overlapping_matches(self, matcher):
+        """测试重叠关键词全部命中"""
+        matches = matcher.find_all("全员运动会方案怎么写")
+        found = [(m.start, m.end, m.keyword) for m in matches]
+        
+        assert (0, 5, '全员运动会') in found
+        assert (2, 5, '运动会') in found
+        assert (2, 7, '运动会方案') in found
+        assert len(found) == 3
+    
+    def test_match_positions(self, matcher):
+        """测试命中位置"""
+        text = "我的体测成绩"
+        for match in matcher.find_all(text):
+            assert text[match.start:match.end] == match.keyword
+            assert match.value == 'fitness_test'
+    
+    def test_repeated_keywords(self, matcher):
+        """测试重复出现的关键词"""
+        matches = matcher.find_all("体测和体测")
+        assert [m.start for m in matches] == [0, 3]
+        assert matcher.find_keywords("体测和体测") == ['体测']
+    
+    def test_no_match(self, matcher):
+        """测试无命中"""
+        assert matcher.find_all("今天天气真好") == []
+        assert matcher.contains_any("今天天气真好") is False
+        assert matcher.contains_any("运动会") is True
+    
+    def test_empty_matcher(self):
+        """测试空关键词表"""
+        empty = KeywordMatcher()
+        assert len(empty) == 0
+        assert empty.find_all("运动会") == []
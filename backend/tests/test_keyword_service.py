@@ -57,3 +57,34 @@ class TestKeywordService:
         priority = keyword_service.get_category_priority(categories)
         
         assert priority == 'fitness_test'
+    
+    @pytest.mark.asyncio
+    async def test_detect_overlapping_keywords(self, keyword_service):
+        """测试重叠关键词检测"""
+        text = "运动会方案怎么安排？"
+        result = await keyword_service.detect_keywords(text)
+        
+        assert '运动会' in result['internal_keywords']
+        assert '运动会方案' in result['internal_keywords']
+        assert result['categories'] == ['sports_meeting']
+    
+    @pytest.mark.asyncio
+    async def test_local_cache_hit(self, keyword_service):
+        """测试进程内缓存命中"""
+        from app.core.performance import performance_metrics
+        
+        text = "有没有课课练的资料？"
+        first = await keyword_service.detect_keywords(text)
+        hits = performance_metrics.metrics["cache_namespaces"]["keyword:local"]["hits"]
+        second = await keyword_service.detect_keywords(text)
+        
+        assert second == first
+        assert performance_metrics.metrics["cache_namespaces"]["keyword:local"]["hits"] == hits + 1
+    
+    def test_cache_key_is_stable(self, keyword_service):
+        """测试缓存键与进程无关"""
+        key = keyword_service._cache_key("体测成绩")
+        
+        assert key == KeywordService()._cache_key("体测成绩")
+        assert key.startswith("keyword:detect:")
+        assert str(hash("体测成绩")) not in key
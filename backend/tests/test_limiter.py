@@ -0,0 +1,94 @@
+"""
+单元测试 - 并发准入控制
+"""
+import asyncio
+import pytest
+from app.core.limiter import AdmissionController, AdmissionRejected
+
+
+class TestAdmissionController:
+    """准入控制测试"""
+    
+    @pytest.mark.asyncio
+    async def test_limits_in_flight(self):
+        """测试同时执行数不超过上限"""
+        controller = AdmissionController("test", max_in_flight=2, max_queue=10)
+        running = []
+        peak = []
+        
+        async def work():
+            async with controller.slot():
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(0.01)
+                running.pop()
+        
+        await asyncio.gather(*[work() for _ in range(6)])
+        
+        assert max(peak) == 2
+        assert controller.in_flight == 0
+        assert controller.queue_depth == 0
+    
+    @pytest.mark.asyncio
+    async def test_priority_order(self):
+        """测试按优先级出队"""
+        controller = AdmissionController("test", max_in_flight=1, max_queue=10)
+        order = []
+        
+        await controller.acquire()
+        
+        async def work(name, priority):
+            async with controller.slot(priority):
+                order.append(name)
+        
+        tasks = [
+            asyncio.ensure_future(work("student", 2)),
+            asyncio.ensure_future(work("anonymous", 3)),
+            asyncio.ensure_future(work("teacher", 0)),
+        ]
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(*tasks)
+        
+        assert order == ["teacher", "student", "anonymous"]
+    
+    @pytest.mark.asyncio
+    async def test_try_acquire(self):
+        """测试不排队获取名额：名额已满时立即返回False"""
+        controller = AdmissionController("test", max_in_flight=1, max_queue=10)
+        
+        assert controller.try_acquire() is True
+        assert controller.try_acquire() is False
+        controller.release()
+        assert controller.in_flight == 0
+    
+    @pytest.mark.asyncio
+    async def test_queue_full_rejected(self):
+        """测试队列已满时立即拒绝"""
+        controller = AdmissionController("test", max_in_flight=1, max_queue=1)
+        await controller.acquire()
+        waiter = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+        
+        controller.release()
+        await waiter
+        controller.release()
+        assert controller.in_flight == 0
+    
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """测试排队超时"""
+        controller = AdmissionController(
+            "test", max_in_flight=1, max_queue=10, queue_timeout=0.01
+        )
+        await controller.acquire()
+        
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+        
+        assert controller.queue_depth == 0
+        controller.release()
+        assert controller.in_flight == 0
@@ -0,0 +1,159 @@
+"""
+单元测试 - 熔断器与对冲请求
+"""
+import asyncio
+import pytest
+from app.core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    hedged,
+)
+
+
+async def _fail():
+    raise ValueError("上游错误")
+
+
+async def _run(breaker, func):
+    async with breaker.guard():
+        return await func()
+
+
+class TestCircuitBreaker:
+    """熔断器测试"""
+    
+    @pytest.mark.asyncio
+    async def test_opens_after_failures(self):
+        """测试连续失败后熔断"""
+        breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=60)
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await _run(breaker, _fail)
+        
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+    
+    @pytest.mark.asyncio
+    async def test_slow_calls_count_as_failures(self):
+        """测试慢调用计为失败"""
+        breaker = CircuitBreaker(
+            "test", failure_threshold=1, slow_call_threshold=0.001
+        )
+        
+        async def slow():
+            await asyncio.sleep(0.01)
+            return "结果"
+        
+        assert await _run(breaker, slow) == "结果"
+        assert breaker.state == CircuitBreaker.OPEN
+    
+    @pytest.mark.asyncio
+    async def test_half_open_probe(self):
+        """测试半开探测成功后关闭"""
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+        with pytest.raises(ValueError):
+            await _run(breaker, _fail)
+        
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        
+        async def ok():
+            return "结果"
+        
+        assert await _run(breaker, ok) == "结果"
+        assert breaker.state == CircuitBreaker.CLOSED
+    
+    @pytest.mark.asyncio
+    async def test_half_open_failure_reopens(self):
+        """测试半开探测失败后重新熔断"""
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60)
+        with pytest.raises(ValueError):
+            await _run(breaker, _fail)
+        breaker._opened_at -= 60
+        
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(ValueError):
+            await _run(breaker, _fail)
+        assert breaker.state == CircuitBreaker.OPEN
+    
+    @pytest.mark.asyncio
+    async def test_ignored_exceptions(self):
+        """测试忽略的异常不计入失败"""
+        breaker = CircuitBreaker("test", failure_threshold=1, ignore=(ValueError,))
+        with pytest.raises(ValueError):
+            await _run(breaker, _fail)
+        
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestHedged:
+    """对冲请求测试"""
+    
+    def test_latency_percentile(self):
+        """测试分位数计算"""
+        tracker = LatencyTracker(min_samples=10)
+        assert tracker.percentile(0.95) is None
+        for i in range(1, 101):
+            tracker.record(i / 100)
+        
+        assert tracker.percentile(0.95) == 0.96
+    
+    @pytest.mark.asyncio
+    async def test_fast_call_not_hedged(self):
+        """测试首次调用足够快时不发起对冲"""
+        calls = []
+        
+        async def work():
+            calls.append(1)
+            return "结果"
+        
+        assert await hedged(work, 0.05) == "结果"
+        assert len(calls) == 1
+    
+    @pytest.mark.asyncio
+    async def test_slow_call_hedged(self):
+        """测试慢调用时对冲请求胜出，另一个被取消"""
+        delays = [1.0, 0.01]
+        cancelled = []
+        
+        async def work():
+            delay = delays.pop(0)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return delay
+        
+        assert await hedged(work, 0.01) == 0.01
+        await asyncio.sleep(0)
+        assert cancelled == [1.0]
+    
+    @pytest.mark.asyncio
+    async def test_all_attempts_fail(self):
+        """测试全部失败时抛出异常"""
+        with pytest.raises(ValueError):
+            await hedged(_fail, 0.01)
+    
+    @pytest.mark.asyncio
+    async def test_hedge_needs_slot(self):
+        """测试获取不到并发名额时不对冲，获取到时对冲结束后归还"""
+        calls = []
+        released = []
+        
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return "结果"
+        
+        assert await hedged(work, 0.005, try_acquire=lambda: False) == "结果"
+        assert len(calls) == 1
+        
+        calls.clear()
+        assert await hedged(
+            work, 0.005, try_acquire=lambda: True, release=lambda: released.append(1)
+        ) == "结果"
+        await asyncio.sleep(0)
+        assert len(calls) == 2
+        assert released == [1]
@@ -0,0 +1,90 @@
+"""
+单元测试 - 资源检索服务
+"""
+import asyncio
+import pytest
+from app.models.resource import InternalResource
+from app.services.resource_service import ResourceService
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeDB:
+    """按预设结果返回的数据库会话（查询耗时10ms）"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        await asyncio.sleep(0.01)
+        return FakeResult(self.rows)
+
+
+def make_resource(resource_id, keywords):
+    return InternalResource(
+        id=resource_id, title=f"资源{resource_id}", content="内容",
+        type="course_practice", category="balance", keywords=keywords, file_url=None
+    )
+
+
+class TestSearchInternal:
+    """资源检索缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_cached_by_keyword_set(self, fake_cache):
+        """测试相同关键词组合（顺序无关）第二次命中缓存，并登记资源标签"""
+        service = ResourceService()
+        db = FakeDB([make_resource(1, ['平衡', '课课练']), make_resource(2, ['跳绳'])])
+
+        first = await service.search_internal(['平衡', '跳绳'], None, db, limit=10)
+        second = await service.search_internal(['跳绳', '平衡'], None, db, limit=10)
+
+        assert [r.id for r in first] == [r.id for r in second] == [1, 2]
+        assert db.queries == 1
+        assert fake_cache.tags == {'resource': set(fake_cache.store)}
+
+    @pytest.mark.asyncio
+    async def test_empty_result_cached(self, fake_cache):
+        """测试"无资源"同样缓存，不再反复查询"""
+        service = ResourceService()
+        db = FakeDB([])
+
+        assert await service.search_internal(['冰壶'], None, db) == []
+        assert await service.search_internal(['冰壶'], None, db) == []
+        assert db.queries == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_query_once(self, fake_cache):
+        """测试并发未命中只查询一次"""
+        service = ResourceService()
+        db = FakeDB([make_resource(1, ['平衡'])])
+
+        results = await asyncio.gather(*[
+            service.search_internal(['平衡'], 'balance', db) for _ in range(5)
+        ])
+
+        assert all([r.id for r in result] == [1] for result in results)
+        assert db.queries == 1
+
+    @pytest.mark.asyncio
+    async def test_no_keywords_not_cached(self, fake_cache):
+        """测试没有关键词时不走缓存"""
+        service = ResourceService()
+        db = FakeDB([make_resource(1, ['平衡'])])
+
+        await service.search_internal([], 'balance', db)
+        await service.search_internal([], 'balance', db)
+
+        assert db.queries == 2
+        assert fake_cache.store == {}
@@ -0,0 +1,73 @@
+"""
+单元测试 - 进行中请求合并
+"""
+import asyncio
+import pytest
+from app.core.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """请求合并测试"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_result(self):
+        """测试并发相同键只执行一次"""
+        flight = SingleFlight()
+        calls = []
+        
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "结果"
+        
+        results = await asyncio.gather(*[flight.do("key", work) for _ in range(10)])
+        
+        assert results == ["结果"] * 10
+        assert len(calls) == 1
+        assert flight.stats == {"calls": 1, "shared": 9}
+        assert len(flight) == 0
+    
+    @pytest.mark.asyncio
+    async def test_sequential_calls_not_shared(self):
+        """测试完成后的调用重新执行"""
+        flight = SingleFlight()
+        calls = []
+        
+        async def work():
+            calls.append(1)
+            return len(calls)
+        
+        assert await flight.do("key", work) == 1
+        assert await flight.do("key", work) == 2
+    
+    @pytest.mark.asyncio
+    async def test_exception_propagates_to_all(self):
+        """测试异常传递给所有等待者"""
+        flight = SingleFlight()
+        
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("上游错误")
+        
+        results = await asyncio.gather(
+            flight.do("key", fail), flight.do("key", fail),
+            return_exceptions=True
+        )
+        
+        assert all(isinstance(r, ValueError) for r in results)
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_call(self):
+        """测试单个等待者取消不影响其他等待者"""
+        flight = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.02)
+            return "结果"
+        
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        
+        assert await second == "结果"
@@ -0,0 +1,61 @@
+"""
+单元测试 - 统一文本分类引擎
+"""
+import pytest
+from app.services.text_classifier import (
+    TextClassifier,
+    LABEL_MEDICAL,
+    LABEL_MENTAL,
+    LABEL_EXCLUDED,
+    LABEL_INTERNAL,
+)
+
+
+@pytest.fixture
+def classifier():
+    classifier = TextClassifier()
+    classifier.register(LABEL_MEDICAL, ['发烧', '痛'])
+    classifier.register(LABEL_MENTAL, ['抑郁'])
+    classifier.register(LABEL_EXCLUDED, ['数学'])
+    classifier.register_mapping(LABEL_INTERNAL, {
+        '体测': 'fitness_test',
+        '体测成绩': 'fitness_test',
+        '力量': 'strength',
+    })
+    return classifier
+
+
+class TestTextClassifier:
+    """统一分类器测试"""
+    
+    def test_combined_verdict(self, classifier):
+        """测试一次扫描得到所有类别"""
+        verdict = classifier.classify("发烧了还能练力量吗，体测成绩会受影响吗")
+        
+        assert verdict.keywords(LABEL_MEDICAL) == ['发烧']
+        assert verdict.keywords(LABEL_INTERNAL) == ['力量', '体测成绩', '体测']
+        assert verdict.categories == ['strength', 'fitness_test']
+        assert verdict.risk_type == 'medical'
+        assert verdict.is_excluded is False
+    
+    def test_medical_before_mental(self, classifier):
+        """测试医疗风险优先于心理风险"""
+        verdict = classifier.classify("抑郁又头痛")
+        assert verdict.risk_type == 'medical'
+        assert classifier.classify("有点抑郁").risk_type == 'mental'
+    
+    def test_shared_keyword_labels(self, classifier):
+        """测试同一关键词属于多个列表"""
+        classifier.register(LABEL_MEDICAL, ['数学'])
+        verdict = classifier.classify("数学")
+        
+        assert verdict.is_excluded is True
+        assert verdict.keywords(LABEL_MEDICAL) == ['数学']
+    
+    def test_no_match(self, classifier):
+        """测试无命中"""
+        verdict = classifier.classify("今天天气真好")
+        
+        assert verdict.matches == []
+        assert verdict.risk_type is None
+        assert verdict.categories == []
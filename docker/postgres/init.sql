@@ -56,7 +56,10 @@ CREATE TABLE IF NOT EXISTS conversations (
     user_id INTEGER REFERENCES users(id) NOT NULL,
     title VARCHAR(200),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    last_message_preview VARCHAR(200),
+    last_message_at TIMESTAMP WITH TIME ZONE,
+    message_count INTEGER NOT NULL DEFAULT 0
 );
 
 -- 对话消息表
@@ -88,6 +91,7 @@ CREATE INDEX IF NOT EXISTS idx_users_openid ON users(openid);
 CREATE INDEX IF NOT EXISTS idx_students_user_id ON students(user_id);
 CREATE INDEX IF NOT EXISTS idx_fitness_tests_student_id ON fitness_tests(student_id);
 CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations(user_id);
+CREATE INDEX IF NOT EXISTS ix_conversations_user_updated ON conversations(user_id, updated_at);
 CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id);
 CREATE INDEX IF NOT EXISTS idx_resources_type ON internal_resources(type);
 CREATE INDEX IF NOT EXISTS idx_resources_keywords ON internal_resources USING GIN(keywords);
@@ -236,6 +236,11 @@ function displayStudentDataModal(data) {
                                 <div class="score-label">等级</div>
                                 <div class="score-value level-${data.total.level}">${data.total.level}</div>
                             </div>
+                            ${data.grade_percentile != null ? `
+                            <div class="score-item">
+                                <div class="score-label">年级排名</div>
+                                <div class="score-value">超过${data.grade_percentile}%</div>
+                            </div>` : ''}
                         </div>
                     </div>
                 </div>
@@ -625,6 +630,11 @@ function displayStudentDataInContainer(data, containerId) {
                         <div class="score-label">等级</div>
                         <div class="score-value level-${data.total.level}">${data.total.level}</div>
                     </div>
+                    ${data.grade_percentile != null ? `
+                    <div class="score-item">
+                        <div class="score-label">年级排名</div>
+                        <div class="score-value">超过${data.grade_percentile}%</div>
+                    </div>` : ''}
                 </div>
             </div>
         </div>
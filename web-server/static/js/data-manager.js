@@ -3,6 +3,26 @@
  * 处理体测数据和动作库的上传、查询
  */
 
+// 轮询导入任务直到完成
+async function waitForImportJob(jobId, interval = 1000) {
+    while (true) {
+        const response = await fetch(`${API_BASE_URL}/api/data/jobs/${jobId}`);
+        const result = await response.json();
+        
+        if (!result.success) {
+            return { status: 'failed', message: result.detail || '导入任务不存在' };
+        }
+        
+        const job = result.data;
+        if (job.status === 'done' || job.status === 'failed') {
+            return job;
+        }
+        
+        showLoading(`正在导入...已处理${job.rows_processed}行`);
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+}
+
 // 上传体测数据
 async function uploadFitnessData(file) {
     const formData = new FormData();
@@ -20,16 +40,28 @@ async function uploadFitnessData(file) {
         });
         
         const result = await response.json();
+        
+        if (!result.success) {
+            hideLoading();
+            showToast(result.detail || '上传失败', 'error');
+            return null;
+        }
+        
+        // 后台导入，轮询任务进度
+        const job = await waitForImportJob(result.job_id);
         hideLoading();
         
-        if (result.success) {
-            showToast(`上传成功！成功导入${result.success_count}条数据`, 'success');
-            if (result.error_count > 0) {
-                showToast(`失败${result.error_count}条`, 'warning');
+        if (job.status === 'done') {
+            showToast(`上传成功！成功导入${job.success_count}条数据`, 'success');
+            if (job.unchanged_count > 0) {
+                showToast(`其中${job.unchanged_count}条与已有数据相同，未重复写入`, 'info');
+            }
+            if (job.error_count > 0) {
+                showToast(`失败${job.error_count}条`, 'warning');
             }
-            return result;
+            return job;
         } else {
-            showToast(result.detail || '上传失败', 'error');
+            showToast(job.message || '导入失败', 'error');
             return null;
         }
     } catch (error) {
@@ -56,16 +88,28 @@ async function uploadSportsExercises(file) {
         });
         
         const result = await response.json();
+        
+        if (!result.success) {
+            hideLoading();
+            showToast(result.detail || '上传失败', 'error');
+            return null;
+        }
+        
+        // 后台导入，轮询任务进度
+        const job = await waitForImportJob(result.job_id);
         hideLoading();
         
-        if (result.success) {
-            showToast(`上传成功！成功导入${result.success_count}条数据`, 'success');
-            if (result.error_count > 0) {
-                showToast(`失败${result.error_count}条`, 'warning');
+        if (job.status === 'done') {
+            showToast(`上传成功！成功导入${job.success_count}条数据`, 'success');
+            if (job.unchanged_count > 0) {
+                showToast(`其中${job.unchanged_count}条与已有数据相同，未重复写入`, 'info');
+            }
+            if (job.error_count > 0) {
+                showToast(`失败${job.error_count}条`, 'warning');
             }
-            return result;
+            return job;
         } else {
-            showToast(result.detail || '上传失败', 'error');
+            showToast(job.message || '导入失败', 'error');
             return null;
         }
     } catch (error) {